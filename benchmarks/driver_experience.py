@@ -0,0 +1,65 @@
+"""
+Compares the old quadratic driverExpRaces loop with the grouped running counts
+python -m benchmarks.driver_experience uses a synthetic results table the size of ergast's
+python -m benchmarks.driver_experience --ergast-dir ./ergast_data uses the results from the local ergast snapshot
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from f1Tracker import ergast
+from f1Tracker import features
+
+
+def count_race_exp_before(dataframe):
+    #the loop as it was, one slice and filter of everything before it for every row
+    exp = []
+    for index, row in dataframe.iterrows():
+        df_new = dataframe.loc[:index]
+        df_new = df_new[df_new['driverId'] == row['driverId']]
+        exp.append(len(df_new))
+    return exp
+
+def count_race_exp_after(dataframe):
+    return features.add_driver_history(dataframe.copy())['driverExpRaces']
+
+def synthetic_results(rows, seed=0):
+    #about 1100 races of 24 starters from 870 drivers, like ergast's results table
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'driverId': rng.integers(1, 870, size=rows),
+        'racePosition': rng.integers(1, 25, size=rows),
+        'raceIdOrdered': np.sort(rng.integers(1, rows // 24 + 2, size=rows))
+    })
+
+def ergast_results(ergast_dir):
+    ergast.configure(ergast_dir, offline=True)
+    _, tables = ergast.load_snapshot()
+    races = tables['races'].sort_values(by='date')
+    races['raceIdOrdered'] = range(1, len(races) + 1)
+    results = tables['results'].merge(races[['raceId', 'raceIdOrdered']], on='raceId', how='left')
+    results = results.sort_values(by='raceIdOrdered').reset_index(drop=True)
+    return results.rename(columns={'positionOrder': 'racePosition'})
+
+def time_count(count, results, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        exp = count(results)
+    return (time.perf_counter() - start) / repeats, list(exp)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=26000)
+    parser.add_argument('--ergast-dir', default=None)
+    parser.add_argument('--repeats', type=int, default=1)
+    args = parser.parse_args()
+
+    results = ergast_results(args.ergast_dir) if args.ergast_dir else synthetic_results(args.rows)
+    before, expected = time_count(count_race_exp_before, results, args.repeats)
+    after, exp = time_count(count_race_exp_after, results, max(args.repeats, 10))
+    print(f"{len(results)} results")
+    print(f"before: {before * 1000:.0f}ms")
+    print(f"after:  {after * 1000:.1f}ms ({before / after:.0f}x faster), same counts: {exp == expected}")
+
+if __name__ == '__main__':
+    main()
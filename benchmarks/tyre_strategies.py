@@ -0,0 +1,119 @@
+"""
+Compares the old per stint tyre strategy renderer with the extract + batched draw one
+python -m benchmarks.tyre_strategies --year 2024 --round 1 uses a race from the fastf1 cache
+python -m benchmarks.tyre_strategies --synthetic works without any recorded data
+
+Only the synthetic race (20 drivers, 50 stints) has been measured so far, a full 15x10 png render takes
+350-380ms before and about 260ms after on one machine, between 1.2x and 1.4x faster across runs and machines,
+most of what is left is the layout and png encoding
+The recorded race number is still to be taken, cache the race first (flask --app f1Tracker.app f1-cache prefetch
+--year 2024 --sessions R) then run it with --year 2024 --round 1 and record the result here and in the README
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import fastf1
+import fastf1.plotting
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from io import BytesIO
+from f1Tracker import f1cache
+from f1Tracker import graphdata
+from f1Tracker import render
+
+
+def render_before(session, year):
+    #the renderer as it was before the dataset split, one filter per driver and one barh and colour lookup per stint
+    laps = session.laps
+    drivers = [session.get_driver(driver)["Abbreviation"] for driver in session.drivers]
+    stints = laps[["Driver", "Stint", "Compound", "LapNumber"]]
+    stints = stints.groupby(["Driver", "Stint", "Compound"])
+    stints = stints.count().reset_index()
+    stints = stints.rename(columns={"LapNumber": "StintLength"})
+
+    fig, ax = plt.subplots(figsize=(15, 10))
+    for driver in drivers:
+        driver_stints = stints.loc[stints["Driver"] == driver]
+        previous_stint_end = 0
+        for idx, row in driver_stints.iterrows():
+            compound_color = fastf1.plotting.get_compound_color(row["Compound"], session=session)
+            plt.barh(y=driver, width=row["StintLength"], left=previous_stint_end,
+                     color=compound_color, edgecolor="black", fill=True)
+            previous_stint_end += row["StintLength"]
+
+    plt.suptitle(f"{year} {session.event['EventName']} Strategies")
+    plt.xlabel("Lap Number")
+    plt.grid(False)
+    ax.invert_yaxis()
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_visible(False)
+    plt.tight_layout()
+    buf = BytesIO()
+    fig.savefig(buf, format="png")
+    plt.close(fig)
+    return buf
+
+def render_after(session, year):
+    return render.draw_tyre_strategies(graphdata.extract_tyre_strategies(session, year, None))
+
+class SyntheticSession():
+    #20 drivers doing a 57 lap race on two or three stints
+    def __init__(self, seed=0):
+        rng = np.random.default_rng(seed)
+        self.drivers = [str(number) for number in range(1, 21)]
+        self.event = {'EventName': 'Synthetic Grand Prix', 'EventDate': pd.Timestamp('2024-03-02')}
+        rows = []
+        for number in self.drivers:
+            stops = np.sort(rng.choice(np.arange(10, 50), size=rng.integers(1, 3), replace=False))
+            bounds = [0, *stops, 57]
+            for stint, (start, end) in enumerate(zip(bounds[:-1], bounds[1:]), start=1):
+                compound = rng.choice(['SOFT', 'MEDIUM', 'HARD'])
+                rows += [{'Driver': f"D{number}", 'Stint': stint, 'Compound': compound, 'LapNumber': lap}
+                         for lap in range(start + 1, end + 1)]
+        self.laps = pd.DataFrame(rows)
+
+    def get_driver(self, number):
+        return {'Abbreviation': f"D{number}"}
+
+def load_session(year, round_number, cache_dir):
+    f1cache.enable(cache_dir, offline=True)
+    session = fastf1.get_session(year, round_number, 'R')
+    session.load(laps=True, telemetry=False, weather=False, messages=False)
+    return session
+
+def time_render(render_graph, session, year, repeats):
+    render_graph(session, year)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        render_graph(session, year)
+    return (time.perf_counter() - start) / repeats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--year', type=int, default=2024)
+    parser.add_argument('--round', type=int, default=1)
+    parser.add_argument('--cache-dir', default='./f1_cache')
+    parser.add_argument('--synthetic', action='store_true')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        session = SyntheticSession()
+    else:
+        try:
+            session = load_session(args.year, args.round, args.cache_dir)
+        except Exception as e:
+            parser.exit(1, f"Round {args.round} of {args.year} isn't in the fastf1 cache at {args.cache_dir} ({e}), "
+                           f"prefetch it first or run with --synthetic\n")
+    before = time_render(render_before, session, args.year, args.repeats)
+    after = time_render(render_after, session, args.year, args.repeats)
+    dataset = graphdata.extract_tyre_strategies(session, args.year, None)
+    print(f"{len(dataset.stint_lengths)} stints for {len(dataset.drivers)} drivers")
+    print(f"before: {before * 1000:.0f}ms per render")
+    print(f"after:  {after * 1000:.0f}ms per render ({before / after:.1f}x faster)")
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,38 @@
-from flask import Flask, render_template, send_from_directory, session, request, redirect, url_for, flash, send_file
+from flask import Flask, render_template, send_from_directory, session, request, redirect, url_for, flash, send_file, jsonify
 from f1Tracker import db
 from f1Tracker import f1data
+from f1Tracker import f1cache
+from f1Tracker import lapstore
+from f1Tracker import graphstore
+from f1Tracker import pipeline
+from f1Tracker import jobs
+from f1Tracker import singleflight
+from f1Tracker import graphdata
+from f1Tracker import warmup
+from f1Tracker import ergast
+from f1Tracker import featurestore
+from f1Tracker import modelstore
+from f1Tracker import driverfeatures
+from f1Tracker.sessions import session_cache
+from f1Tracker.graphdata import dataset_cache
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_caching import Cache
 from flask_mail import Mail, Message
+from flask.cli import AppGroup
+import click
 import os
+import gzip
+import hashlib
 import secrets
 from dotenv import load_dotenv
 from io import BytesIO
 from datetime import datetime, timedelta, timezone
 
+try:
+    import brotli
+except ImportError:  #brotli is optional, the graph data api falls back to gzip without it
+    brotli = None
+
 app = Flask(__name__)
 
 #load hidden variables from env file
@@ -26,6 +49,61 @@ mail = Mail(app)
 
 cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'}) 
 
+#memory budget for loaded FastF1 sessions shared by all the graphs
+app.config['F1_SESSION_CACHE_MB'] = int(os.getenv('F1_SESSION_CACHE_MB', 512))
+session_cache.resize(app.config['F1_SESSION_CACHE_MB'] * 1024 * 1024)
+
+#on disk FastF1 cache so restarting a worker doesn't mean downloading every session again
+#offline mode only serves what is already in the cache and never touches the network
+app.config['F1_CACHE_DIR'] = os.getenv('F1_CACHE_DIR', './f1_cache')
+app.config['F1_CACHE_MAX_MB'] = int(os.getenv('F1_CACHE_MAX_MB', 4096))
+app.config['F1_CACHE_OFFLINE'] = os.getenv('F1_CACHE_OFFLINE', '0') == '1'
+#how often the cache is checked against F1_CACHE_MAX_MB in the background, it is also checked after sessions load
+app.config['F1_CACHE_CHECK_SECONDS'] = int(os.getenv('F1_CACHE_CHECK_SECONDS', 600))
+f1cache.configure(app.config)
+
+#laps and fastest lap telemetry fastf1 derived from a session, stored as parquet for fast reloads after a restart
+app.config['F1_LAP_STORE_DIR'] = os.getenv('F1_LAP_STORE_DIR', './f1_lap_store')
+lapstore.configure(app.config['F1_LAP_STORE_DIR'])
+
+#rendered graph images shared by every worker, see generate_graph
+app.config['GRAPH_STORE_DIR'] = os.getenv('GRAPH_STORE_DIR', './graph_store')
+graphstore.configure(app.config['GRAPH_STORE_DIR'])
+
+#graphs that aren't stored yet are rendered by background jobs so requests never wait on fastf1 and matplotlib
+#every render draws on its own figure so several can run at once
+app.config['GRAPH_JOB_WORKERS'] = int(os.getenv('GRAPH_JOB_WORKERS', 4))
+app.config['GRAPH_JOB_MAX_QUEUE'] = int(os.getenv('GRAPH_JOB_MAX_QUEUE', 8))
+app.config['GRAPH_JOB_TIMEOUT'] = int(os.getenv('GRAPH_JOB_TIMEOUT', 180))
+#lock files used to coalesce identical renders and session loads across workers
+app.config['LOCK_DIR'] = os.getenv('LOCK_DIR', './locks')
+singleflight.configure(app.config['LOCK_DIR'])
+
+#local snapshot of the ergast database the predictions are trained on, refreshed with flask ergast refresh
+#offline mode never downloads it, a zip can be given to flask ergast import instead
+app.config['ERGAST_DIR'] = os.getenv('ERGAST_DIR', './ergast_data')
+app.config['ERGAST_URL'] = os.getenv('ERGAST_URL', ergast.ERGAST_URL)
+app.config['ERGAST_OFFLINE'] = os.getenv('ERGAST_OFFLINE', '0') == '1'
+ergast.configure(app.config['ERGAST_DIR'], app.config['ERGAST_URL'], app.config['ERGAST_OFFLINE'])
+
+#the feature table the models are trained on, each new ergast snapshot only adds the races that are new in it
+app.config['FEATURE_STORE_DIR'] = os.getenv('FEATURE_STORE_DIR', './feature_store')
+featurestore.configure(app.config['FEATURE_STORE_DIR'])
+
+#trained prediction models, requests only load them, training happens in the background or with flask models train
+app.config['MODEL_STORE_DIR'] = os.getenv('MODEL_STORE_DIR', './model_store')
+modelstore.configure(app.config['MODEL_STORE_DIR'])
+#latest features of every driver, the predictions are made for the drivers of the latest race in it
+app.config['DRIVER_FEATURES_DB'] = os.getenv('DRIVER_FEATURES_DB',
+                                             os.path.join(app.config['MODEL_STORE_DIR'], 'driver_features.sqlite'))
+driverfeatures.configure(app.config['DRIVER_FEATURES_DB'])
+
+graph_jobs = jobs.JobRunner(app.config['GRAPH_JOB_WORKERS'], app.config['GRAPH_JOB_MAX_QUEUE'],
+                            app.config['GRAPH_JOB_TIMEOUT'])
+#renders of whole Grand Prix started from the admin terminal run one at a time so they never hold up graph jobs
+app.config['GRAPH_BATCH_TIMEOUT'] = int(os.getenv('GRAPH_BATCH_TIMEOUT', 6 * 3600))
+batch_jobs = jobs.JobRunner(1, 2, app.config['GRAPH_BATCH_TIMEOUT'])
+
 #app secret key - set using python -c 'import secrets; print(secrets.token_hex())'
 app.secret_key = os.getenv('SECRET_KEY')
 
@@ -35,6 +113,100 @@ f1_data_race = f1data.F1RaceData()
 f1_data_quali = f1data.F1QualiData()
 f1_data_upcoming = f1data.F1UpcomingData()
 
+#the season schedule and the data behind the predictions are slow to load so nothing loads them on import,
+#a warm-up thread started by the first request (usually the readiness probe) loads them in the background
+#F1_WARM_UP=0 turns it off and leaves them to load on first use
+app.config['F1_WARM_UP'] = os.getenv('F1_WARM_UP', '1') == '1'
+app.config['F1_WARM_UP_RETRY'] = int(os.getenv('F1_WARM_UP_RETRY', 60))
+
+def load_schedule():
+    if not f1data.schedule.load():
+        raise RuntimeError("the season schedule couldn't be loaded")
+
+#a worker is ready once it has the schedule, the predictions keep loading after that
+warm_up = warmup.WarmUp({'schedule': load_schedule, 'predictions': f1data.warm_up_predictions},
+                        required=['schedule'], retry_seconds=app.config['F1_WARM_UP_RETRY'])
+
+@app.before_request
+def start_warm_up():
+    if app.config['F1_WARM_UP']:
+        warm_up.start()
+
+@app.before_request
+def start_cache_size_checks():
+    f1cache.start_size_checks(app.config['F1_CACHE_CHECK_SECONDS'])
+
+f1_cache_cli = AppGroup('f1-cache', help='Manage the on disk FastF1 cache.')
+
+@f1_cache_cli.command('prefetch')
+@click.option('--year', type=int, required=True, help='Season to download.')
+@click.option('--sessions', default='R,Q', help='Comma separated session types, e.g. R,Q.')
+@click.option('--workers', type=int, default=None, help='Number of worker processes.')
+def prefetch_cache(year, sessions, workers):
+    #e.g. flask --app f1Tracker.app f1-cache prefetch --year 2024 --sessions R,Q
+    session_types = [session_type.strip() for session_type in sessions.split(',') if session_type.strip()]
+    results = f1cache.prefetch(year, session_types, workers=workers)
+    for round_number, session_type, ok, seconds in results:
+        click.echo(f"Round {round_number} {session_type}: {'ok' if ok else 'FAILED'} ({seconds:.1f}s)")
+
+    info = f1cache.get_cache_info()
+    click.echo(f"Cache is {info['bytes'] / 1048576:.1f} MB across {info['events']} events")
+
+app.cli.add_command(f1_cache_cli)
+
+ergast_cli = AppGroup('ergast', help='Manage the local snapshot of the ergast data.')
+
+@ergast_cli.command('refresh')
+def refresh_ergast():
+    #e.g. flask --app f1Tracker.app ergast refresh
+    changed = ergast.refresh()
+    click.echo(f"Ergast snapshot {ergast.get_version()} {'downloaded' if changed else 'is up to date'}")
+
+@ergast_cli.command('import')
+@click.argument('zip_path', type=click.Path(exists=True, dir_okay=False))
+def import_ergast(zip_path):
+    #e.g. flask --app f1Tracker.app ergast import f1db_csv.zip
+    manifest = ergast.import_zip(zip_path)
+    click.echo(f"Ergast snapshot {manifest['version']} imported from {zip_path}")
+
+app.cli.add_command(ergast_cli)
+
+models_cli = AppGroup('models', help='Train the prediction models.')
+
+@models_cli.command('train')
+@click.option('--mode', type=click.Choice(['fast', 'full']), default=None,
+              help='fast for development, full for production. Defaults to MODEL_TRAINING_MODE.')
+@click.option('--force', is_flag=True, help='Train again even if the models are up to date.')
+def train_models(mode, force):
+    #e.g. flask --app f1Tracker.app models train --mode full, workers start serving the new models straight away
+    for name, entry in f1data.load_predictions().train_models(mode=mode, force=force).items():
+        click.echo(f"{name}: {entry['path']} ({entry['accuracy']}% accurate, {entry.get('timings')})")
+
+app.cli.add_command(models_cli)
+
+def get_pipeline_config():
+    #plain copy of the settings the render pipeline's worker processes need
+    keys = ['F1_CACHE_DIR', 'F1_CACHE_OFFLINE', 'F1_LAP_STORE_DIR', 'GRAPH_STORE_DIR', 'LOCK_DIR']
+    return {key: app.config[key] for key in keys}
+
+graphs_cli = AppGroup('graphs', help='Render graphs into the graph store.')
+
+@graphs_cli.command('render')
+@click.option('--grand-prix', default=None, help='Grand Prix to render, defaults to the last one.')
+@click.option('--workers', type=int, default=None, help='Number of worker processes.')
+@click.option('--force', is_flag=True, help='Render graphs again even if they are already stored.')
+def render_graphs(grand_prix, workers, force):
+    #e.g. flask --app f1Tracker.app graphs render --grand-prix "Abu Dhabi Grand Prix"
+    grand_prix = grand_prix or getGrandPrixList()[0]
+    results, load_timings = pipeline.render_grand_prix(get_pipeline_config(), grand_prix, workers=workers, force=force,
+                                                       f1_data={'R': f1_data_race, 'Q': f1_data_quali})
+    for session_type, seconds in load_timings.items():
+        click.echo(f"Loaded {session_type} session in {seconds:.1f}s")
+    for graph_type, size, theme, status, seconds in results:
+        click.echo(f"{graph_type} ({size}, {theme}): {status} ({seconds:.1f}s)")
+
+app.cli.add_command(graphs_cli)
+
 def send_verification_email(email, token):
     try:
         emailMessage = Message('Your Verification Code', recipients=[email])
@@ -430,6 +602,26 @@ def admin_terminal():
             delete_user(user_id)
             flash("User account deleted!", "danger")
 
+        elif action == 'clear_graph_store' and admin_permissions >= 2:
+            #clears stored graph images so they are rendered again, e.g. after fastf1 corrects a session
+            grand_prix = request.form.get('grand_prix') or None
+            count = graphstore.invalidate(grand_prix=grand_prix)
+            dataset_cache.clear()
+            flash(f"{count} stored graphs cleared", "success")
+
+        elif action == 'render_graphs' and admin_permissions >= 2:
+            #rendering every graph takes a while so it runs as a background job
+            grand_prix = request.form.get('grand_prix') or None
+            if grand_prix is not None and not is_grand_prix(grand_prix):
+                flash(f"{grand_prix} isn't a Grand Prix this season", "danger")
+                return redirect(url_for('admin_terminal'))
+            grand_prix_list = [grand_prix] if grand_prix else getGrandPrixList()
+            try:
+                batch_jobs.submit(f"render-{grand_prix or 'all'}", lambda: render_grand_prix_list(grand_prix_list))
+                flash(f"Rendering every graph for {grand_prix or 'every Grand Prix'} in the background", "success")
+            except jobs.QueueFullError:
+                flash("Graphs are already being rendered, try again once they're done", "danger")
+
         elif action == 'clear_recommendations' and admin_permissions >= 2:
             #clears recommendations
             query = "DELETE FROM displayData"
@@ -444,7 +636,15 @@ def admin_terminal():
 
     return render_template('admin.html', users=users, sort_by=sort_by, admin_permissions=admin_permissions, 
                            newsletter_count=newsletter_count, most_common_driver=most_common_driver, 
-                           most_common_team=most_common_team)
+                           most_common_team=most_common_team, session_cache_stats=session_cache.stats(),
+                           dataset_cache_stats=dataset_cache.stats(),
+                           grand_prix_list=getGrandPrixList())
+
+def render_grand_prix_list(grand_prix_list):
+    #from inside the web app the render workers are spawned, forking this multithreaded process isn't safe
+    for grand_prix in grand_prix_list:
+        pipeline.render_grand_prix(get_pipeline_config(), grand_prix, start_method='spawn',
+                                   f1_data={'R': f1_data_race, 'Q': f1_data_quali})
 
 def add_admin(email, permissions):
     #query to check if the user exists and get their userID with a LEFT JOIN
@@ -538,40 +738,69 @@ def merge(left, right, key):
 
 
 #cache used to enhance performance of the website when calling all the data from the api from f1data.py
+#nothing is cached until the schedule has loaded so a failed load isn't served for days
+def schedule_not_loaded():
+    return not f1data.schedule.loaded
+
 #For the first 4 they only needed to be updated between every grand prix which is at least 5 days hence the 432000 seconds
-@cache.cached(timeout=432000, key_prefix='upcoming_grand_prix_info')
+@cache.cached(timeout=432000, key_prefix='upcoming_grand_prix_info', unless=schedule_not_loaded)
 def getUpcomingGrandPrixInfo():
     return f1_data_upcoming.get_upcoming_grand_prix_info()
 
-@cache.cached(timeout=432000, key_prefix='grand_prix_list')
+@cache.cached(timeout=432000, key_prefix='grand_prix_list', unless=schedule_not_loaded)
 def getGrandPrixList():
     return f1_data_race.get_events()
 
-@cache.cached(timeout=432000, key_prefix='upcoming_grand_prix_date')
+def is_grand_prix(grand_prix):
+    #graphs are only made for the Grand Prix of the season that have happened, any other name would
+    #still become a stored graph, a queued job and a fastf1 event lookup
+    return bool(grand_prix) and grand_prix in (getGrandPrixList() or [])
+
+@cache.cached(timeout=432000, key_prefix='upcoming_grand_prix_date', unless=schedule_not_loaded)
 def getUpcomingGrandPrixDate():
     return f1_data_upcoming.get_countdown_date()
 
-@cache.cached(timeout=432000, key_prefix='upcoming_grand_prix_name')
+@cache.cached(timeout=432000, key_prefix='upcoming_grand_prix_name', unless=schedule_not_loaded)
 def getUpcomingGrandPrix():
     return f1_data_upcoming.get_upcoming_grand_prix()
 
 #for the predictions they can change as soon as the database from ergast is updated which is why they refresh every hour 
-@cache.cached(timeout=3600, key_prefix='driver_rankings_race')
-def driverRankingsRace():
-    rankings, accuracy = f1_data_race.predictions()
+#until the first models are trained there are no predictions, that isn't cached so they show up once they are
+def predictions_made(result):
+    return bool(result[0])
+
+def get_predictions(f1_data):
+    try:
+        rankings, accuracy = f1_data.predictions()
+    except modelstore.ModelNotReadyError as e:
+        app.logger.info(f"No predictions yet: {e}")
+        return [[], 'N/A']
     return [rankings, accuracy]
+
+@cache.cached(timeout=3600, key_prefix='driver_rankings_race', response_filter=predictions_made)
+def driverRankingsRace():
+    return get_predictions(f1_data_race)
         
-@cache.cached(timeout=3600, key_prefix='driver_rankings_quali')
+@cache.cached(timeout=3600, key_prefix='driver_rankings_quali', response_filter=predictions_made)
 def driverRankingsQuali():
-    rankings, accuracy = f1_data_quali.predictions()
-    return [rankings, accuracy]
+    return get_predictions(f1_data_quali)
 
-#the data for the graphs never needs to be changed once created and so can be cached indefinitely
-@cache.cached(timeout=None, key_prefix='generate-graph')
+#the data for the graphs never needs to be changed once created so rendered graphs are kept in the graph store
+#on disk, which every worker shares and which survives restarts, so a graph is only rendered once
+#graphs that aren't stored yet are rendered by a background job and the browser polls /graph-jobs/<id>
 @app.route('/generate-graph', methods=['GET'])
 def generate_graph():
     graph_type = request.args.get('graphType')
     grand_prix = request.args.get('grandPrix')
+    size = request.args.get('size', graphstore.DEFAULT_SIZE)
+    theme = request.args.get('theme', graphstore.DEFAULT_THEME)
+
+    if graph_type not in getGraphTypes():
+        return "Graph type not supported", 400
+    if size not in graphstore.GRAPH_SIZES or theme not in graphstore.GRAPH_THEMES:
+        return "Graph size or theme not supported", 400
+    if not is_grand_prix(grand_prix):
+        return "Grand Prix not supported", 400
 
     #increment view count for the selected graph type
     db.get_db().execute('''
@@ -582,40 +811,153 @@ def generate_graph():
     ''', [graph_type, None, grand_prix])
     db.get_db().commit()
 
-    #based on the selected graph type and Grand Prix, generate the appropriate graph
-    if graph_type == "Position Changed during a Race":
-        image_data = f1_data_race.get_positions_change_during_a_race(grand_prix)
-    
-    elif graph_type == "Qualifying Results Overview":
-        image_data = f1_data_quali.get_quali_results_overview(grand_prix)
+    year = f1_data_race.year
+    image_path = graphstore.get(year, grand_prix, graph_type, size, theme)
+    if image_path is not None:
+        #serve the image data
+        return send_file(image_path, mimetype='image/png')
 
-    elif graph_type == "Gear Shifts on Track":
-        image_data = f1_data_quali.get_gear_shifts(grand_prix)
-    
-    elif graph_type == "Team Pace Comparison":
-        image_data = f1_data_race.get_team_pace_comparison(grand_prix)
-
-    elif graph_type == "Driver Laptime Comparison":
-        image_data = f1_data_race.get_driver_laptime_comparison(grand_prix)
-    
-    elif graph_type == "Tyre Strategies During a Race":
-        image_data = f1_data_race.get_tyre_strategies(grand_prix)
+    #the job id is the graph's store key so any worker can tell when it has been rendered
+    job_id = graphstore.get_key(year, grand_prix, graph_type, size, theme)
+    try:
+        job = graph_jobs.submit(job_id, lambda: pipeline.render_to_store({'R': f1_data_race, 'Q': f1_data_quali},
+                                                                         graph_type, grand_prix, size, theme),
+                                result_url=url_for('stored_graph', key=job_id))
+    except jobs.QueueFullError as e:
+        return graph_queue_full(e, graph_type, grand_prix)
+
+    return jsonify(graph_job_status(job)), 202, {'Location': url_for('graph_job', job_id=job_id)}
+
+def graph_queue_full(error, graph_type, grand_prix):
+    app.logger.warning(f"Rejected graph job for {graph_type} {grand_prix}: {error}")
+    response = jsonify({'error': 'Too many graphs are being generated, please try again shortly.'})
+    response.headers['Retry-After'] = '10'
+    return response, 503
+
+def graph_job_status(job):
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': url_for('graph_job', job_id=job['id']),
+        'result_url': job['result_url'] if job['status'] == 'done' else None,
+        'error': job['error']
+    }
 
-    else:
-        return "Graph type not supported", 400
+@app.route('/graph-jobs/<job_id>', methods=['GET'])
+def graph_job(job_id):
+    job = graph_jobs.get(job_id)
+    if job is None or job['status'] == 'failed':
+        #the job may have run on a different worker or finished after it timed out,
+        #the graph store is shared so check there before reporting it unknown or failed
+        if graphstore.get_by_key(job_id) is not None:
+            job = {'id': job_id, 'status': 'done', 'error': None, 'result_url': url_for('stored_graph', key=job_id)}
+        elif graphstore.get_by_key(job_id, GRAPH_DATA_FORMAT) is not None:
+            job = {'id': job_id, 'status': 'done', 'error': None,
+                   'result_url': url_for('stored_graph_data', key=job_id)}
+        elif job is None and singleflight.is_locked(graphstore.get_lock_name(job_id)):
+            #another worker is making it right now
+            job = {'id': job_id, 'status': 'running', 'error': None, 'result_url': None}
+        elif job is None:
+            #it may still be queued on another worker, the page keeps polling until its timeout
+            return jsonify({'job_id': job_id, 'status': 'unknown'}), 404
+
+    return jsonify(graph_job_status(job))
+
+@app.route('/graphs/<key>.png', methods=['GET'])
+def stored_graph(key):
+    image_path = graphstore.get_by_key(key)
+    if image_path is None:
+        return "Graph not found", 404
+    return send_file(image_path, mimetype='image/png', max_age=86400)
+
+#the series behind each graph as json so browsers can draw the charts themselves, the png is kept for the newsletter
+GRAPH_DATA_MAX_AGE = 300
+#the graph store format the json is kept under
+GRAPH_DATA_FORMAT = 'data'
+
+def stored_graph_data_response(data_path):
+    with open(data_path) as f:
+        return compressed_response(f.read(), 'application/json', GRAPH_DATA_MAX_AGE)
+
+@app.route('/graph-data/<key>.json', methods=['GET'])
+def stored_graph_data(key):
+    data_path = graphstore.get_by_key(key, GRAPH_DATA_FORMAT)
+    if data_path is None:
+        return jsonify({'error': 'Graph data not found'}), 404
+    return stored_graph_data_response(data_path)
+
+@app.route('/api/graph-data', methods=['GET'])
+def graph_data():
+    graph_type = request.args.get('graphType')
+    grand_prix = request.args.get('grandPrix')
 
-    #serve the image data
-    return send_file(image_data, mimetype='image/png')
+    if graph_type not in getGraphTypes():
+        return jsonify({'error': 'Graph type not supported'}), 400
+    if not is_grand_prix(grand_prix):
+        return jsonify({'error': 'Grand Prix not supported'}), 400
+
+    data = {'R': f1_data_race, 'Q': f1_data_quali}[f1data.GRAPH_METHODS[graph_type][0]]
+    dataset = data.peek_graph_dataset(grand_prix, graph_type)
+    if dataset is not None:
+        return compressed_response(graphdata.to_json(dataset, graph_type), 'application/json', GRAPH_DATA_MAX_AGE)
+
+    #the json is kept in the graph store next to the images so a worker that didn't extract it can serve it
+    key = graphstore.get_key(data.year, grand_prix, graph_type, None, None, GRAPH_DATA_FORMAT)
+    data_path = graphstore.get_by_key(key, GRAPH_DATA_FORMAT)
+    if data_path is not None:
+        return stored_graph_data_response(data_path)
+
+    #extracting the data needs the session loaded so it runs as a background job like a graph render,
+    #the job id is the store key so any worker can tell when it is done
+    def extract():
+        #the lock tells the other workers it is being extracted, and they wait for it rather than extract it again
+        with singleflight.file_lock(graphstore.get_lock_name(key)):
+            if graphstore.get_by_key(key, GRAPH_DATA_FORMAT) is not None:
+                return
+            dataset = data.get_graph_dataset(grand_prix, graph_type)
+            graphstore.put(data.year, grand_prix, graph_type, None, None,
+                           graphdata.to_json(dataset, graph_type).encode(), GRAPH_DATA_FORMAT)
+
+    job_id = key
+    try:
+        job = graph_jobs.submit(job_id, extract, result_url=url_for('stored_graph_data', key=key))
+    except jobs.QueueFullError as e:
+        return graph_queue_full(e, graph_type, grand_prix)
+
+    return jsonify(graph_job_status(job)), 202, {'Location': url_for('graph_job', job_id=job_id)}
+
+#readiness probe for load balancers, 503 until the warm-up thread has loaded what a worker needs
+@app.route('/ready', methods=['GET'])
+def ready():
+    status = warm_up.status()
+    if not app.config['F1_WARM_UP']:
+        #nothing is loaded in the background so there is nothing to wait for
+        status['ready'] = True
+    return jsonify(status), 200 if status['ready'] else 503
+
+def compressed_response(body, mimetype, max_age):
+    #compress with brotli or gzip depending on what the client accepts and answer revalidations with a 304
+    data = body.encode()
+    etag = hashlib.sha256(data).hexdigest()[:32]
+    encoding = request.accept_encodings.best_match(['br', 'gzip'] if brotli is not None else ['gzip'])
+    if encoding == 'br':
+        data = brotli.compress(data)
+    elif encoding == 'gzip':
+        data = gzip.compress(data, compresslevel=6)
+
+    response = app.response_class(data, mimetype=mimetype)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+        #each encoding is a different representation so it needs its own etag
+        etag = f"{etag}-{encoding}"
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
 
 def getGraphTypes():
-    return [
-        "Position Changed during a Race", 
-            "Qualifying Results Overview" , 
-            "Team Pace Comparison", 
-            "Driver Laptime Comparison",
-            "Gear Shifts on Track",  
-            "Tyre Strategies During a Race"
-            ]
+    return list(f1data.GRAPH_METHODS)
 
 def get_most_viewed_graphs(number_of_recomendations):
     query = '''
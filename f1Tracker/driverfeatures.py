@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import threading
+import numpy as np
+
+#the latest features of every driver in a sqlite table, the upcoming grid's rows for the predictions are read
+#from it with one indexed lookup rather than taking the last rows of the whole training dataframe
+#ml.py adds the rows of each new race to it as the race is ingested, a driver's row is replaced by their newer one
+
+#the features kept for each driver, startingPosition is the grid they started their last race from
+FEATURE_COLUMNS = ['startingPosition', 'driverExpYears', 'driverExpRaces', 'meanPace', 'maxPace']
+#the columns ml.py passes to update for each row
+COLUMNS = ['driverId', 'code', 'raceIdOrdered', 'year'] + FEATURE_COLUMNS
+
+_settings = {
+    'path': os.getenv('DRIVER_FEATURES_DB', './model_store/driver_features.sqlite')
+}
+
+def configure(path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    _settings['path'] = path
+
+#each thread keeps its connection open, opening one and checking the schema costs more than the lookup
+_connections = threading.local()
+
+def _connect():
+    path = _settings['path']
+    if not hasattr(_connections, 'by_path'):
+        _connections.by_path = {}
+    if path in _connections.by_path:
+        return _connections.by_path[path]
+    connection = sqlite3.connect(path, timeout=30)
+    #readers aren't blocked while ml.py adds a race
+    connection.execute("PRAGMA journal_mode=WAL")
+    with connection:
+        connection.execute(f"""CREATE TABLE IF NOT EXISTS driver_features (
+            driverId INTEGER PRIMARY KEY, code TEXT NOT NULL, raceIdOrdered INTEGER NOT NULL,
+            year INTEGER NOT NULL, {', '.join(f'{column} REAL NOT NULL' for column in FEATURE_COLUMNS)})""")
+        #the drivers of the latest race are looked up by it
+        connection.execute("CREATE INDEX IF NOT EXISTS driver_features_race ON driver_features (raceIdOrdered)")
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    _connections.by_path[path] = connection
+    return connection
+
+def _get_meta(connection, key):
+    row = connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def get_version():
+    #version of the ergast snapshot the table was last updated from, None if it hasn't been filled yet
+    return _get_meta(_connect(), 'dataset_version')
+
+def get_high_water_mark():
+    #raceIdOrdered of the last race added to the table, 0 if there isn't one
+    return int(_get_meta(_connect(), 'high_water_mark') or 0)
+
+def get_feature_build():
+    #base build of the stored feature table (see featurestore) the rows were copied from, None if it isn't known
+    return _get_meta(_connect(), 'feature_build')
+
+def update(rows, dataset_version, high_water_mark, replace=False, feature_build=None):
+    """
+    Add the feature rows (tuples in COLUMNS order) of the races after the high water mark, up to and including
+    the race numbered high_water_mark, replace empties the table first so it can be rebuilt from scratch
+    """
+    connection = _connect()
+    with connection:
+        if replace:
+            connection.execute("DELETE FROM driver_features")
+        #a driver keeps the row of the latest race they were in
+        updates = ', '.join(f'{column} = excluded.{column}' for column in COLUMNS[1:])
+        connection.executemany(
+            f"""INSERT INTO driver_features ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})
+                ON CONFLICT (driverId) DO UPDATE SET {updates}
+                WHERE excluded.raceIdOrdered >= driver_features.raceIdOrdered""", rows)
+        meta = [('dataset_version', dataset_version), ('high_water_mark', str(high_water_mark))]
+        if feature_build is not None:
+            meta.append(('feature_build', feature_build))
+        connection.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", meta)
+
+def get_grid(feature_names):
+    """
+    The drivers of the latest race and their features in the order of feature_names
+    Returns the driver codes and a float32 matrix with a row per driver, ordered by the grid they started on
+    """
+    unknown = set(feature_names) - set(FEATURE_COLUMNS)
+    if unknown:
+        raise ValueError(f"no driver features named {sorted(unknown)}")
+    rows = _connect().execute(
+        f"""SELECT code, {', '.join(feature_names)} FROM driver_features
+            WHERE raceIdOrdered = (SELECT MAX(raceIdOrdered) FROM driver_features)
+            ORDER BY startingPosition, driverId""").fetchall()
+    drivers = [row[0] for row in rows]
+    X = np.array([row[1:] for row in rows], dtype=np.float32).reshape(len(rows), len(feature_names))
+    return drivers, X
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import zipfile
+import requests
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from loguru import logger
+from f1Tracker import singleflight
+
+#local, versioned copy of the ergast database the predictions are trained on
+#the zip is downloaded once and only downloaded again on an explicit refresh when the server says it changed,
+#the four tables ml uses are converted to typed parquet holding only the columns it needs
+#layout: <data dir>/f1db_csv.zip, <data dir>/manifest.json, <data dir>/<version>/<table>.parquet
+
+ERGAST_URL = "https://ergast.com/downloads/f1db_csv.zip"
+
+#bump whenever TABLES changes so snapshots are rebuilt from the stored zip and get a new version
+SCHEMA_VERSION = 1
+
+#columns kept from each csv and their types, strings are kept exactly as ergast writes them (\N included)
+TABLES = {
+    'drivers': {'driverId': 'int32', 'code': 'str', 'nationality': 'str'},
+    'races': {'raceId': 'int32', 'year': 'int16', 'date': 'datetime64[ns]'},
+    'results': {'raceId': 'int32', 'driverId': 'int32', 'grid': 'int16', 'positionOrder': 'int16'},
+    'qualifying': {'raceId': 'int32', 'driverId': 'int32', 'position': 'int16', 'q1': 'str', 'q2': 'str',
+                   'q3': 'str'}
+}
+
+ZIP_FILE = 'f1db_csv.zip'
+MANIFEST_FILE = 'manifest.json'
+
+class DataUnavailableError(Exception):
+    pass
+
+_settings = {
+    'dir': os.getenv('ERGAST_DIR', './ergast_data'),
+    'url': os.getenv('ERGAST_URL', ERGAST_URL),
+    'offline': os.getenv('ERGAST_OFFLINE', '0') == '1'
+}
+
+def configure(data_dir, url=ERGAST_URL, offline=False):
+    #in offline mode the network is never used, only a stored zip or one given to import_zip
+    os.makedirs(data_dir, exist_ok=True)
+    _settings['dir'] = data_dir
+    _settings['url'] = url
+    _settings['offline'] = offline
+
+def _path(*names):
+    return os.path.join(_settings['dir'], *names)
+
+def _read_manifest():
+    try:
+        with open(_path(MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_manifest(manifest):
+    tmp_path = _path(f"{MANIFEST_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, _path(MANIFEST_FILE))
+
+def _is_built(manifest):
+    return (manifest is not None and manifest.get('schema_version') == SCHEMA_VERSION
+            and os.path.isdir(_path(manifest['version'])))
+
+def get_info():
+    #the manifest of the current snapshot or None if there isn't one yet
+    manifest = _read_manifest()
+    return manifest if _is_built(manifest) else None
+
+def get_version():
+    #hash of the zip the current snapshot was built from and the schema it was converted with
+    manifest = get_info()
+    return manifest['version'] if manifest else None
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _read_csv(zip_file, name, columns):
+    members = [info for info in zip_file.infolist() if os.path.basename(info.filename) == f"{name}.csv"]
+    if not members:
+        raise DataUnavailableError(f"{name}.csv is missing from the ergast zip")
+
+    frame = pd.read_csv(zip_file.open(members[0]), usecols=list(columns))
+    for column, dtype in columns.items():
+        if dtype == 'datetime64[ns]':
+            frame[column] = pd.to_datetime(frame[column])
+        elif dtype != 'str':
+            frame[column] = frame[column].astype(dtype)
+    return frame.loc[:, list(columns)]
+
+def _build(zip_digest, source):
+    #convert the stored zip into a snapshot and make it the current one
+    version = hashlib.sha256(f"{zip_digest}-{SCHEMA_VERSION}".encode()).hexdigest()[:16]
+    version_dir = _path(version)
+    if not os.path.isdir(version_dir):
+        #built in a temporary folder first so readers never see half a snapshot
+        tmp_dir = f"{version_dir}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        with zipfile.ZipFile(_path(ZIP_FILE)) as zip_file:
+            for name, columns in TABLES.items():
+                table = pa.Table.from_pandas(_read_csv(zip_file, name, columns), preserve_index=False)
+                pq.write_table(table, os.path.join(tmp_dir, f"{name}.parquet"))
+        os.replace(tmp_dir, version_dir)
+
+    manifest = dict(source, version=version, schema_version=SCHEMA_VERSION, zip_sha256=zip_digest,
+                    built_at=time.time())
+    _write_manifest(manifest)
+    _prune(version)
+    logger.info(f"Ergast snapshot {version} is ready")
+    return manifest
+
+def _prune(version):
+    #older snapshots are removed, readers have their own copy of the tables once they're loaded
+    for name in os.listdir(_settings['dir']):
+        path = _path(name)
+        if name != version and os.path.isdir(path) and not name.endswith('.tmp'):
+            shutil.rmtree(path, ignore_errors=True)
+
+def _download(manifest):
+    #conditional download of the zip, returns whether a new one was stored
+    headers = {}
+    if manifest and manifest.get('etag'):
+        headers['If-None-Match'] = manifest['etag']
+    if manifest and manifest.get('last_modified'):
+        headers['If-Modified-Since'] = manifest['last_modified']
+
+    logger.info(f"Getting {_settings['url']}")
+    with requests.get(_settings['url'], headers=headers, stream=True, timeout=60) as response:
+        if response.status_code == 304:
+            logger.info("The ergast data hasn't changed")
+            _write_manifest(dict(manifest, checked_at=time.time()))
+            return False
+        response.raise_for_status()
+
+        tmp_path = _path(f"{ZIP_FILE}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            for chunk in response.iter_content(1024 * 1024):
+                f.write(chunk)
+        source = {'url': _settings['url'], 'etag': response.headers.get('ETag'),
+                  'last_modified': response.headers.get('Last-Modified'), 'checked_at': time.time()}
+
+    zipfile.ZipFile(tmp_path).close()  #a truncated download fails here rather than replacing a good zip
+    os.replace(tmp_path, _path(ZIP_FILE))
+    _build(_file_digest(_path(ZIP_FILE)), source)
+    return True
+
+def refresh():
+    #ask the server for a newer zip, only downloaded if it changed since the last one
+    if _settings['offline']:
+        raise DataUnavailableError("the ergast data can't be refreshed in offline mode")
+    with singleflight.file_lock('ergast'):
+        manifest = get_info()
+        return _download(manifest)
+
+def import_zip(zip_path):
+    #build the snapshot from a zip that is already on disk, this never uses the network
+    with singleflight.file_lock('ergast'):
+        os.makedirs(_settings['dir'], exist_ok=True)
+        tmp_path = _path(f"{ZIP_FILE}.{os.getpid()}.tmp")
+        shutil.copyfile(zip_path, tmp_path)
+        os.replace(tmp_path, _path(ZIP_FILE))
+        return _build(_file_digest(_path(ZIP_FILE)), {'url': None, 'etag': None, 'last_modified': None,
+                                                       'checked_at': time.time()})
+
+def _ensure_snapshot():
+    manifest = get_info()
+    if manifest:
+        return manifest
+
+    with singleflight.file_lock('ergast'):
+        #another worker may have built it while this one waited for the lock
+        manifest = _read_manifest()
+        if _is_built(manifest):
+            return manifest
+
+        os.makedirs(_settings['dir'], exist_ok=True)
+        if os.path.exists(_path(ZIP_FILE)):
+            #the zip is kept so a schema change only needs it converting again
+            source = {key: (manifest or {}).get(key) for key in ('url', 'etag', 'last_modified', 'checked_at')}
+            return _build(_file_digest(_path(ZIP_FILE)), source)
+        if _settings['offline']:
+            raise DataUnavailableError(f"there is no ergast data in {_settings['dir']} and offline mode is on")
+        _download(None)
+        return _read_manifest()
+
+def _read_table(version, name):
+    #pandas copies the columns, the arrow buffers are freed as they're converted so the table isn't held twice
+    return pq.read_table(_path(version, f"{name}.parquet")).to_pandas(self_destruct=True, split_blocks=True)
+
+def load_snapshot():
+    #(version, {table name: DataFrame}) with every table read from the same snapshot
+    manifest = _ensure_snapshot()
+    try:
+        return manifest['version'], {name: _read_table(manifest['version'], name) for name in TABLES}
+    except FileNotFoundError:
+        #a refresh replaced the snapshot between reading the manifest and the tables
+        manifest = _ensure_snapshot()
+        return manifest['version'], {name: _read_table(manifest['version'], name) for name in TABLES}
+
+def load_table(name):
+    return _read_table(_ensure_snapshot()['version'], name)
@@ -0,0 +1,201 @@
+import os
+import time
+import shutil
+import threading
+import fastf1
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from loguru import logger
+
+#on disk cache of the raw FastF1 timing feeds and the parsed data fastf1 builds from them
+#fastf1 already lays the parsed data out per season: <cache dir>/<year>/<event>/<session>/
+#so least recently used eviction works on whole events inside each season folder
+
+LAST_USED_FILE = '.last_used'
+
+_settings = {
+    'dir': None,
+    'max_bytes': None,
+    'offline': False
+}
+
+def enable(cache_dir, offline=False):
+    #point fastf1 at the cache directory, in offline mode only cached data is ever returned
+    os.makedirs(cache_dir, exist_ok=True)
+    fastf1.Cache.enable_cache(cache_dir)
+    fastf1.Cache.offline_mode(offline)
+    _settings['dir'] = cache_dir
+    _settings['offline'] = offline
+    if offline:
+        logger.info(f"FastF1 cache at {cache_dir} is in offline mode, no network requests will be made")
+
+def configure(config):
+    #set up the cache from the flask app config
+    enable(config['F1_CACHE_DIR'], offline=config['F1_CACHE_OFFLINE'])
+    _settings['max_bytes'] = config['F1_CACHE_MAX_MB'] * 1024 * 1024
+    #checked by the background thread once it's started, not while the app is being imported
+    request_size_check()
+
+def get_cache_dir():
+    return _settings['dir']
+
+def _dir_size(path):
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for file_name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, file_name))
+            except OSError:
+                pass  #file removed while walking
+    return size
+
+def _last_used(event_dir):
+    #events are touched every time one of their sessions is loaded, the folder time is the fallback
+    marker = os.path.join(event_dir, LAST_USED_FILE)
+    if os.path.exists(marker):
+        return os.path.getmtime(marker)
+    return os.path.getmtime(event_dir)
+
+def get_event_dirs():
+    #every <year>/<event> folder in the cache
+    cache_dir = _settings['dir']
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return []
+
+    event_dirs = []
+    for season in os.listdir(cache_dir):
+        season_dir = os.path.join(cache_dir, season)
+        if not (season.isdigit() and os.path.isdir(season_dir)):
+            continue
+        for event in os.listdir(season_dir):
+            event_dir = os.path.join(season_dir, event)
+            if os.path.isdir(event_dir):
+                event_dirs.append(event_dir)
+    return event_dirs
+
+def mark_used(session):
+    #record that a session was used so it is evicted last
+    cache_dir = _settings['dir']
+    if not cache_dir:
+        return
+
+    #api_path looks like /static/2024/2024-03-02_Bahrain_Grand_Prix/2024-03-02_Race/
+    event_path = os.path.dirname(session.api_path.rstrip('/'))
+    event_dir = os.path.join(cache_dir, event_path[len('/static/'):])
+    if os.path.isdir(event_dir):
+        with open(os.path.join(event_dir, LAST_USED_FILE), 'a'):
+            os.utime(os.path.join(event_dir, LAST_USED_FILE))
+
+def enforce_size_limit():
+    #delete the least recently used events until the cache fits within its size limit
+    cache_dir = _settings['dir']
+    max_bytes = _settings['max_bytes']
+    if not cache_dir or max_bytes is None:
+        return 0
+
+    total = _dir_size(cache_dir)
+    if total <= max_bytes:
+        return 0
+
+    evicted = 0
+    for event_dir in sorted(get_event_dirs(), key=_last_used):
+        if total <= max_bytes:
+            break
+        size = _dir_size(event_dir)
+        shutil.rmtree(event_dir, ignore_errors=True)
+        total -= size
+        evicted += 1
+        logger.info(f"Evicted {event_dir} ({size} bytes) from the FastF1 cache")
+
+    if total > max_bytes:
+        logger.warning(f"FastF1 cache is still {total} bytes after evicting {evicted} events, "
+                       f"the HTTP cache database may need clearing")
+    return evicted
+
+#walking the cache takes as long as the cache is big, so loading a session only asks for a check
+#and a background thread started by the app walks it, when asked and every interval seconds anyway
+_size_checks = {'thread': None, 'stop': None, 'requested': threading.Event()}
+_size_checks_lock = threading.Lock()
+
+def request_size_check():
+    _size_checks['requested'].set()
+
+def _check_size(interval, stop):
+    while not stop.is_set():
+        _size_checks['requested'].wait(interval)
+        if stop.is_set():
+            return
+        _size_checks['requested'].clear()
+        try:
+            enforce_size_limit()
+        except Exception as e:
+            logger.error(f"Error enforcing the FastF1 cache size limit: {e}")
+
+def start_size_checks(interval):
+    #only the first call starts the thread
+    if _size_checks['thread'] is not None:
+        return
+    with _size_checks_lock:
+        if _size_checks['thread'] is None:
+            stop = threading.Event()
+            thread = threading.Thread(target=_check_size, args=(interval, stop), name='f1-cache-size', daemon=True)
+            thread.start()
+            _size_checks.update(thread=thread, stop=stop)
+
+def stop_size_checks(timeout=5):
+    #stop the background thread so it can be started again, e.g. with another interval in the tests
+    with _size_checks_lock:
+        thread, stop = _size_checks['thread'], _size_checks['stop']
+        _size_checks.update(thread=None, stop=None)
+    if thread is not None:
+        stop.set()
+        _size_checks['requested'].set()
+        thread.join(timeout)
+
+def get_cache_info():
+    return {
+        'dir': _settings['dir'],
+        'bytes': _dir_size(_settings['dir']) if _settings['dir'] else 0,
+        'max_bytes': _settings['max_bytes'],
+        'events': len(get_event_dirs()),
+        'offline': _settings['offline']
+    }
+
+def _prefetch_session(year, round_number, session_type):
+    #runs in a worker process, loads every part of the session so any graph can be served from the cache
+    start = time.perf_counter()
+    try:
+        session = fastf1.get_session(year, round_number, session_type)
+        session.load()
+        mark_used(session)
+        return round_number, session_type, True, time.perf_counter() - start
+    except Exception as e:
+        logger.error(f"Error prefetching {year} round {round_number} {session_type}: {e}")
+        return round_number, session_type, False, time.perf_counter() - start
+
+def get_completed_rounds(year):
+    #rounds of a season that have already happened, testing is skipped
+    schedule = fastf1.get_event_schedule(year, include_testing=False)
+    completed = schedule[schedule['EventDate'] < pd.Timestamp.now()]
+    return [int(round_number) for round_number in completed['RoundNumber']]
+
+def prefetch(year, session_types, workers=None):
+    #fill the cache for every completed round of a season in parallel worker processes
+    cache_dir = _settings['dir']
+    if not cache_dir:
+        raise RuntimeError("The FastF1 cache has not been enabled")
+    if _settings['offline']:
+        raise RuntimeError("Can't prefetch while the FastF1 cache is in offline mode")
+
+    rounds = get_completed_rounds(year)
+    logger.info(f"Prefetching {session_types} for {len(rounds)} rounds of {year}")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=enable, initargs=(cache_dir,)) as executor:
+        futures = [executor.submit(_prefetch_session, year, round_number, session_type)
+                   for round_number in rounds for session_type in session_types]
+        for future in as_completed(futures):
+            results.append(future.result())
+
+    enforce_size_limit()
+    return sorted(results)
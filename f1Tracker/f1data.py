@@ -1,64 +1,197 @@
+import time
+import threading
 import fastf1
-import fastf1.mvapi
 from loguru import logger
-from datetime import datetime
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
 from io import BytesIO
-import fastf1.plotting
-import pandas as pd
-from timple.timedelta import strftimedelta
-from fastf1.core import Laps
 import matplotlib
-import seaborn as sns
-import numpy as np
-from matplotlib import colormaps
-from matplotlib.collections import LineCollection
 from abc import ABC, abstractmethod
-from f1Tracker import ml
+from f1Tracker import ergast
+from f1Tracker import f1cache
+from f1Tracker import lapstore
+from f1Tracker import modelstore
+from f1Tracker import predict
+from f1Tracker import singleflight
+from f1Tracker import render
+from f1Tracker import graphdata
+from f1Tracker.graphdata import dataset_cache
+from f1Tracker.singleflight import SingleFlight
+from f1Tracker.sessions import session_cache, load_flags, attach_fastest_lap_telemetry, FASTEST_LAP_TELEMETRY
+from f1Tracker.sessions import can_set_private_attributes, set_laps
 from datetime import timedelta
 
 #set matplotlib to non GUI to save resources
 matplotlib.use('Agg')
 
+#the data each graph actually uses from its session so only that gets loaded
+#telemetry, weather and race control messages are the slowest and biggest parts of a load
+LAPS_ONLY = frozenset(['laps'])
+#race control messages are needed in qualifying to mark deleted lap times, otherwise they could be the fastest lap
+LAPS_AND_MESSAGES = frozenset(['laps', 'messages'])
+LAPS_AND_FASTEST_LAP_TELEMETRY = frozenset(['laps', 'messages', FASTEST_LAP_TELEMETRY])
+
+GRAPH_DATA_REQUIREMENTS = {
+    "Position Changed during a Race": LAPS_ONLY,
+    "Qualifying Results Overview": LAPS_AND_MESSAGES,
+    "Team Pace Comparison": LAPS_ONLY,
+    "Driver Laptime Comparison": LAPS_ONLY,
+    "Gear Shifts on Track": LAPS_AND_FASTEST_LAP_TELEMETRY,
+    "Tyre Strategies During a Race": LAPS_ONLY
+}
+
+#graph type -> (session type, method that draws it), in the order the graphs are shown on the website
+GRAPH_METHODS = {
+    "Position Changed during a Race": ('R', 'get_positions_change_during_a_race'),
+    "Qualifying Results Overview": ('Q', 'get_quali_results_overview'),
+    "Team Pace Comparison": ('R', 'get_team_pace_comparison'),
+    "Driver Laptime Comparison": ('R', 'get_driver_laptime_comparison'),
+    "Gear Shifts on Track": ('Q', 'get_gear_shifts'),
+    "Tyre Strategies During a Race": ('R', 'get_tyre_strategies')
+}
+
+#concurrent requests for the same graph share one render
+_render_flights = SingleFlight()
+
+def render_graph(f1_data, graph_type, grand_prix, figsize=(15, 10), theme='dark'):
+    #f1_data maps a session type to the F1Data object that draws its graphs e.g. {'R': F1RaceData(), 'Q': F1QualiData()}
+    session_type, method = GRAPH_METHODS[graph_type]
+    data = f1_data[session_type]
+    image = _render_flights.do((data.year, graph_type, grand_prix, tuple(figsize), theme),
+                               lambda: getattr(data, method)(grand_prix, figsize, theme).getvalue())
+    #every caller gets its own buffer to read from
+    return BytesIO(image)
+
+#how long to wait before asking fastf1 for the schedule again after loading it failed
+SCHEDULE_RETRY_SECONDS = 60
+
+class Schedule():
+    """
+    The season's events and the upcoming event, shared by every F1Data object
+    Loaded from fastf1 the first time it's needed (or by the app's warm-up thread) rather than on import
+    """
+    def __init__(self, year):
+        self.year = year
+        self.upcoming_event = None
+        self.events = {}
+        self.previous_round_number = None
+        self.loaded = False
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        #returns whether the schedule is loaded, a failed load is only tried again after SCHEDULE_RETRY_SECONDS
+        if self.loaded:
+            return True
+        with self._lock:
+            if self.loaded:
+                return True
+            if self._failed_at is not None and time.monotonic() - self._failed_at < SCHEDULE_RETRY_SECONDS:
+                return False
+
+            try:
+                #get remaining events
+                remaining_events = fastf1.get_events_remaining()
+                if not remaining_events.empty:
+                    upcoming_event = remaining_events.iloc[0].to_dict()
+                    logger.info(f"The upcoming event {upcoming_event} is being used")
+                else:
+                    upcoming_event = None
+                    logger.warning("No upcoming events found.")
+
+                #get event schedule
+                event_schedule = fastf1.get_event_schedule(self.year)
+                if 'EventName' in event_schedule:
+                    events = event_schedule['EventName'].to_dict()
+                    logger.info(f"Events: {events}")
+                else:
+                    events = {}
+                    logger.warning("Unable to get events.")
+
+                #calculate the previous round number
+                #if there is no upcoming event or the upcoming event is into the next season then the last event gets picked
+                if (upcoming_event == None) or ("2025" in str(upcoming_event.get("EventDate", 'N/A'))):
+                    previous_round_number = list(events.keys())[-1]
+                else:
+                    previous_round_number = (upcoming_event.get('RoundNumber', 1) - 1)
+
+            except Exception as e:
+                logger.error(f"Error retrieving F1 data: {e}")
+                self._failed_at = time.monotonic()
+                return False
+
+            self.upcoming_event = upcoming_event
+            self.events = events
+            self.previous_round_number = previous_round_number
+            self.loaded = True
+            return True
+
+schedule = Schedule(2024)
+
+def load_predictions():
+    #importing ml downloads the ergast data and builds its features, so it is only imported to train the models,
+    #the predictions themselves are made by predict.py from the saved models
+    from f1Tracker import ml
+    return ml
+
+#the thread importing ml and training the models when a request found none to serve
+_training = {'thread': None}
+_training_lock = threading.Lock()
+
+def _ensure_models():
+    try:
+        load_predictions().ensure_models()
+    except Exception as e:
+        logger.error(f"Couldn't start training the prediction models: {e}")
+
+def start_training():
+    #importing ml takes as long as building the features so it is done on its own thread, never on a request
+    with _training_lock:
+        thread = _training['thread']
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_ensure_models, name='prediction-models', daemon=True)
+            thread.start()
+            _training['thread'] = thread
+        return thread
+
+def get_predictions(name):
+    #the rankings and accuracy of the served model, if there isn't one yet training starts in the background
+    #and the request is told straight away
+    try:
+        return predict.get_rankings(name)
+    except modelstore.ModelNotReadyError:
+        start_training()
+        raise
+
+def warm_up_predictions():
+    #for the warm-up thread, models trained on the current ergast snapshot are all that's needed,
+    #otherwise import ml and wait for its models to be trained
+    if predict.models_ready(ergast.get_version()):
+        return
+    ml = load_predictions()
+    ml.ensure_models(wait=True)
+    if not ml.models_ready():
+        raise RuntimeError("the prediction models couldn't be trained")
+
 class F1Data(ABC):
     def __init__(self):
-        try:
-            #set the year 
-            self.year = 2024
-
-            #get remaining events
-            remaining_events = fastf1.get_events_remaining()
-            if not remaining_events.empty:
-                self.upcoming_event = remaining_events.iloc[0].to_dict()
-                logger.info(f"The upcoming event {self.upcoming_event} is being used")
-            else:
-                self.upcoming_event = None
-                logger.warning("No upcoming events found.")
-
-            #get event schedule
-            event_schedule = fastf1.get_event_schedule(self.year)
-            if 'EventName' in event_schedule:
-                self.events = event_schedule['EventName'].to_dict()
-                logger.info(f"Events: {self.events}")
-            else:
-                self.events = {}
-                logger.warning("Unable to get events.")
-
-            #calculate the previous round number 
-            #if there is no upcoming event or the upcoming event is into the next season then the last event gets picked
-            if (self.upcoming_event == None) or ("2025" in str(self.upcoming_event.get("EventDate", 'N/A'))):
-                self.previous_round_number = list(self.events.keys())[-1]
-            else:
-                self.previous_round_number = (self.upcoming_event.get('RoundNumber', 1) - 1)
+        #set the year
+        self.year = schedule.year
+
+    #the schedule is loaded the first time any of these are used
+    @property
+    def upcoming_event(self):
+        schedule.load()
+        return schedule.upcoming_event
+
+    @property
+    def events(self):
+        schedule.load()
+        return schedule.events
+
+    @property
+    def previous_round_number(self):
+        schedule.load()
+        return schedule.previous_round_number
 
-        except Exception as e:
-            logger.error(f"Error retrieving F1 data: {e}")
-            self.upcoming_event = None
-            self.events = {}
-            self.previous_round_number = None
-        
     def get_events(self):
         try:
             #filter and reverse events
@@ -77,6 +210,77 @@ class F1Data(ABC):
 
     def get_last_grand_prix(self):
         return self.previous_round_number
+
+    def get_round_number(self, grand_prix):
+        #graphs are requested by event name, turn it into the round number so the same
+        #session is always cached under the same key
+        if not isinstance(grand_prix, str):
+            return int(grand_prix)
+        for round_number, event_name in self.events.items():
+            if event_name == grand_prix:
+                return round_number
+        #unknown names are left for fastf1 to fuzzy match
+        return grand_prix
+
+    def load_session(self, grand_prix, session_type, parts):
+        #load a session through the shared session cache so every graph for a Grand Prix reuses one load
+        round_number = self.get_round_number(grand_prix)
+
+        key = (self.year, round_number, session_type)
+
+        def loader(load_parts):
+            #other workers loading the same session wait here and then read it back from the lap store
+            with singleflight.file_lock(f"session-{self.year}-{round_number}-{session_type}"):
+                #laps and fastest lap telemetry stored from an earlier load don't need fastf1 to rebuild them
+                #only laps stored from a load with the parts asked for now (see lapstore) are used
+                stored_laps = None
+                if 'laps' in load_parts and can_set_private_attributes():
+                    stored_laps = lapstore.read_laps(key, load_parts)
+                stored_telemetry = None
+                fastest_lap_only = FASTEST_LAP_TELEMETRY in load_parts and 'telemetry' not in load_parts
+                if fastest_lap_only and stored_laps is not None:
+                    stored_telemetry = lapstore.read_fastest_lap_telemetry(key)
+
+                fastf1_parts = set(load_parts)
+                if stored_laps is not None:
+                    fastf1_parts.discard('laps')
+                if stored_telemetry is not None:
+                    fastf1_parts.discard(FASTEST_LAP_TELEMETRY)
+
+                session = fastf1.get_session(self.year, round_number, session_type)
+                session.load(**load_flags(fastf1_parts))
+
+                if stored_laps is not None:
+                    set_laps(session, stored_laps)
+                elif 'laps' in load_parts:
+                    lapstore.write_laps(key, session, fastf1_parts)
+
+                if fastest_lap_only:
+                    attach_fastest_lap_telemetry(session, stored_telemetry)
+                    if stored_telemetry is None:
+                        lapstore.write_fastest_lap_telemetry(key, session, session.fastest_lap_telemetry)
+
+                f1cache.mark_used(session)
+                f1cache.request_size_check()
+                return session
+
+        return session_cache.get(key, parts, loader)
+
+    def load_graph_session(self, grand_prix, graph_type):
+        #load the session for a graph with only the data declared in GRAPH_DATA_REQUIREMENTS
+        return self.load_session(grand_prix, self.session_type, GRAPH_DATA_REQUIREMENTS[graph_type])
+
+    def get_dataset_key(self, grand_prix, graph_type):
+        return (self.year, self.get_round_number(grand_prix), graph_type)
+
+    def get_graph_dataset(self, grand_prix, graph_type):
+        #the data a graph is drawn from, the session is only loaded when it isn't in the dataset cache
+        return dataset_cache.get(self.get_dataset_key(grand_prix, graph_type), lambda: graphdata.EXTRACTORS[graph_type](
+            self.load_graph_session(grand_prix, graph_type), self.year, grand_prix))
+
+    def peek_graph_dataset(self, grand_prix, graph_type):
+        #the dataset if it has already been extracted, otherwise None
+        return dataset_cache.peek(self.get_dataset_key(grand_prix, graph_type))
     
     @abstractmethod
     def predictions(self):
@@ -93,227 +297,23 @@ class F1RaceData(F1Data):
         self.session_type = 'R'
 
     def predictions(self):
-        return ml.getRacePredictions()
+        return get_predictions('race')
 
-    def get_positions_change_during_a_race(self, grand_prix):
-        fastf1.plotting.setup_mpl(mpl_timedelta_support=True, misc_mpl_mods=False,
-                          color_scheme='fastf1')
-        
-        #load the session for the current round
-        session = fastf1.get_session(self.year, grand_prix, self.session_type)
-        session.load(telemetry=False, weather=False)
-
-        #create the figure and axis
-        fig, ax = plt.subplots(figsize=(15, 10))
-
-        #plot driver positions
-        for driver in session.drivers:
-            driver_laps = session.laps.pick_driver(driver)
-            driver_code = driver_laps['Driver'].iloc[0]  # Get driver abbreviation
-            style = fastf1.plotting.get_driver_style(identifier=driver_code,
-                                             style=['color', 'linestyle'],
-                                             session=session)
-            
-            ax.plot(driver_laps['LapNumber'], driver_laps['Position'], label=driver_code, **style)
-
-        #customize the plot axis
-        ax.set_ylim([20.5, 0.5])
-        ax.set_yticks([1, 5, 10, 15, 20])
-        ax.set_xlabel('Lap')
-        ax.set_ylabel('Position')
-        ax.legend(bbox_to_anchor=(1.0, 1.02))
-
-        #set title
-        plt.suptitle(f"{session.event['EventName']} {self.year} Positions Changed During a Race")
-
-        buf = BytesIO()
-        fig.savefig(buf, format="png")
-        buf.seek(0)
-        plt.close(fig)
-        return buf
-    
-    def get_team_pace_comparison(self, grand_prix):
-        #load FastF1's dark color scheme
-        fastf1.plotting.setup_mpl(mpl_timedelta_support=False, misc_mpl_mods=False,
-                          color_scheme='fastf1')
-        
-        #choose race laps (within 107% of fastest lap so that slow laps don't skew the data).
-        #for races with mixed conditions the slowest part of the session will be excluded
-        session = fastf1.get_session(self.year, grand_prix, self.session_type)
-        session.load()
-        laps = session.laps.pick_quicklaps()
-
-        #convert the lap time column from timedelta to integer.
-        transformed_laps = laps.copy()
-        transformed_laps.loc[:, "LapTime (s)"] = laps["LapTime"].dt.total_seconds()
-
-        #order the team from the fastest (lowest median lap time excluding slow laps) to the slowest 
-        team_order = (
-            transformed_laps[["Team", "LapTime (s)"]]
-            .groupby("Team")
-            .median()["LapTime (s)"]
-            .sort_values()
-            .index
-        )
-
-        #make a color palette associating team names to hex codes
-        team_palette = {team: fastf1.plotting.get_team_color(team, session=session)
-                        for team in team_order}
+    def get_positions_change_during_a_race(self, grand_prix, figsize=(15, 10), theme='dark'):
+        dataset = self.get_graph_dataset(grand_prix, "Position Changed during a Race")
+        return render.draw_positions_change_during_a_race(dataset, figsize, theme)
 
-    
-        fig, ax = plt.subplots(figsize=(15, 10))
-        sns.boxplot(
-            data=transformed_laps,
-            x="Team",
-            y="LapTime (s)",
-            hue="Team",
-            order=team_order,
-            palette=team_palette,
-            whiskerprops=dict(color="white"),
-            boxprops=dict(edgecolor="white"),
-            medianprops=dict(color="grey"),
-            capprops=dict(color="white"),
-        )
-
-        plt.suptitle(f"{self.year} {session.event['EventName']} Team Pace Comparison")
-        plt.grid(visible=False)
-
-        #x axis is doesn't do anything for team pace comparison as it is just a comparison and so its all relative
-        ax.set(xlabel=None)
-        plt.tight_layout()
-        buf = BytesIO()
-        fig.savefig(buf, format="png")
-        buf.seek(0)
-        plt.close(fig)
-        return buf
-
-    def get_driver_laptime_comparison(self,grand_prix):
-        #enable Matplotlib patches for plotting timedelta values and load
-        #fastF1's dark color scheme
-        fastf1.plotting.setup_mpl(mpl_timedelta_support=True, misc_mpl_mods=False,
-                                color_scheme='fastf1')
-
-
-        #load the race session
-
-        race = fastf1.get_session(self.year, grand_prix , self.session_type)
-        race.load()
-
-  
-        #get laps for top 10 (points).
-        #remove slow laps (eg. yellow flag, VSC, SC, pitstops etc.) as they make the graph axis look whack.
-        point_finishers = race.drivers[:10]
-        driver_laps = race.laps.pick_drivers(point_finishers).pick_quicklaps()
-        driver_laps = driver_laps.reset_index()
-
-        #get driver codes in the finishing order do display them on the graph.
-        finishing_order = [race.get_driver(i)["Abbreviation"] for i in point_finishers]
-
-        #violin plots to show the distributions then I use swarm plot to show the actual laptimes.
-        #create the figure
-        fig, ax = plt.subplots(figsize=(15, 10))
-
-        #convert timedelta to float (in seconds) for seaborn
-        driver_laps["LapTime(s)"] = driver_laps["LapTime"].dt.total_seconds()
-
-        sns.violinplot(data=driver_laps,
-                    x="Driver",
-                    y="LapTime(s)",
-                    hue="Driver",
-                    inner=None,
-                    density_norm="area",
-                    order=finishing_order,
-                    palette=fastf1.plotting.get_driver_color_mapping(session=race)
-                    )
-
-        sns.swarmplot(data=driver_laps,
-                    x="Driver",
-                    y="LapTime(s)",
-                    order=finishing_order,
-                    hue="Compound",
-                    palette=fastf1.plotting.get_compound_mapping(session=race),
-                    hue_order=["SOFT", "MEDIUM", "HARD"],
-                    linewidth=0,
-                    size=4,
-                    )
-       
-        #make the plot more aesthetic
-        ax.set_xlabel("Driver")
-        ax.set_ylabel("Lap Time (s)")
-        plt.suptitle(f"{self.year} {grand_prix} Lap Time Distributions")
-        sns.despine(left=True, bottom=True)
-
-        plt.tight_layout()
-        buf = BytesIO()
-        fig.savefig(buf, format="png")
-        buf.seek(0)
-        plt.close(fig)
-        return buf
-    
-    def get_tyre_strategies(self, grand_prix):
+    def get_team_pace_comparison(self, grand_prix, figsize=(15, 10), theme='dark'):
+        dataset = self.get_graph_dataset(grand_prix, "Team Pace Comparison")
+        return render.draw_team_pace_comparison(dataset, figsize, theme)
 
-        #load the race session
-        session = fastf1.get_session(self.year, grand_prix, self.session_type)
-        session.load()
-        laps = session.laps
+    def get_driver_laptime_comparison(self, grand_prix, figsize=(15, 10), theme='dark'):
+        dataset = self.get_graph_dataset(grand_prix, "Driver Laptime Comparison")
+        return render.draw_driver_laptime_comparison(dataset, figsize, theme)
 
-        
-        #get the list of driver numbers
-        drivers = session.drivers
-
-        #convert the driver numbers to three letter abbreviations
-        drivers = [session.get_driver(driver)["Abbreviation"] for driver in drivers]
-
-        #works out the stint length and compound used for every stint by every driver 
-        stints = laps[["Driver", "Stint", "Compound", "LapNumber"]]
-        stints = stints.groupby(["Driver", "Stint", "Compound"]) #groups same values in each column
-        stints = stints.count().reset_index() #pandas function to count each row and then converts into 0 indexing
-
-        #the number in the LapNumber column now stands for the number of observations
-        #in that group aka the stint length.
-        stints = stints.rename(columns={"LapNumber": "StintLength"})
-
-        #now we can plot the strategies for each driver
-        fig, ax = plt.subplots(figsize=(15, 10))
-
-        for driver in drivers:
-            driver_stints = stints.loc[stints["Driver"] == driver]
-
-            previous_stint_end = 0
-            for idx, row in driver_stints.iterrows():
-                #each row contains the compound name and stint length
-                #we can use these information to draw horizontal bars
-                compound_color = fastf1.plotting.get_compound_color(row["Compound"],
-                                                                    session=session)
-                plt.barh(
-                    y=driver,
-                    width=row["StintLength"],
-                    left=previous_stint_end,
-                    color=compound_color,
-                    edgecolor="black",
-                    fill=True
-                )
-
-                previous_stint_end += row["StintLength"]
-                
-        #make the plot more readable and intuitive
-        plt.suptitle(f"{self.year} {session.event['EventName']} Strategies")
-        plt.xlabel("Lap Number")
-        plt.grid(False)
-        #invert the y-axis so drivers that finish higher are closer to the top
-        ax.invert_yaxis()
-
-        #plot aesthetics
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['left'].set_visible(False)
-
-        plt.tight_layout()
-        buf = BytesIO()
-        fig.savefig(buf, format="png")
-        buf.seek(0)
-        plt.close(fig)
-        return buf
+    def get_tyre_strategies(self, grand_prix, figsize=(15, 10), theme='dark'):
+        dataset = self.get_graph_dataset(grand_prix, "Tyre Strategies During a Race")
+        return render.draw_tyre_strategies(dataset, figsize, theme)
 
 class F1QualiData(F1Data):
 
@@ -322,114 +322,15 @@ class F1QualiData(F1Data):
         self.session_type = 'Q'
 
     def predictions(self):
-        return ml.getQualiPredictions()
+        return get_predictions('quali')
 
-    def get_quali_results_overview(self, grand_prix):
-        fastf1.plotting.setup_mpl(mpl_timedelta_support=True, misc_mpl_mods=False, color_scheme='fastf1')
-        
-        session = fastf1.get_session(self.year, grand_prix, self.session_type)
-        session.load()
-        drivers = pd.unique(session.laps['Driver'])
-        logger.debug(drivers)
-
-        list_fastest_laps = list()
-        for drv in drivers:
-            drvs_fastest_lap = session.laps.pick_driver(drv).pick_fastest()
-            list_fastest_laps.append(drvs_fastest_lap)
-
-        fastest_laps = Laps(list_fastest_laps) \
-            .sort_values(by='LapTime') \
-            .reset_index(drop=True)
-        pole_lap = fastest_laps.pick_fastest()
-        fastest_laps['LapTimeDelta'] = fastest_laps['LapTime'] - pole_lap['LapTime']
-        logger.debug(fastest_laps[['Driver', 'LapTime', 'LapTimeDelta']])
-
-        team_colors = list()
-        for index, lap in fastest_laps.iterlaps():
-            color = fastf1.plotting.get_team_color(lap['Team'], session=session)
-            team_colors.append(color)
-
-        fig, ax = plt.subplots(figsize=(15, 10))
-
-        ax.barh(fastest_laps.index, fastest_laps['LapTimeDelta'],
-                color=team_colors, edgecolor='grey')
-        ax.set_yticks(fastest_laps.index)
-        ax.set_yticklabels(fastest_laps['Driver'])
-
-        #show fastest at the top
-        ax.invert_yaxis()
-
-        #draw vertical lines behind the bars
-        ax.set_axisbelow(True)
-        ax.xaxis.grid(True, which='major', linestyle='--', color='black', zorder=-1000)
-
-        lap_time_string = strftimedelta(pole_lap['LapTime'], '%m:%s.%ms')
-
-        plt.suptitle(f"{session.event['EventName']} {self.year} Qualifying\n"
-                    f"Fastest Lap: {lap_time_string} ({pole_lap['Driver']})")
-
-        buf = BytesIO()
-        fig.savefig(buf, format="png")
-        buf.seek(0)
-        plt.close(fig)
-        return buf
-    
-    def get_gear_shifts(self,grand_prix):
-        
-        #enable Matplotlib patches for plotting timedelta values and load
-        #load FastF1's dark color scheme to fit colour scheme
-        fastf1.plotting.setup_mpl(mpl_timedelta_support=False, misc_mpl_mods=False,
-                            color_scheme='fastf1')
-        session = fastf1.get_session(self.year, grand_prix, self.session_type)
-        session.load()
-
-        lap = session.laps.pick_fastest()
-        tel = lap.get_telemetry()
-       
-        #prepare the data for plotting by converting it to the appropriate numpy data types
-
-        x = np.array(tel['X'].values)
-        y = np.array(tel['Y'].values)
-
-        points = np.array([x, y]).T.reshape(-1, 1, 2)
-        segments = np.concatenate([points[:-1], points[1:]], axis=1)
-        gear = tel['nGear'].to_numpy().astype(float)
-
-        #create figure and axis
-        fig, ax = plt.subplots(figsize=(15, 10))
-    
-        #create a line collection. Set a segmented colormap and normalize the plot
-        #to full integer values of the colormap
-
-        cmap = colormaps['Paired']
-        lc_comp = LineCollection(segments, norm=plt.Normalize(1, cmap.N+1), cmap=cmap)
-        lc_comp.set_array(gear)
-        lc_comp.set_linewidth(4)
-
-        #plot        
-        plt.gca().add_collection(lc_comp)
-        plt.axis('equal')
-        plt.tick_params(labelleft=False, left=False, labelbottom=False, bottom=False)
-
-        plt.suptitle(
-            f"Fastest Lap Gear Shift Visualization\n"
-            f"{lap['Driver']} - {session.event['EventName']} {self.year}"
-        )
-        
-        #add a colorbar to the plot. Shift the colorbar ticks by +0.5 so that they
-        #are centered for each color segment.
-
-        cbar = plt.colorbar(mappable=lc_comp, label="Gear",
-                            boundaries=np.arange(1, 10))
-        cbar.set_ticks(np.arange(1.5, 9.5))
-        cbar.set_ticklabels(np.arange(1, 9))
+    def get_quali_results_overview(self, grand_prix, figsize=(15, 10), theme='dark'):
+        dataset = self.get_graph_dataset(grand_prix, "Qualifying Results Overview")
+        return render.draw_quali_results_overview(dataset, figsize, theme)
 
-
-        buf = BytesIO()
-        fig.savefig(buf, format="png")
-        buf.seek(0)
-        plt.close(fig)
-        return buf
+    def get_gear_shifts(self, grand_prix, figsize=(15, 10), theme='dark'):
+        dataset = self.get_graph_dataset(grand_prix, "Gear Shifts on Track")
+        return render.draw_gear_shifts(dataset, figsize, theme)
 
 #this allows other classes to use the F1Data class without having to implement the predictions method
 class CoreF1Data(F1Data):
@@ -471,8 +372,13 @@ class F1UpcomingData():
                 if "Testing" in upcoming_event.get('EventName', 'N/A'):
                     test_number = 1  
                     session_number = 1  
-                    testing_session = fastf1.get_testing_session(self.f1_data.year, test_number, session_number)
-                    testing_session.load(laps=True, telemetry=False, weather=False, messages=False)
+                    def load_testing_session(load_parts):
+                        testing_session = fastf1.get_testing_session(self.f1_data.year, test_number, session_number)
+                        testing_session.load(**load_flags(load_parts))
+                        return testing_session
+
+                    testing_session = session_cache.get((self.f1_data.year, f"Testing {test_number}", session_number),
+                                                        ['laps'], load_testing_session)
                     fastest_lap = testing_session.laps.pick_fastest().to_dict()
                     lap_time = fastest_lap.get('LapTime', 'N/A')
                     circuit_info = testing_session.get_circuit_info()
@@ -480,8 +386,7 @@ class F1UpcomingData():
                     corner_count = len(corners)
                     
                 else:
-                    last_circuit_info = fastf1.get_session((int(self.f1_data.year)), upcoming_event['RoundNumber'], 'R')
-                    last_circuit_info.load(laps=True, telemetry=False, weather=False, messages=False)
+                    last_circuit_info = self.f1_data.load_session(upcoming_event['RoundNumber'], 'R', ['laps'])
                     fastest_lap = last_circuit_info.laps.pick_fastest().to_dict()
                     lap_time = fastest_lap.get('LapTime', 'N/A')
                     circuit_info = last_circuit_info.get_circuit_info()
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+#feature engineering for the prediction models, plain functions over the ergast tables so they can be
+#tested and benchmarked without running the whole ml pipeline
+#build_features can carry on from the races it built before (see featurestore.py), every feature of a row
+#only depends on that row and its driver's career before it, which get_driver_state keeps
+
+#bump whenever the features change so stored feature tables are built again from scratch
+FEATURE_VERSION = 1
+
+#the columns of the feature table and their types, so the rows of a few new races have the same types as
+#the rows built from the whole history (the nationality of an unknown driver is '0')
+FEATURE_DTYPES = {
+    'raceId': 'int32', 'driverId': 'int32', 'startingPosition': 'int16', 'racePosition': 'int16', 'year': 'int16',
+    'raceIdOrdered': 'int32', 'yearStarted': 'int16', 'driverExpRaces': 'int32', 'driverPriorWins': 'int32',
+    'driverPriorPodiums': 'int32', 'qualiResultPosition': 'int16', 'nationality': 'str', 'q1Msec': 'int32',
+    'q2Msec': 'int32', 'q3Msec': 'int32', 'maxPace': 'int32', 'meanPace': 'float64', 'driverExpYears': 'int16'
+}
+
+#each driver's career up to the last race built, indexed by driverId
+STATE_COLUMNS = ['yearStarted', 'races', 'wins', 'podiums']
+
+def add_driver_history(results, state=None):
+    """
+    Add each driver's running career counts to results, which must be in race order
+    driverExpRaces counts the races a driver has started including this one, driverPriorWins and
+    driverPriorPodiums count their wins and podiums before it
+    state is the drivers' careers before the first of these results (see get_driver_state), if they aren't
+    the whole history
+    """
+    drivers = results.groupby('driverId', sort=False)
+    results['driverExpRaces'] = drivers.cumcount() + 1
+
+    wins = (results['racePosition'] == 1).astype('int32')
+    podiums = (results['racePosition'] <= 3).astype('int32')
+    results['driverPriorWins'] = wins.groupby(results['driverId'], sort=False).cumsum() - wins
+    results['driverPriorPodiums'] = podiums.groupby(results['driverId'], sort=False).cumsum() - podiums
+
+    if state is not None and len(state):
+        #carry on counting from where the earlier races left off
+        prior = state.reindex(results['driverId'].to_numpy()).fillna(0)
+        results['driverExpRaces'] += prior['races'].to_numpy(dtype=np.int64)
+        results['driverPriorWins'] += prior['wins'].to_numpy(dtype=np.int32)
+        results['driverPriorPodiums'] += prior['podiums'].to_numpy(dtype=np.int32)
+    return results
+
+def get_driver_state(results, state=None):
+    #the drivers' careers after results (with the year column), added on to their careers before them
+    careers = results.assign(wins=(results['racePosition'] == 1).astype('int32'),
+                             podiums=(results['racePosition'] <= 3).astype('int32'))
+    careers = careers.groupby('driverId').agg(yearStarted=('year', 'min'), races=('year', 'size'),
+                                              wins=('wins', 'sum'), podiums=('podiums', 'sum'))
+    if state is not None:
+        careers = pd.concat([state, careers]).groupby(level=0).agg(
+            {'yearStarted': 'min', 'races': 'sum', 'wins': 'sum', 'podiums': 'sum'})
+    return careers.astype({'yearStarted': 'int16', 'races': 'int32', 'wins': 'int32', 'podiums': 'int32'})
+
+#milliseconds in each part of a lap time written m:ss.sss
+LAP_TIME_PATTERN = r'^(\d+):(\d+)\.(\d+)$'
+LAP_TIME_PART_MSEC = np.array([60000, 1000, 1], dtype=np.int32)
+
+def parse_lap_times(times):
+    #lap time strings such as 1:26.572 to whole milliseconds as int32, anything else (\N, NaN or the 0
+    #missing times are filled with) is 0 like a session the driver didn't take part in
+    parts = times.astype(str).str.extract(LAP_TIME_PATTERN).fillna('0').to_numpy(dtype=np.int32)
+    return parts @ LAP_TIME_PART_MSEC
+
+def add_quali_pace(dataframe):
+    """
+    Replace the q1, q2 and q3 lap time strings with q1Msec, q2Msec and q3Msec and add each driver's
+    maxPace (slowest session time) and meanPace (mean of the sessions they set a time in)
+    """
+    sessions = np.column_stack([parse_lap_times(dataframe[column]) for column in ('q1', 'q2', 'q3')])
+    for index, column in enumerate(('q1Msec', 'q2Msec', 'q3Msec')):
+        dataframe[column] = sessions[:, index]
+    dataframe['maxPace'] = sessions.max(axis=1)
+    #a row without any times is NaN, the same as dividing the pandas columns gave
+    with np.errstate(invalid='ignore'):
+        dataframe['meanPace'] = sessions.sum(axis=1, dtype=np.int64) / (sessions != 0).sum(axis=1)
+    return dataframe.drop(['q1', 'q2', 'q3'], axis=1)
+
+def order_races(races):
+    #every race with its place in date order, raceIdOrdered, ergast's race ids aren't in date order
+    races = races.loc[:, ['raceId', 'date']].drop_duplicates(subset=['raceId'])
+    races = races.sort_values(by='date', kind='stable')
+    races['raceIdOrdered'] = np.arange(1, len(races) + 1, dtype=np.int32)
+    return races
+
+def build_features(tables, state=None, after=0):
+    """
+    The feature table for the races after the race numbered after (raceIdOrdered), all of them by default
+    state is the drivers' careers up to that race, as returned the last time
+    Returns the feature rows, the drivers' careers after them and the raceIdOrdered of the last race with results
+    """
+    df_drivers = tables['drivers']
+    df_races = tables['races']
+    df_results = tables['results']
+    df_qualifying = tables['qualifying']
+
+    #add the correct order of races to df_results and put it in that order
+    races = order_races(df_races)
+    df_results = pd.merge(df_results, races.loc[:, ['raceId', 'raceIdOrdered']], how='left', on=['raceId'])
+    df_results = df_results.sort_values(by='raceIdOrdered', kind='stable')
+    high_water_mark = int(df_results['raceIdOrdered'].max()) if len(df_results) else after
+
+    #only the races that haven't been built yet
+    df_results = df_results[df_results['raceIdOrdered'] > after]
+
+    #add the years to dataframe results
+    df_results = df_results.merge(df_races.loc[:, ['raceId', 'year']], how='left', on='raceId')
+    df_results = df_results.loc[:, ['raceId', 'driverId', 'grid', 'positionOrder', 'year', 'raceIdOrdered']]
+    df_results = df_results.rename(columns={'positionOrder': 'racePosition', 'grid': 'startingPosition'})
+
+    #add the year in which the different drivers started racing and how many races the driver has
+    #participated in and their wins and podiums before each race
+    new_state = get_driver_state(df_results, state)
+    df_results['yearStarted'] = df_results['driverId'].map(new_state['yearStarted'])
+    df_results = add_driver_history(df_results, state)
+
+    #just include the qualifying and races from the hybrid era (2014 onwards)
+    df_qualifying = df_qualifying.merge(df_races.loc[:, ['raceId', 'year']], how='left', on='raceId')
+    df_qualifying = df_qualifying[df_qualifying['year'] >= 2014].drop('year', axis=1)
+    df_results = df_results[df_results['year'] >= 2014]
+
+    #remove the drivers in the table that didn't start a race
+    df_results = df_results[df_results['startingPosition'] != 0]
+
+    #for some races there is missing quali data so in those races the data is removed
+    df_results = df_results[df_results['raceId'].isin(df_qualifying['raceId'].unique())]
+
+    #now we can combine the race data and quali data together into one dataframe
+    dataframe = pd.merge(df_results, df_qualifying, how='left', on=['raceId', 'driverId'])
+    dataframe = dataframe.rename(columns={'position': 'qualiResultPosition'})
+
+    #adding the drivers nationality to the dataframe to add another data point for the machine learning model
+    dataframe = dataframe.merge(df_drivers.loc[:, ['driverId', 'nationality']], how='left', on='driverId')
+
+    #some drivers dont set a laptime in q1
+    #and also they dont set laptimes if they don't advance to the next round of quali
+    dataframe = dataframe.replace('\\N', np.nan) #replace \\n with not a number
+    dataframe = dataframe[dataframe['q1'].notnull()] #only keep rows where there is data
+    with pd.option_context('future.no_silent_downcasting', True): #the types are set at the end
+        dataframe = dataframe.fillna(0) #fill any not a number rows with 0
+
+    #turn the lap time strings into milliseconds and add the max and mean pace in the session
+    #as other indicators for the prediction model
+    dataframe = add_quali_pace(dataframe)
+
+    #adding the drivers experience in years on top of the experience in results just to include another datapoint
+    dataframe['driverExpYears'] = dataframe['year'] - dataframe['yearStarted']
+
+    dataframe = dataframe.loc[:, list(FEATURE_DTYPES)].astype(FEATURE_DTYPES).reset_index(drop=True)
+    return dataframe, new_state, high_water_mark
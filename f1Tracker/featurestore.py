@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from loguru import logger
+from f1Tracker import features
+from f1Tracker import singleflight
+
+#the feature table the models are trained on, kept between runs so a new ergast snapshot only needs the features
+#of the races added since the last one working out, not the whole history since 1950
+#layout: <store dir>/<build>/{features.parquet, drivers.parquet}, <store dir>/manifest.json
+#drivers.parquet is every driver's career up to the high water mark, the last race (raceIdOrdered) built,
+#so the counts for the next races carry on from it
+#base_build in the manifest is the build the table was last built from scratch in, the builds adding races to it
+#keep it, so anything copied from the table (the driver features) knows to replace its copy when it changes
+
+FEATURES_FILE = 'features.parquet'
+DRIVERS_FILE = 'drivers.parquet'
+MANIFEST_FILE = 'manifest.json'
+
+_settings = {
+    'dir': os.getenv('FEATURE_STORE_DIR', './feature_store')
+}
+
+def configure(store_dir):
+    os.makedirs(store_dir, exist_ok=True)
+    _settings['dir'] = store_dir
+
+def _path(*names):
+    return os.path.join(_settings['dir'], *names)
+
+def _read_manifest():
+    try:
+        with open(_path(MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_manifest(manifest):
+    tmp_path = _path(f"{MANIFEST_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, _path(MANIFEST_FILE))
+
+def get_info():
+    #the manifest of the stored feature table or None if there isn't one
+    manifest = _read_manifest()
+    if manifest is None or not os.path.isdir(_path(manifest['build'])):
+        return None
+    return manifest
+
+def _rows_digest(table):
+    #hash of a table's rows whatever order they are in
+    row_hashes = pd.util.hash_pandas_object(table, index=False).to_numpy()
+    return hashlib.sha256(np.sort(row_hashes).tobytes()).digest()
+
+def get_inputs_digest(tables, races, high_water_mark):
+    """
+    Changes if anything the rows up to the high water mark were built from changes, a race added, removed or moved,
+    a corrected result, qualifying published late or a driver's details, the stored rows would be wrong
+    """
+    race_ids = races.loc[races['raceIdOrdered'] <= high_water_mark, 'raceId'].to_numpy()
+    digest = hashlib.sha256(race_ids.astype('int64').tobytes())
+    for name in ('results', 'qualifying'):
+        table = tables[name]
+        digest.update(_rows_digest(table[table['raceId'].isin(race_ids)]))
+    digest.update(_rows_digest(tables['drivers']))
+    return digest.hexdigest()[:16]
+
+def _read(manifest):
+    dataframe = pq.read_table(_path(manifest['build'], FEATURES_FILE)).to_pandas()
+    state = pq.read_table(_path(manifest['build'], DRIVERS_FILE)).to_pandas()
+    return dataframe, state
+
+def _save(dataset_version, dataframe, state, high_water_mark, inputs_digest, added, base_build=None):
+    build = f"{dataset_version}-{high_water_mark}-{int(time.time() * 1000)}"
+    #written to a temporary folder first so readers never see half a table
+    tmp_dir = _path(f"{build}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    pq.write_table(pa.Table.from_pandas(dataframe, preserve_index=False), os.path.join(tmp_dir, FEATURES_FILE))
+    pq.write_table(pa.Table.from_pandas(state, preserve_index=True), os.path.join(tmp_dir, DRIVERS_FILE))
+    os.replace(tmp_dir, _path(build))
+
+    manifest = {'build': build, 'base_build': base_build or build, 'dataset_version': dataset_version,
+                'feature_version': features.FEATURE_VERSION,
+                'high_water_mark': high_water_mark, 'inputs_digest': inputs_digest, 'rows': len(dataframe),
+                'added_rows': added, 'built_at': time.time()}
+    _write_manifest(manifest)
+    for name in os.listdir(_settings['dir']):
+        if name != build and os.path.isdir(_path(name)) and not name.endswith('.tmp'):
+            shutil.rmtree(_path(name), ignore_errors=True)
+    return manifest
+
+def load_features(dataset_version, tables, rebuild=False):
+    """
+    The feature table for an ergast snapshot (its version and tables), only the races after the stored table's
+    high water mark are worked out, everything is built again if the data before it changed or rebuild is set
+    """
+    manifest = get_info()
+    if manifest and manifest['dataset_version'] == dataset_version and not rebuild:
+        return _read(manifest)[0]
+
+    with singleflight.file_lock('feature-store'):
+        os.makedirs(_settings['dir'], exist_ok=True)
+        #another worker may have built it while this one waited for the lock
+        manifest = get_info()
+        if manifest and manifest['dataset_version'] == dataset_version and not rebuild:
+            return _read(manifest)[0]
+
+        start = time.perf_counter()
+        races = features.order_races(tables['races'])
+        incremental = (manifest is not None and not rebuild
+                       and manifest['feature_version'] == features.FEATURE_VERSION
+                       and manifest.get('inputs_digest') == get_inputs_digest(tables, races, manifest['high_water_mark']))
+        base_build = None
+        if incremental:
+            dataframe, state = _read(manifest)
+            added, state, high_water_mark = features.build_features(tables, state, manifest['high_water_mark'])
+            dataframe = pd.concat([dataframe, added], ignore_index=True)
+            base_build = manifest.get('base_build', manifest['build'])
+        else:
+            dataframe, state, high_water_mark = features.build_features(tables)
+            added = dataframe
+
+        manifest = _save(dataset_version, dataframe, state, high_water_mark,
+                         get_inputs_digest(tables, races, high_water_mark), len(added), base_build)
+        logger.info(f"{'Added' if incremental else 'Built'} {len(added)} feature rows up to race {high_water_mark} "
+                    f"for ergast snapshot {dataset_version} in {time.perf_counter() - start:.2f}s")
+        return dataframe
@@ -0,0 +1,426 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+import numpy as np
+import pandas as pd
+from loguru import logger
+from timple.timedelta import strftimedelta
+from f1Tracker.singleflight import SingleFlight
+
+#fastf1.plotting is slow to import so the extractors that need its colours import it when they run
+
+#the data behind each graph, extracted from a loaded session once and then drawn by the render module
+#datasets only hold numpy arrays, labels and colours so they are small and rendering a different size,
+#theme or format from them never needs the session again
+
+#how far the simplified gear shift track can move from the real one, as a fraction of the size of the track
+#the default is about half a pixel at the default graph size, can be changed with GEAR_SHIFT_TOLERANCE
+GEAR_SHIFT_TOLERANCE = float(os.getenv('GEAR_SHIFT_TOLERANCE', 0.0005))
+
+@dataclass
+class PositionsDataset:
+    title: str
+    drivers: list            #driver codes in session order
+    colors: list
+    linestyles: list
+    lap_numbers: np.ndarray      #int16 every lap number from 1 to the last lap
+    positions: np.ndarray        #float32 drivers x laps, nan where a driver has no position
+
+@dataclass
+class TeamPaceDataset:
+    title: str
+    teams: list              #fastest median lap time first
+    colors: list
+    lap_times: list          #one float32 array of quick lap times in seconds per team
+
+@dataclass
+class LaptimeDistributionDataset:
+    title: str
+    drivers: list            #points finishers in finishing order
+    driver_colors: list
+    compounds: list
+    compound_colors: list
+    driver_index: np.ndarray     #int8 index into drivers for each lap
+    compound_index: np.ndarray   #int8 index into compounds for each lap
+    lap_times: np.ndarray        #float32 lap time in seconds for each lap
+
+@dataclass
+class TyreStrategyDataset:
+    title: str
+    drivers: list            #codes of the drivers with stints in finishing order
+    compounds: list
+    compound_colors: list
+    driver_index: np.ndarray     #int16 index into drivers for each stint, stints are in driving order
+    compound_index: np.ndarray   #int8 index into compounds for each stint
+    stint_starts: np.ndarray     #int16 laps completed before each stint
+    stint_lengths: np.ndarray    #int16 number of laps in each stint
+
+@dataclass
+class QualiOverviewDataset:
+    title: str
+    drivers: list            #fastest first
+    colors: list
+    deltas: np.ndarray           #timedelta64[ns] gap to pole for each driver
+
+@dataclass
+class GearShiftDataset:
+    title: str
+    x: np.ndarray                #float32 track coordinates of the fastest lap
+    y: np.ndarray
+    gears: np.ndarray            #int8 gear at each point
+
+
+def dataset_size(dataset):
+    #rough size in bytes, used for the dataset cache budget
+    size = 0
+    for field in fields(dataset):
+        value = getattr(dataset, field.name)
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            size += item.nbytes if isinstance(item, np.ndarray) else len(str(item))
+    return size
+
+def _to_json_value(value):
+    #numpy arrays become lists, floats are rounded to keep the json small and nan becomes null
+    if isinstance(value, list):
+        return [_to_json_value(item) for item in value]
+    if not isinstance(value, np.ndarray):
+        return value
+    if np.issubdtype(value.dtype, np.timedelta64):
+        value = value / np.timedelta64(1, 's')
+    if value.ndim > 1:
+        return [_to_json_value(row) for row in value]
+    if np.issubdtype(value.dtype, np.floating):
+        value = np.round(value.astype(np.float64), 3)
+        return [None if np.isnan(item) else item for item in value.tolist()]
+    return value.tolist()
+
+def to_json(dataset, graph_type):
+    #compact json of a dataset for the graph data api, index arrays are kept as indexes into the label lists
+    data = {'graph_type': graph_type}
+    for field in fields(dataset):
+        data[field.name] = _to_json_value(getattr(dataset, field.name))
+    return json.dumps(data, separators=(',', ':'))
+
+def extract_positions_change_during_a_race(session, year, grand_prix):
+    import fastf1.plotting
+    laps = session.laps
+    laps = laps[laps['LapNumber'].notna()]
+
+    #driver numbers in finishing order that have laps and the abbreviation each one uses
+    driver_codes = laps.groupby('DriverNumber')['Driver'].first()
+    driver_numbers = [driver for driver in session.drivers if driver in driver_codes.index]
+    drivers = [driver_codes[driver] for driver in driver_numbers]
+
+    #pivot lap number x driver -> position into a dense matrix in one pass
+    lap_index = laps['LapNumber'].to_numpy(dtype=np.int64) - 1
+    driver_index = pd.Categorical(laps['DriverNumber'], categories=driver_numbers).codes
+    shown = driver_index >= 0
+    lap_count = int(lap_index.max()) + 1 if len(lap_index) else 0
+    positions = np.full((len(drivers), lap_count), np.nan, dtype=np.float32)
+    positions[driver_index[shown], lap_index[shown]] = laps['Position'].to_numpy(dtype=np.float32)[shown]
+
+    #styles are resolved once per driver when the dataset is extracted
+    styles = [fastf1.plotting.get_driver_style(identifier=driver, style=['color', 'linestyle'], session=session)
+              for driver in drivers]
+
+    return PositionsDataset(
+        title=f"{session.event['EventName']} {year} Positions Changed During a Race",
+        drivers=drivers,
+        colors=[style['color'] for style in styles],
+        linestyles=[style['linestyle'] for style in styles],
+        lap_numbers=np.arange(1, lap_count + 1, dtype=np.int16),
+        positions=positions
+    )
+
+def extract_team_pace_comparison(session, year, grand_prix):
+    import fastf1.plotting
+    #choose race laps (within 107% of fastest lap so that slow laps don't skew the data).
+    #for races with mixed conditions the slowest part of the session will be excluded
+    laps = session.laps.pick_quicklaps()
+    lap_times = pd.DataFrame({'Team': laps['Team'].to_numpy(),
+                              'LapTime (s)': laps['LapTime'].dt.total_seconds().to_numpy()})
+
+    #order the team from the fastest (lowest median lap time excluding slow laps) to the slowest
+    team_order = lap_times.groupby("Team").median()["LapTime (s)"].sort_values().index
+    team_laps = lap_times.groupby("Team")["LapTime (s)"]
+
+    return TeamPaceDataset(
+        title=f"{year} {session.event['EventName']} Team Pace Comparison",
+        teams=list(team_order),
+        colors=[fastf1.plotting.get_team_color(team, session=session) for team in team_order],
+        lap_times=[team_laps.get_group(team).to_numpy(dtype=np.float32) for team in team_order]
+    )
+
+def extract_driver_laptime_comparison(session, year, grand_prix):
+    import fastf1.plotting
+    #get laps for top 10 (points).
+    #remove slow laps (eg. yellow flag, VSC, SC, pitstops etc.) as they make the graph axis look whack.
+    point_finishers = session.drivers[:10]
+    driver_laps = session.laps.pick_drivers(point_finishers).pick_quicklaps()
+
+    #get driver codes in the finishing order do display them on the graph.
+    finishing_order = [session.get_driver(i)["Abbreviation"] for i in point_finishers]
+    driver_colors = fastf1.plotting.get_driver_color_mapping(session=session)
+    compound_mapping = fastf1.plotting.get_compound_mapping(session=session)
+
+    driver_laps = driver_laps[driver_laps['Driver'].isin(finishing_order)]
+    compounds = list(compound_mapping)
+
+    return LaptimeDistributionDataset(
+        title=f"{year} {grand_prix} Lap Time Distributions",
+        drivers=finishing_order,
+        driver_colors=[driver_colors.get(driver, 'grey') for driver in finishing_order],
+        compounds=compounds,
+        compound_colors=[compound_mapping[compound] for compound in compounds],
+        driver_index=pd.Categorical(driver_laps['Driver'], categories=finishing_order).codes.astype(np.int8),
+        compound_index=pd.Categorical(driver_laps['Compound'], categories=compounds).codes.astype(np.int8),
+        lap_times=driver_laps['LapTime'].dt.total_seconds().to_numpy(dtype=np.float32)
+    )
+
+def extract_tyre_strategies(session, year, grand_prix):
+    import fastf1.plotting
+    laps = session.laps
+
+    #convert the driver numbers to three letter abbreviations
+    drivers = [session.get_driver(driver)["Abbreviation"] for driver in session.drivers]
+
+    #works out the stint length and compound used for every stint by every driver
+    #the count of LapNumber in each group is the stint length
+    stints = laps.groupby(["Driver", "Stint", "Compound"])["LapNumber"].count().rename("StintLength").reset_index()
+
+    #keep the stints of the drivers being shown, in finishing order and then stint order
+    stints["DriverIndex"] = pd.Categorical(stints["Driver"], categories=drivers).codes
+    stints = stints[stints["DriverIndex"] >= 0].sort_values(["DriverIndex", "Stint"], kind="stable")
+
+    #drivers without any stints aren't shown so the rows are renumbered without gaps
+    shown = np.unique(stints["DriverIndex"].to_numpy())
+    driver_index = np.searchsorted(shown, stints["DriverIndex"].to_numpy())
+
+    #each stint starts where the driver's previous one ended
+    stint_lengths = stints["StintLength"].to_numpy()
+    stint_starts = stints.groupby("DriverIndex")["StintLength"].cumsum().to_numpy() - stint_lengths
+
+    #colours are looked up once per compound rather than once per stint
+    compounds = list(pd.unique(stints["Compound"]))
+    compound_mapping = fastf1.plotting.get_compound_mapping(session=session)
+    compound_colors = [compound_mapping[compound.upper()] for compound in compounds]
+
+    return TyreStrategyDataset(
+        title=f"{year} {session.event['EventName']} Strategies",
+        drivers=[drivers[index] for index in shown],
+        compounds=compounds,
+        compound_colors=compound_colors,
+        driver_index=driver_index.astype(np.int16),
+        compound_index=pd.Categorical(stints["Compound"], categories=compounds).codes.astype(np.int8),
+        stint_starts=stint_starts.astype(np.int16),
+        stint_lengths=stint_lengths.astype(np.int16)
+    )
+
+def fastest_laps_by_driver(laps, personal_best_only=True):
+    """
+    Fastest lap of every driver in laps with a LapTimeDelta column for the gap to the fastest of them, fastest first
+    With personal_best_only only laps marked as personal bests count, the same as Laps.pick_fastest()
+    Pass False for part of a session, e.g. Q1 from Laps.split_qualifying_sessions(), as the personal best flag is for
+    the whole session, deleted laps are still left out
+    """
+    if personal_best_only:
+        laps = laps[laps['IsPersonalBest'] == True]
+    elif 'Deleted' in laps:
+        laps = laps[laps['Deleted'] != True]
+    laps = laps[laps['LapTime'].notna()]
+
+    #idxmin takes the first clocked lap if a driver sets the same time twice, like pick_fastest
+    fastest_laps = laps.loc[laps.groupby('Driver', sort=False)['LapTime'].idxmin()]
+    fastest_laps = fastest_laps.sort_values(by='LapTime', kind='stable').reset_index(drop=True)
+    fastest_laps['LapTimeDelta'] = fastest_laps['LapTime'] - fastest_laps['LapTime'].min()
+    return fastest_laps
+
+def get_team_colors(teams, session):
+    import fastf1.plotting
+    #colour for each team in teams, looked up once per team
+    colors = {team: fastf1.plotting.get_team_color(team, session=session)
+              for team in pd.unique(teams) if isinstance(team, str)}
+    return [colors.get(team, 'grey') for team in teams]
+
+def quali_overview_dataset(laps, session, title, personal_best_only=True):
+    #bar chart of each driver's gap to the fastest lap in laps, used for the whole of qualifying
+    #and can be used for Q1, Q2 and Q3 on their own
+    fastest_laps = fastest_laps_by_driver(laps, personal_best_only)
+    logger.debug(fastest_laps[['Driver', 'LapTime', 'LapTimeDelta']])
+
+    if fastest_laps.empty:
+        title = f"{title}\nNo lap times set"
+    else:
+        pole_lap = fastest_laps.iloc[0]
+        lap_time_string = strftimedelta(pole_lap['LapTime'], '%m:%s.%ms')
+        title = f"{title}\nFastest Lap: {lap_time_string} ({pole_lap['Driver']})"
+
+    return QualiOverviewDataset(
+        title=title,
+        drivers=list(fastest_laps['Driver']),
+        colors=get_team_colors(list(fastest_laps['Team']), session),
+        deltas=fastest_laps['LapTimeDelta'].to_numpy(dtype='timedelta64[ns]')
+    )
+
+def extract_quali_results_overview(session, year, grand_prix):
+    return quali_overview_dataset(session.laps, session, f"{session.event['EventName']} {year} Qualifying")
+
+def _segment_distances(px, py, ax, ay, bx, by):
+    #distance from each point p to the line segment a-b, all arguments are arrays of the same length
+    dx, dy = bx - ax, by - ay
+    length_squared = dx * dx + dy * dy
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.where(length_squared > 0, ((px - ax) * dx + (py - ay) * dy) / length_squared, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    return np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+def simplify_polyline(x, y, tolerance, breaks):
+    """
+    Ramer-Douglas-Peucker simplification of the polyline x, y
+    Every point in breaks is kept, the sections between them are simplified independently and all sections at the
+    same depth of the recursion are handled together with numpy so there are only about log(n) passes
+    Returns the sorted indexes of the points that are kept
+    """
+    keep = np.zeros(len(x), dtype=bool)
+    keep[breaks] = True
+    starts, ends = breaks[:-1], breaks[1:]
+
+    while starts.size:
+        interior = ends - starts - 1
+        starts, ends, interior = starts[interior > 0], ends[interior > 0], interior[interior > 0]
+        if not starts.size:
+            break
+
+        #every interior point of every section with the section it belongs to
+        owner = np.repeat(np.arange(starts.size), interior)
+        first = np.cumsum(interior) - interior
+        points = starts[owner] + 1 + np.arange(owner.size) - first[owner]
+
+        distances = _segment_distances(x[points], y[points], x[starts[owner]], y[starts[owner]],
+                                       x[ends[owner]], y[ends[owner]])
+        furthest = np.maximum.reduceat(distances, first)
+        #the first point in each section that is at the furthest distance
+        candidates = np.flatnonzero(distances == furthest[owner])
+        _, first_candidate = np.unique(owner[candidates], return_index=True)
+        split_points = points[candidates[first_candidate]]
+
+        split = furthest > tolerance
+        keep[split_points[split]] = True
+        starts, ends = (np.concatenate([starts[split], split_points[split]]),
+                        np.concatenate([split_points[split], ends[split]]))
+
+    return np.flatnonzero(keep)
+
+def decimate_track(x, y, gears, tolerance=None):
+    """
+    Drop telemetry points that don't change how the gear shift track map looks
+    Points where the gear changes are always kept and the points in between are simplified so the line never moves by
+    more than tolerance, a fraction of the size of the track
+    Segment i of the returned track goes from point i to point i + 1 and is drawn in gears[i] like the original
+    """
+    tolerance = GEAR_SHIFT_TOLERANCE if tolerance is None else tolerance
+    if len(x) < 3:
+        return x, y, gears
+
+    gear_changes = np.flatnonzero(gears[1:] != gears[:-1]) + 1
+    breaks = np.unique(np.concatenate([[0], gear_changes, [len(x) - 1]]))
+    extent = max(np.ptp(x), np.ptp(y))
+    kept = simplify_polyline(x.astype(np.float64), y.astype(np.float64), tolerance * extent, breaks)
+    return x[kept], y[kept], gears[kept]
+
+def extract_gear_shifts(session, year, grand_prix):
+    lap = session.laps.pick_fastest()
+    #sessions loaded with full telemetry don't have the fastest lap cut out
+    tel = getattr(session, 'fastest_lap_telemetry', None)
+    if tel is None:
+        tel = lap.get_telemetry()
+
+    x, y, gears = decimate_track(tel['X'].to_numpy(dtype=np.float32), tel['Y'].to_numpy(dtype=np.float32),
+                                 tel['nGear'].to_numpy(dtype=np.int8))
+    return GearShiftDataset(
+        title=(f"Fastest Lap Gear Shift Visualization\n"
+               f"{lap['Driver']} - {session.event['EventName']} {year}"),
+        x=x, y=y, gears=gears
+    )
+
+#graph type -> function that extracts its dataset from a loaded session
+EXTRACTORS = {
+    "Position Changed during a Race": extract_positions_change_during_a_race,
+    "Qualifying Results Overview": extract_quali_results_overview,
+    "Team Pace Comparison": extract_team_pace_comparison,
+    "Driver Laptime Comparison": extract_driver_laptime_comparison,
+    "Gear Shifts on Track": extract_gear_shifts,
+    "Tyre Strategies During a Race": extract_tyre_strategies
+}
+
+
+class DatasetCache():
+    """
+    Process wide LRU cache of extracted graph datasets keyed by (year, round, graph type)
+    Datasets are much smaller than sessions so they outlive them and every size and theme of a graph is drawn from one
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  #key -> (dataset, size)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._flights = SingleFlight()
+
+    def get(self, key, extract):
+        #extract() builds the dataset, it's only called once for concurrent misses on the same key
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        return self._flights.do(key, lambda: self._extract(key, extract))
+
+    def peek(self, key):
+        #the cached dataset or None, never extracts
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def _extract(self, key, extract):
+        with self._lock:
+            self.misses += 1
+        logger.info(f"Dataset cache miss for {key}")
+        dataset = extract()
+        self.put(key, dataset)
+        return dataset
+
+    def put(self, key, dataset):
+        size = dataset_size(dataset)
+        with self._lock:
+            self._entries[key] = (dataset, size)
+            self._entries.move_to_end(key)
+            while self._entries and sum(entry[1] for entry in self._entries.values()) > self.max_bytes:
+                evicted, _ = self._entries.popitem(last=False)
+                logger.info(f"Evicted dataset {evicted} from the dataset cache")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': sum(entry[1] for entry in self._entries.values()),
+                'max_bytes': self.max_bytes
+            }
+
+
+#shared by every F1Data object in the process, the budget can be changed with F1_DATASET_CACHE_MB
+dataset_cache = DatasetCache(int(os.getenv('F1_DATASET_CACHE_MB', 64)) * 1024 * 1024)
@@ -0,0 +1,127 @@
+import os
+import json
+import shutil
+import hashlib
+from loguru import logger
+
+#store of rendered graph images on disk, shared by every worker and kept across restarts
+#images are addressed by a hash of everything that changes how they look
+#layout: <store dir>/<first 2 hash chars>/<hash>.png with a <hash>.json next to it describing the graph
+#the graph data api keeps the json of each graph's data here too, as <hash>.data with no size or theme
+
+#bump whenever the renderers change so old images are no longer served
+RENDER_VERSION = 2
+
+#sizes in inches that can be requested, the default matches the size the graphs were designed for
+GRAPH_SIZES = {
+    '15x10': (15, 10),
+    '12x8': (12, 8),
+    '9x6': (9, 6)
+}
+DEFAULT_SIZE = '15x10'
+
+GRAPH_THEMES = ('dark', 'light')
+DEFAULT_THEME = 'dark'
+
+_settings = {
+    'dir': None
+}
+
+def configure(store_dir):
+    os.makedirs(store_dir, exist_ok=True)
+    _settings['dir'] = store_dir
+
+def get_key(year, grand_prix, graph_type, size, theme, image_format='png'):
+    description = json.dumps([RENDER_VERSION, year, grand_prix, graph_type, size, theme, image_format])
+    return hashlib.sha256(description.encode()).hexdigest()
+
+def get_lock_name(key):
+    #the singleflight file lock held while a graph or its data is being made for the store
+    return f"graph-{key}"
+
+def _paths(key, image_format='png'):
+    folder = os.path.join(_settings['dir'], key[:2])
+    return os.path.join(folder, f"{key}.{image_format}"), os.path.join(folder, f"{key}.json")
+
+def get_by_key(key, image_format='png'):
+    #path of the stored image or None if it hasn't been rendered yet
+    if not all(char in '0123456789abcdef' for char in key):
+        return None
+    image_path, _ = _paths(key, image_format)
+    if os.path.exists(image_path):
+        return image_path
+    return None
+
+def get(year, grand_prix, graph_type, size, theme, image_format='png'):
+    return get_by_key(get_key(year, grand_prix, graph_type, size, theme, image_format), image_format)
+
+def put(year, grand_prix, graph_type, size, theme, image_data, image_format='png'):
+    #atomically write a rendered image, if two workers render the same graph the last one wins
+    key = get_key(year, grand_prix, graph_type, size, theme, image_format)
+    image_path, info_path = _paths(key, image_format)
+    os.makedirs(os.path.dirname(image_path), exist_ok=True)
+
+    info = {
+        'year': year,
+        'grand_prix': grand_prix,
+        'graph_type': graph_type,
+        'size': size,
+        'theme': theme,
+        'format': image_format,
+        'render_version': RENDER_VERSION
+    }
+    for path, data, mode in ((info_path, json.dumps(info), 'w'), (image_path, image_data, 'wb')):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, mode) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    logger.info(f"Stored {graph_type} for {grand_prix} {year} ({size}, {theme}) as {key}")
+    return image_path
+
+def _stored_graphs():
+    store_dir = _settings['dir']
+    if not store_dir or not os.path.isdir(store_dir):
+        return
+    for folder in os.listdir(store_dir):
+        folder_path = os.path.join(store_dir, folder)
+        if not os.path.isdir(folder_path):
+            continue
+        for file_name in os.listdir(folder_path):
+            if file_name.endswith('.json'):
+                info_path = os.path.join(folder_path, file_name)
+                try:
+                    with open(info_path) as f:
+                        yield info_path, json.load(f)
+                except (OSError, ValueError):
+                    continue
+
+def invalidate(grand_prix=None, graph_type=None):
+    #delete stored images, everything if no Grand Prix or graph type is given
+    store_dir = _settings['dir']
+    if not store_dir:
+        return 0
+
+    if grand_prix is None and graph_type is None:
+        count = sum(1 for _ in _stored_graphs())
+        shutil.rmtree(store_dir, ignore_errors=True)
+        os.makedirs(store_dir, exist_ok=True)
+        logger.info(f"Cleared all {count} stored graphs")
+        return count
+
+    count = 0
+    for info_path, info in list(_stored_graphs()):
+        if grand_prix is not None and info.get('grand_prix') != grand_prix:
+            continue
+        if graph_type is not None and info.get('graph_type') != graph_type:
+            continue
+        image_path = info_path[:-len('.json')] + '.' + info.get('format', 'png')
+        for path in (image_path, info_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        count += 1
+
+    logger.info(f"Cleared {count} stored graphs for {grand_prix or 'every Grand Prix'}")
+    return count
@@ -0,0 +1,103 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+
+#background jobs so slow work (loading a session and rendering a graph) doesn't block a web worker
+#jobs are identified by a key chosen by the caller, submitting a key that is already queued or running
+#returns the existing job instead of starting the same work twice
+
+#finished jobs are kept this long so their status can still be polled
+FINISHED_JOB_SECONDS = 600
+
+class QueueFullError(Exception):
+    pass
+
+class JobRunner():
+    def __init__(self, workers, max_queue, timeout):
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='graph-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, job_id, work, result_url=None):
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(job_id)
+            if job is not None and job['status'] in ('queued', 'running') and not self._timed_out(job):
+                return self._public(job)
+            if job is not None:
+                self._cancel_if_queued(job)
+
+            #jobs that timed out are still running in their thread so they count towards the queue
+            unfinished = sum(1 for job in self._jobs.values() if not job['future'].done())
+            if unfinished >= self.max_queue:
+                raise QueueFullError(f"{unfinished} jobs are already queued or running")
+
+            job = {
+                'id': job_id,
+                'status': 'queued',
+                'result_url': result_url,
+                'error': None,
+                'created': time.time(),
+                'started': None,
+                'finished': None
+            }
+            self._jobs[job_id] = job
+            job['future'] = self._executor.submit(self._run, job, work)
+            return self._public(job)
+
+    def _run(self, job, work):
+        job['status'] = 'running'
+        job['started'] = time.time()
+        try:
+            work()
+            if job['status'] == 'running':
+                job['status'] = 'done'
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {e}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+        finally:
+            job['finished'] = time.time()
+
+    def _timed_out(self, job):
+        #counted from when the job was submitted so a job stuck in the queue times out too
+        return job['status'] in ('queued', 'running') and time.time() - job['created'] > self.timeout
+
+    def _cancel_if_queued(self, job):
+        #a timed out job that hasn't started yet is taken off the queue, one that has keeps running in its thread
+        if self._timed_out(job) and job['future'].cancel():
+            job['status'] = 'failed'
+            job['error'] = f"Timed out after {self.timeout} seconds waiting in the queue"
+            job['finished'] = time.time()
+
+    def _prune(self):
+        #forget old finished jobs
+        now = time.time()
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job['finished'] is not None and now - job['finished'] > FINISHED_JOB_SECONDS]:
+            del self._jobs[job_id]
+
+    def _public(self, job):
+        return {key: value for key, value in job.items() if key != 'future'}
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            self._cancel_if_queued(job)
+            public = self._public(job)
+            #threads can't be stopped so a job over its timeout is reported as failed, if it does finish
+            #in the end it is reported as done from then on
+            if self._timed_out(job):
+                public['status'] = 'failed'
+                public['error'] = f"Timed out after {self.timeout} seconds"
+            return public
+
+    def stats(self):
+        with self._lock:
+            statuses = [job['status'] for job in self._jobs.values()]
+            return {status: statuses.count(status) for status in ('queued', 'running', 'done', 'failed')}
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import shutil
+import fastf1
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from loguru import logger
+
+#columnar store of the tables fastf1 derives from a session, so a worker restart can read them back
+#in milliseconds instead of fastf1 re-parsing and re-merging the timing data into Laps again
+#layout: <store dir>/<year>/<round>_<session type>/{laps.parquet, fastest_lap_telemetry.parquet, meta.json}
+
+#bump whenever what gets written changes shape so old files are ignored
+STORE_SCHEMA_VERSION = 1
+
+#fastf1 corrects timing data in the days after a session, files written inside that window are
+#re-checked every RECHECK_SECONDS, files written after it are treated as final
+CORRECTION_WINDOW_SECONDS = 7 * 24 * 3600
+RECHECK_SECONDS = 6 * 3600
+
+#the parts a session is loaded with besides the laps that change the laps fastf1 builds, laps loaded without the
+#race control messages have no Deleted flags, the ones written are kept in meta.json and laps are only read back
+#for a load that doesn't ask for any it was written without
+LAPS_PARTS = ('messages',)
+
+LAPS_FILE = 'laps.parquet'
+TELEMETRY_FILE = 'fastest_lap_telemetry.parquet'
+META_FILE = 'meta.json'
+
+_settings = {
+    'dir': None
+}
+
+def configure(store_dir):
+    if store_dir:
+        os.makedirs(store_dir, exist_ok=True)
+    _settings['dir'] = store_dir
+
+def _entry_dir(key):
+    year, round_number, session_type = key
+    return os.path.join(_settings['dir'], str(year), f"{round_number}_{session_type}")
+
+def _can_store(key):
+    #only sessions resolved to a round number are stored, fuzzy matched names could point anywhere
+    return _settings['dir'] is not None and isinstance(key[1], int)
+
+def _read_meta(entry_dir):
+    try:
+        with open(os.path.join(entry_dir, META_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def is_valid(meta, now=None):
+    #the invalidation rule for stored tables
+    if meta is None:
+        return False
+    if meta.get('schema_version') != STORE_SCHEMA_VERSION or meta.get('fastf1_version') != fastf1.__version__:
+        return False
+
+    now = now or time.time()
+    session_date = meta.get('session_date')
+    written_at = meta.get('written_at', 0)
+    if session_date is None:
+        return now - written_at < RECHECK_SECONDS
+
+    #written long enough after the session that fastf1 won't publish corrections anymore
+    if written_at - session_date > CORRECTION_WINDOW_SECONDS:
+        return True
+    return now - written_at < RECHECK_SECONDS
+
+def _read_table(path):
+    #pandas needs its own copy of the columns, the arrow buffers are freed column by column as they're
+    #converted (and not merged into blocks) so a read doesn't briefly hold the table twice
+    return pq.read_table(path).to_pandas(self_destruct=True, split_blocks=True)
+
+def _write_table(frame, path):
+    #write to a temporary file first so readers never see a half written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(pa.Table.from_pandas(pd.DataFrame(frame), preserve_index=False), tmp_path)
+    os.replace(tmp_path, path)
+
+def _write_meta(entry_dir, session, parts=None):
+    if parts is None:
+        #the laps written with them are kept
+        parts = (_read_meta(entry_dir) or {}).get('parts', [])
+    try:
+        session_date = pd.Timestamp(session.date).timestamp()
+    except Exception:
+        session_date = None
+
+    meta = {
+        'schema_version': STORE_SCHEMA_VERSION,
+        'fastf1_version': fastf1.__version__,
+        'session_date': session_date,
+        'written_at': time.time(),
+        'parts': sorted(set(parts) & set(LAPS_PARTS))
+    }
+    tmp_path = os.path.join(entry_dir, f"{META_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(entry_dir, META_FILE))
+
+def _read(key, file_name, parts=()):
+    if not _can_store(key):
+        return None
+
+    entry_dir = _entry_dir(key)
+    path = os.path.join(entry_dir, file_name)
+    meta = _read_meta(entry_dir)
+    if not os.path.exists(path) or not is_valid(meta):
+        return None
+    if not set(parts) & set(LAPS_PARTS) <= set(meta.get('parts', [])):
+        return None
+
+    try:
+        return _read_table(path)
+    except Exception as e:
+        logger.warning(f"Unable to read {path} from the lap store: {e}")
+        return None
+
+def _write(key, session, frame, file_name, parts=None):
+    if not _can_store(key):
+        return
+
+    entry_dir = _entry_dir(key)
+    try:
+        os.makedirs(entry_dir, exist_ok=True)
+        #a new laps table means any stored telemetry may belong to an old fastest lap
+        if file_name == LAPS_FILE and os.path.exists(os.path.join(entry_dir, TELEMETRY_FILE)):
+            os.remove(os.path.join(entry_dir, TELEMETRY_FILE))
+        _write_table(frame, os.path.join(entry_dir, file_name))
+        _write_meta(entry_dir, session, parts)
+    except Exception as e:
+        logger.warning(f"Unable to write {file_name} for {key} to the lap store: {e}")
+
+def read_laps(key, parts=()):
+    #the stored laps of a session if they were written from a load with the LAPS_PARTS in parts
+    return _read(key, LAPS_FILE, parts)
+
+def write_laps(key, session, parts=()):
+    #parts are the ones the session was loaded with
+    _write(key, session, session.laps, LAPS_FILE, parts)
+
+def read_fastest_lap_telemetry(key):
+    return _read(key, TELEMETRY_FILE)
+
+def write_fastest_lap_telemetry(key, session, telemetry):
+    _write(key, session, telemetry, TELEMETRY_FILE)
+
+def invalidate(year=None, round_number=None):
+    #remove stored tables, everything when no year is given
+    store_dir = _settings['dir']
+    if not store_dir:
+        return
+    if year is None:
+        path = store_dir
+    elif round_number is None:
+        path = os.path.join(store_dir, str(year))
+    else:
+        for session_dir in _session_dirs(year, round_number):
+            shutil.rmtree(session_dir, ignore_errors=True)
+        return
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(store_dir, exist_ok=True)
+
+def _session_dirs(year, round_number):
+    season_dir = os.path.join(_settings['dir'], str(year))
+    if not os.path.isdir(season_dir):
+        return []
+    return [os.path.join(season_dir, name) for name in os.listdir(season_dir)
+            if name.startswith(f"{round_number}_")]
@@ -1,274 +1,124 @@
 import numpy as np
-import pandas as pd
 from loguru import logger
-import xgboost as xgb
+import time
 import warnings
-import requests
-import zipfile
-import io
-from sklearn.model_selection import cross_val_score
-
-#grab zip file containing all necessary data from the internet     
-zip_file_url = "https://ergast.com/downloads/f1db_csv.zip"
-logger.info(f'Getting {zip_file_url}')
-r = requests.get(zip_file_url)
-zip_file = zipfile.ZipFile(io.BytesIO(r.content))
-dfs = {text_file.filename: pd.read_csv(zip_file.open(text_file.filename))
-       for text_file in zip_file.infolist()
-       if text_file.filename.endswith('.csv')}
-logger.info(f'Found {dfs.keys()}')
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from f1Tracker import driverfeatures
+from f1Tracker import ergast
+from f1Tracker import featurestore
+from f1Tracker import modelstore
+from f1Tracker import predict
+from f1Tracker import singleflight
+from f1Tracker import training
+from f1Tracker.predict import MODELS
+
+#the tables come from the local ergast snapshot, it is only downloaded if there isn't one yet
+dataset_version, tables = ergast.load_snapshot()
+logger.info(f'Using ergast snapshot {dataset_version}')
 warnings.filterwarnings('ignore')    
 
-#sort the various csv files downloaded into their respective dataframe
-df_drivers = dfs["drivers.csv"]
-df_races = dfs["races.csv"]
-df_results = dfs["results.csv"]
-df_qualifying = dfs["qualifying.csv"]
-
-#the next section is just building/formatting the dataframe for the machine learning model
-#I have commented the various actions I am doing to the dataframe to make it clear what actions are being carried out
-
-#add the date to df_results
-df_new = df_races.loc[:, ['raceId', 'date']].drop_duplicates(subset=['raceId'])
-
-df_new = df_new.sort_values(by='date', key=lambda x: x.str.split('-'))
-
-df_new['raceIdOrdered'] = range(1,len(df_new)+1)
-
-#add the correct order of races to df_results
-df_results = pd.merge(df_results, df_new.loc[:, ['raceId', 'raceIdOrdered']], how='left', on=['raceId'], )
-
-
-#fix the dataframe to be in the order of races
-df_results = df_results.sort_values(by='raceIdOrdered')
-
-
-#add the years to dataframe results
-df_results = df_results.set_index('raceId').join(df_races.loc[:,['year', 'raceId']].set_index('raceId'), on='raceId').reset_index()
-
-df_results = df_results.loc[:,['raceId', 'driverId', 'grid', 'positionOrder', 'year', 'raceIdOrdered']]
-
-df_results = df_results.rename(columns={'positionOrder' : 'racePosition', 'grid': 'startingPosition'})
-
-#add the year in which the different drivers started racing
-min_year = df_results.groupby('driverId').min()['year']
-
-min_year = (min_year.reset_index()).rename({'year':'yearStarted'}, axis=1)
-
-df_results = df_results.merge(min_year, on='driverId',how='left')
-
-#add how many races the driver has participated for  
-def count_race_exp(dataframe):
-    
-    exp = []
-    
-    for index, row in dataframe.iterrows():
-        
-        df_new = dataframe.loc[:index]
-        
-        df_new = df_new[df_new['driverId'] == row['driverId']]
-        
-        exp.append(len(df_new))
-        
-    return exp
-
-df_results['driverExpRaces'] = count_race_exp(df_results)
-
-df_results[df_results['driverId'] == 9] 
-
-#add the all the years to df_qualifying
-
-years = df_races.loc[:,['year', 'raceId']].set_index('raceId')
-
-df_qualifying = df_qualifying.set_index('raceId').join(years, on='raceId').reset_index()
-
-#just include the qualifying and races from the hybrid era (2014 onwards)
-
-df_qualifying = df_qualifying[(df_qualifying['year'] >= 2014)]
-
-df_results = df_results[(df_results['year'] >= 2014)]
-
-#remove the drivers in the table that didn't start a race 
-
-df_results = df_results[df_results['startingPosition'] != 0]
-
-#for some races there is missing quali data so in those races I have removed the data 
-x = df_results['raceId'].unique()
-y = df_qualifying['raceId'].unique()
-
-np.where(np.isin(x, y) == False)
-
-df_results = df_results[df_results['raceId'].isin(y)]
-
-x = df_results['raceId'].unique()
-
-#now we can combine the race data and quali data together into one dataframe
-
-dataframe = pd.merge(df_results, df_qualifying,  how='left', left_on=['raceId','driverId'], right_on = ['raceId','driverId'])
-
-dataframe = dataframe.drop(['year_y', 'constructorId', 'qualifyId', 'number'], axis = 1)
-
-dataframe = dataframe.rename(columns={'year_x' : 'year', 'position' : 'qualiResultPosition'})
-
-#adding the drivers nationality to the dataframe to add another data point for the machine learning model
-
-dataframe = dataframe.merge(df_drivers.loc[:,['driverId', 'nationality']],how='left', on='driverId')
-
-#there are instances where the nationality of the driver is unknown
-
-
-
-#some drivers dont set a laptime in q1 
-#and also they dont set laptimes if they don't advance to the next round of quali
-dataframe = dataframe.replace('\\N', np.nan) #replace \\n with not a number
-dataframe = dataframe[dataframe['q1'].notnull()] #only keep rows where there is data
-dataframe = dataframe.fillna(0) #fill any not a number rows with 0
-
-#need to split the lap time strings into the format [minute, sec, millisec]
-def get_time_lst(dataframe, time_column):
-    split_time = dataframe[time_column].str.split(pat=r':|\.').fillna(0)
-    return split_time
-
-dataframe['q1_lst'] = get_time_lst(dataframe, 'q1')
-dataframe['q2_lst'] = get_time_lst(dataframe, 'q2')
-dataframe['q3_lst'] = get_time_lst(dataframe, 'q3')
-
-def convert_to_msec(time_lst):
-    
-    if time_lst != 0:
-    
-        return int(time_lst[0])*60000 + int(time_lst[1])*1000 + int(time_lst[2])
-    
-    return 0
-
-dataframe['q1Msec'] = dataframe.apply(lambda x: convert_to_msec(x['q1_lst']), axis=1)
-dataframe['q2Msec'] = dataframe.apply(lambda x: convert_to_msec(x['q2_lst']), axis=1)
-dataframe['q3Msec'] = dataframe.apply(lambda x: convert_to_msec(x['q3_lst']), axis=1)
-
-#added the max pace in the session as another indicator for the predicition model
-
-dataframe['maxPace'] = dataframe.loc[:, ['q1Msec', 'q2Msec', 'q3Msec']].max(axis=1)
-
-
-#adding the mean pace in session is another useful indicator for the prediction model
-
-dataframe['meanPace'] = dataframe.loc[:, ['q1Msec', 'q2Msec', 'q3Msec']].sum(axis=1) / (dataframe.loc[:, ['q1Msec', 'q2Msec', 'q3Msec']] != 0).sum(axis=1)
-dataframe = dataframe.drop(['q1_lst', 'q2_lst', 'q3_lst', 'q1', 'q2', 'q3'], axis = 1)
-
-#adding the drivers experience in years on top of the experience in results just to include another datapoint
-dataframe['driverExpYears'] = dataframe['year'] - dataframe['yearStarted']
-
-dataframe[dataframe['driverId'] == 9]
-
-def XGBoost_model_train(X, Y, test_size=0.2, cv=10):
-    #split the dataset into training and testing sets
-    #X_train, X_test, Y_train, Y_test = train_test_split(X, Y, test_size=test_size, random_state=42)
-
-    # Initialize the XGBoost model
-    model = xgb.XGBClassifier(objective="multi:softmax", num_class=len(set(Y)), random_state=42)
-
-    #cross-validation to evaluate model performance so I can give a certaincy
-    #this is how accurate the model has been when testing itself to the actual dataset
-    cv_scores = cross_val_score(model, X, Y, cv=cv, scoring='accuracy') 
-    #log the accuracy so I can see it from the terminal 
-    logger.debug("Mean Accuracy:", np.mean(cv_scores)) #so I can see improvements if I change the datapoints/model
-
-    #fit the model on the training set
-    model.fit(X, Y)
-    accuracy = round(np.mean(cv_scores)*100)
-
-    return model, accuracy
-
-def getRacePredictions():
-    #features for race
-    X = dataframe[['startingPosition', 'driverExpYears', 'meanPace', 'maxPace']]  #select features
-    Y_position = dataframe["racePosition"] - 1
-
-    #run machine learning model
-    model, accuracy = XGBoost_model_train(X, Y_position)
-
-    #create a dictionary to map driverId to the driver's code to display to the website
-    df_drivers['driverCode'] = df_drivers['code'] 
-    driver_id_to_code = df_drivers.set_index('driverId')['driverCode'].to_dict()
-
-    #predict race positions
-    X_test = X.tail(20)
-    X_full = dataframe.tail(20)
-    X_full['predict'] = model.predict(X_test) + 1  #add 1 to revert to original race positions as the indexing starts at 0
-
-    #create a list of dictionaries for driver predictions with certainty and rank
-    predictions_output = []
-
-    for idx, row in X_full.iterrows():
-        driver_id = row['driverId']  #get the driver ID from the row
-        driver_code = driver_id_to_code.get(driver_id, "Unknown Driver")  #map to driver code
-        predicted_position = row['predict']  #get the predicted position
-
-        #create the dictionary for each driver
-        driver_prediction = {
-            'driver': driver_code,
-            'rank': str(predicted_position)
-        }
-        
-        #append to the list
-        predictions_output.append(driver_prediction)
-
-    predictions_output.sort(key=lambda driver_prediction: int(driver_prediction['rank']))
-
-    #change order so that there isn't duplicates of pecking order
-    num = 1
-    for i in predictions_output:
-        i['rank'] = num
-        num +=1
-        
-    return predictions_output, accuracy
-
-def getQualiPredictions():
-    #features for quali
-    X = dataframe[['driverExpYears', 'meanPace', 'maxPace']]  #select features for quali
-    Y_position = dataframe["qualiResultPosition"] - 1  #target is the qualifying position
-
-    #run the machine learning model
-    model, accuracy = XGBoost_model_train(X, Y_position)
-
-    #map driver IDs to their codes for output
-    df_drivers['driverCode'] = df_drivers['code']
-    driver_id_to_code = df_drivers.set_index('driverId')['driverCode'].to_dict()
-
-    #predict qualifying positions
-    X_test = X.tail(20)
-    X_full = dataframe.tail(20)
-    X_full['predict'] = model.predict(X_test) + 1  #revert to original qualifying positions
-
-    #create a list of dictionaries for driver predictions with rank for the output
-    predictions_output = []
-
-    for idx, row in X_full.iterrows():
-        driver_id = row['driverId']
-        driver_code = driver_id_to_code.get(driver_id, "Unknown Driver")
-        predicted_position = row['predict']
-
-        driver_prediction = {
-            'driver': driver_code,
-            'qualifying_rank': str(predicted_position)
-        }
-
-        predictions_output.append(driver_prediction)
-
-    predictions_output.sort(key=lambda driver_prediction: int(driver_prediction['qualifying_rank']))
-
-    #adjust ranking order to avoid duplicates
-    num = 1
-    for i in predictions_output:
-        i['qualifying_rank'] = num
-        num += 1
-
-    return predictions_output, accuracy
+df_drivers = tables["drivers"]
+
+#the dataframe for the machine learning model, one row per driver per race from 2014 onwards (see
+#features.build_features for how it is built), only the races added since it was last built are worked out
+dataframe = featurestore.load_features(dataset_version, tables)
+#changes whenever the feature table is built again from scratch rather than added to
+feature_build = featurestore.get_info()['base_build']
+
+#map driverId to the driver's code to display to the website
+driver_id_to_code = df_drivers.set_index('driverId')['code'].to_dict()
+
+def update_driver_features():
+    #add the races the driver features table hasn't seen yet, the predictions are made from its latest rows
+    high_water_mark = driverfeatures.get_high_water_mark()
+    last_race = int(dataframe['raceIdOrdered'].max())
+    #a table that's ahead of the data was filled from a different snapshot and one copied from a feature table
+    #that has since been built again from scratch may have rows that were corrected, either way it's rebuilt
+    replace = (high_water_mark > last_race or driverfeatures.get_version() is None
+               or driverfeatures.get_feature_build() != feature_build)
+    new_rows = dataframe if replace else dataframe[dataframe['raceIdOrdered'] > high_water_mark]
+    latest = new_rows.sort_values('raceIdOrdered', kind='stable').drop_duplicates('driverId', keep='last')
+    latest = latest.assign(code=latest['driverId'].map(driver_id_to_code).fillna("Unknown Driver"))
+    rows = zip(*(latest[column].tolist() for column in driverfeatures.COLUMNS))
+    driverfeatures.update(rows, dataset_version, last_race, replace=replace, feature_build=feature_build)
+    logger.info(f"Added {len(latest)} drivers' features up to race {last_race} to the driver features table")
+
+update_driver_features()
+
+def models_ready():
+    return predict.models_ready(dataset_version)
+
+#every feature a model uses, in the column order of the shared training matrix
+FEATURE_COLUMNS = list(dict.fromkeys(column for feature_names, _ in MODELS.values() for column in feature_names))
+
+def build_training_data():
+    #the features of every model as one contiguous float32 matrix and each model's 0 based target positions
+    X = np.ascontiguousarray(dataframe[FEATURE_COLUMNS].to_numpy(dtype=np.float32))
+    targets = {name: (dataframe[target] - 1).to_numpy(dtype=np.int32) for name, (_, target) in MODELS.items()}
+    return X, targets
+
+
+def train_models(mode=None, force=False):
+    #train the race and quali models at the same time from one feature build, save them and promote them
+    #together so both predictions always come from the same data
+    #other workers wait for the lock and then find the models are already current
+    with singleflight.file_lock('model-training'):
+        if models_ready() and not force:
+            return modelstore.get_current()
+
+        start = time.perf_counter()
+        X, targets = build_training_data()
+        features_seconds = time.perf_counter() - start
+        workers = training.get_workers(len(MODELS))
+
+        def train_model(name):
+            feature_names, target = MODELS[name]
+            columns = [FEATURE_COLUMNS.index(column) for column in feature_names]
+            result = training.train(X[:, columns], targets[name], feature_names, mode=mode, workers=workers)
+            timings = dict(result.timings, features=round(features_seconds, 3))
+            return modelstore.save(name, result.booster, dataset_version, feature_names, target, result.accuracy,
+                                   mode=result.mode, rounds=result.rounds, timings=timings, run_id=run_id)
+
+        run_id = f"{dataset_version}-{int(time.time() * 1000)}"
+        with ThreadPoolExecutor(max_workers=len(MODELS), thread_name_prefix='model-training') as executor:
+            futures = {name: executor.submit(train_model, name) for name in MODELS}
+            entries = {name: future.result() for name, future in futures.items()}
+        modelstore.promote(entries)
+        logger.info(f"Trained {list(entries)} from ergast snapshot {dataset_version} in "
+                    f"{time.perf_counter() - start:.1f}s")
+        return entries
+
+_training = {'thread': None}
+_training_lock = threading.Lock()
+
+def _train_in_background():
+    try:
+        train_models()
+    except Exception as e:
+        logger.error(f"Training the prediction models failed: {e}")
+
+def ensure_models(wait=False):
+    #start training in the background if the served models are missing or were trained on older data,
+    #the old models keep being served until the new ones are promoted
+    if driverfeatures.get_version() != dataset_version:
+        update_driver_features()
+    if models_ready():
+        return
+    with _training_lock:
+        thread = _training['thread']
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_train_in_background, name='model-training', daemon=True)
+            thread.start()
+            _training['thread'] = thread
+    if wait:
+        thread.join()
 
 #This is purely for debugging and testing and has nothing to do with the main flask application. 
 #it was just so I didn't have to start the entire flask app everytime
 if __name__ == '__main__':
     logger.info('Starting up...')
-    logger.info(getRacePredictions())
-    logger.info(getQualiPredictions())
+    logger.info(train_models())
+    logger.info(predict.getRacePredictions())
+    logger.info(predict.getQualiPredictions())
     logger.info('Shutting down...')
\ No newline at end of file
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import numpy as np
+from loguru import logger
+from f1Tracker import singleflight
+from f1Tracker import trees
+
+#registry of the trained prediction models, so a web request only ever loads a model and predicts with it
+#models are trained in the background or with flask models train and saved next to their accuracy and
+#the feature schema they were trained on, keyed by the version of the ergast data they were trained from
+#layout: <store dir>/<name>/<dataset version>-<schema hash>-<trained at>/{model.ubj, trees.npz, meta.json},
+#<store dir>/current.json
+#trees.npz is the booster as numpy arrays, all the web app needs to make predictions (see predict.py)
+#current.json says which saved model is served for each name, it is only ever replaced as a whole
+#so promoting new models is atomic and readers keep using the old ones until then
+
+MODEL_FILE = 'model.ubj'
+TREES_FILE = 'trees.npz'
+META_FILE = 'meta.json'
+CURRENT_FILE = 'current.json'
+#bump whenever the files saved with a model change so older models are retrained
+FORMAT_VERSION = 2
+
+class ModelNotReadyError(Exception):
+    pass
+
+_settings = {
+    'dir': os.getenv('MODEL_STORE_DIR', './model_store')
+}
+
+#boosters and trees already loaded by this worker, keyed by the folder and file they were loaded from
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+def configure(store_dir):
+    os.makedirs(store_dir, exist_ok=True)
+    _settings['dir'] = store_dir
+
+def schema_hash(feature_names, target):
+    #changes whenever a model would be trained on different columns
+    return hashlib.sha256(json.dumps([list(feature_names), target]).encode()).hexdigest()[:16]
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def save(name, booster, dataset_version, feature_names, target, accuracy, **meta):
+    #save a trained booster without serving it yet, returns the entry to promote it with
+    hash = schema_hash(feature_names, target)
+    trained_at = time.time()
+    #every training run gets its own folder so a served model is never overwritten
+    model_dir = os.path.join(_settings['dir'], name, f"{dataset_version}-{hash}-{int(trained_at * 1000)}")
+    tmp_dir = f"{model_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    entry = dict(meta, name=name, dataset_version=dataset_version, schema_hash=hash,
+                 feature_names=list(feature_names), target=target, accuracy=accuracy, trained_at=trained_at,
+                 format=FORMAT_VERSION)
+    booster.save_model(os.path.join(tmp_dir, MODEL_FILE))
+    np.savez(os.path.join(tmp_dir, TREES_FILE), **trees.compile_booster(json.loads(booster.save_raw('json'))))
+    _write_json(os.path.join(tmp_dir, META_FILE), entry)
+    os.replace(tmp_dir, model_dir)
+    entry['path'] = os.path.relpath(model_dir, _settings['dir'])
+    return entry
+
+def get_current(name=None):
+    #the entry served for name, or every served entry by name when no name is given
+    try:
+        with open(os.path.join(_settings['dir'], CURRENT_FILE)) as f:
+            current = json.load(f)
+    except (OSError, ValueError):
+        current = {}
+    return current if name is None else current.get(name)
+
+def promote(entries):
+    #serve the given entries ({name: entry}) from now on, all of them switch at once
+    with singleflight.file_lock('model-store'):
+        current = get_current()
+        current.update(entries)
+        _write_json(os.path.join(_settings['dir'], CURRENT_FILE), current)
+    logger.info(f"Promoted {[entry['path'] for entry in entries.values()]}")
+    _prune(entries)
+
+def _prune(entries):
+    #keep the promoted model and the one before it for each name, older ones are never served again
+    current = get_current()
+    for name in entries:
+        name_dir = os.path.join(_settings['dir'], name)
+        model_dirs = sorted((os.path.join(name_dir, folder) for folder in os.listdir(name_dir)
+                             if not folder.endswith('.tmp')), key=os.path.getmtime, reverse=True)
+        keep = {os.path.join(_settings['dir'], current[name]['path'])} if name in current else set()
+        for model_dir in model_dirs:
+            if model_dir not in keep and len(keep) >= 2:
+                shutil.rmtree(model_dir, ignore_errors=True)
+            keep.add(model_dir)
+
+def _load(entry, file, load):
+    #a file saved with an entry, loaded once per worker
+    path = os.path.join(_settings['dir'], entry['path'], file)
+    with _loaded_lock:
+        loaded = _loaded.get(path)
+        if loaded is None:
+            loaded = _loaded[path] = load(path)
+        return loaded
+
+def _load_arrays(path):
+    with np.load(path) as arrays:
+        return dict(arrays)
+
+def load_booster(entry):
+    #the saved xgboost booster, only needed to keep training or inspect a model
+    import xgboost as xgb
+
+    def load(path):
+        booster = xgb.Booster()
+        booster.load_model(path)
+        return booster
+    return _load(entry, MODEL_FILE, load)
+
+def load_trees(entry):
+    #the saved booster's trees to predict with trees.predict
+    return _load(entry, TREES_FILE, _load_arrays)
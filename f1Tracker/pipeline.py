@@ -0,0 +1,134 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from loguru import logger
+from f1Tracker import f1data
+from f1Tracker import f1cache
+from f1Tracker import lapstore
+from f1Tracker import graphstore
+from f1Tracker import render
+from f1Tracker import singleflight
+
+#batch pipeline that renders every graph for a Grand Prix straight after the race weekend
+#so the first visitors don't pay for the cold renders
+#1. the race and qualifying sessions are loaded once in this process with everything their graphs need,
+#   which fills the fastf1 cache and the lap store
+#2. the dataset each graph is drawn from is extracted once from those sessions
+#3. the graphs are rendered from those datasets in a process pool as matplotlib is CPU bound and holds the GIL,
+#   the workers are handed the datasets so they never load a session or the schedule themselves
+#   from inside the web app the workers are spawned instead of forked, forking a process whose other threads
+#   hold locks can leave the children deadlocked
+
+_worker_data = {}
+
+def _configure(config):
+    f1cache.enable(config['F1_CACHE_DIR'], offline=config.get('F1_CACHE_OFFLINE', False))
+    lapstore.configure(config.get('F1_LAP_STORE_DIR'))
+    graphstore.configure(config['GRAPH_STORE_DIR'])
+    if config.get('LOCK_DIR'):
+        singleflight.configure(config['LOCK_DIR'])
+
+def _init_worker(config, year, datasets):
+    #the workers only draw and store graphs so they just need the graph store, the locks and the datasets
+    graphstore.configure(config['GRAPH_STORE_DIR'])
+    if config.get('LOCK_DIR'):
+        singleflight.configure(config['LOCK_DIR'])
+    _worker_data.update(year=year, datasets=datasets)
+
+def _store(year, graph_type, grand_prix, size, theme, draw):
+    #workers rendering the same graph wait on a lock file and then find it in the store
+    with singleflight.file_lock(graphstore.get_lock_name(graphstore.get_key(year, grand_prix, graph_type, size, theme))):
+        image_path = graphstore.get(year, grand_prix, graph_type, size, theme)
+        if image_path is not None:
+            return image_path, False
+        image_data = draw(graphstore.GRAPH_SIZES[size], theme)
+        return graphstore.put(year, grand_prix, graph_type, size, theme, image_data.getvalue()), True
+
+def render_to_store(f1_data, graph_type, grand_prix, size, theme):
+    #render a graph into the graph store unless another worker has already done it
+    return _store(f1_data['R'].year, graph_type, grand_prix, size, theme,
+                  lambda figsize, theme: f1data.render_graph(f1_data, graph_type, grand_prix, figsize, theme))
+
+def _render(graph_type, grand_prix, size, theme):
+    #runs in a worker process, draws one graph from the dataset it was handed into the graph store
+    start = time.perf_counter()
+    try:
+        dataset = _worker_data['datasets'][graph_type]
+        _, rendered = _store(_worker_data['year'], graph_type, grand_prix, size, theme,
+                             lambda figsize, theme: render.DRAWERS[graph_type](dataset, figsize, theme))
+        return graph_type, size, theme, 'rendered' if rendered else 'skipped', time.perf_counter() - start
+    except Exception as e:
+        logger.error(f"Error rendering {graph_type} for {grand_prix}: {e}")
+        return graph_type, size, theme, 'failed', time.perf_counter() - start
+
+def load_sessions(f1_data, grand_prix, session_types):
+    #load each session once with the union of the data all of its graphs need
+    timings = {}
+    for session_type in session_types:
+        data = f1_data[session_type]
+        parts = set()
+        for graph_type, (graph_session_type, _) in f1data.GRAPH_METHODS.items():
+            if graph_session_type == session_type:
+                parts |= f1data.GRAPH_DATA_REQUIREMENTS[graph_type]
+
+        start = time.perf_counter()
+        data.load_session(grand_prix, session_type, parts)
+        timings[session_type] = time.perf_counter() - start
+    return timings
+
+def render_grand_prix(config, grand_prix, sizes=None, themes=None, workers=None, force=False, f1_data=None,
+                      start_method=None):
+    #render every graph type for a Grand Prix into the graph store
+    #graphs already in the store are skipped unless force is set so the pipeline can safely be run again
+    #start_method is the multiprocessing start method of the workers, the platform default if it isn't given
+    sizes = sizes or [graphstore.DEFAULT_SIZE]
+    themes = themes or [graphstore.DEFAULT_THEME]
+    _configure(config)
+    if f1_data is None:
+        f1_data = {'R': f1data.F1RaceData(), 'Q': f1data.F1QualiData()}
+    year = f1_data['R'].year
+
+    results = []
+    jobs = []
+    for graph_type in f1data.GRAPH_METHODS:
+        for size in sizes:
+            for theme in themes:
+                if not force and graphstore.get(year, grand_prix, graph_type, size, theme) is not None:
+                    results.append((graph_type, size, theme, 'skipped', 0.0))
+                else:
+                    jobs.append((graph_type, grand_prix, size, theme))
+
+    if not jobs:
+        logger.info(f"Every graph for {grand_prix} {year} is already stored")
+        return results, {}
+
+    start = time.perf_counter()
+    session_types = sorted({f1data.GRAPH_METHODS[job[0]][0] for job in jobs})
+    load_timings = load_sessions(f1_data, grand_prix, session_types)
+    logger.info(f"Loaded sessions for {grand_prix} in {time.perf_counter() - start:.1f}s")
+
+    #extract each graph's dataset once here so every size and theme rendered by the workers shares it
+    datasets = {}
+    for graph_type in sorted({job[0] for job in jobs}):
+        try:
+            datasets[graph_type] = f1_data[f1data.GRAPH_METHODS[graph_type][0]].get_graph_dataset(grand_prix, graph_type)
+        except Exception as e:
+            logger.error(f"Error extracting {graph_type} for {grand_prix}: {e}")
+    results += [(graph_type, size, theme, 'failed', 0.0) for graph_type, _, size, theme in jobs
+                if graph_type not in datasets]
+    jobs = [job for job in jobs if job[0] in datasets]
+
+    if jobs:
+        workers = workers or min(len(jobs), os.cpu_count() or 1)
+        mp_context = multiprocessing.get_context(start_method) if start_method else None
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context, initializer=_init_worker,
+                                 initargs=(config, year, datasets)) as executor:
+            futures = [executor.submit(_render, *job) for job in jobs]
+            for future in as_completed(futures):
+                results.append(future.result())
+
+    logger.info(f"Rendered {len(jobs)} graphs for {grand_prix} in {time.perf_counter() - start:.1f}s")
+    graph_order = list(f1data.GRAPH_METHODS)
+    results.sort(key=lambda result: graph_order.index(result[0]))
+    return results, load_timings
@@ -0,0 +1,57 @@
+import numpy as np
+from f1Tracker import driverfeatures
+from f1Tracker import modelstore
+from f1Tracker import trees
+
+#inference only predictions for the web app, it loads the served models' trees and reads the latest features of
+#the drivers from the driver features table, it never imports the training pipeline in ml.py, xgboost or scikit-learn
+#so a web worker doesn't hold the ergast data or the training libraries to show the predictions
+
+#the models the predictions are made with, the features each one is trained on and the position it predicts
+MODELS = {
+    'race': (['startingPosition', 'driverExpYears', 'meanPace', 'maxPace'], 'racePosition'),
+    'quali': (['driverExpYears', 'meanPace', 'maxPace'], 'qualiResultPosition')
+}
+
+#the key each prediction's rank is returned under
+RANK_KEYS = {'race': 'rank', 'quali': 'qualifying_rank'}
+
+def is_current(entry, name, dataset_version):
+    #whether a saved model was trained on this version of the data with the features it uses now
+    feature_names, target = MODELS[name]
+    return (entry is not None and entry['dataset_version'] == dataset_version
+            and entry['schema_hash'] == modelstore.schema_hash(feature_names, target)
+            and entry.get('format') == modelstore.FORMAT_VERSION)
+
+def models_ready(dataset_version):
+    #the models and the driver features they predict from are both up to date with the data
+    return (driverfeatures.get_version() == dataset_version
+            and all(is_current(modelstore.get_current(name), name, dataset_version) for name in MODELS))
+
+def predict(name):
+    """
+    Predicted positions with the model being served, it is never trained here
+    Returns the driver codes, their predicted positions (1 based) and the model's accuracy
+    """
+    entry = modelstore.get_current(name)
+    if entry is None or entry.get('format') != modelstore.FORMAT_VERSION:
+        raise modelstore.ModelNotReadyError(f"the {name} model hasn't been trained yet")
+    drivers, X = driverfeatures.get_grid(entry['feature_names'])
+    if not drivers:
+        raise modelstore.ModelNotReadyError("there aren't any driver features to predict from yet")
+    #add 1 to revert to original positions as the indexing starts at 0
+    positions = trees.predict(modelstore.load_trees(entry), X) + 1
+    return drivers, positions, entry['accuracy']
+
+def get_rankings(name):
+    #the drivers in predicted order ranked 1, 2, 3... so there aren't any duplicates of the pecking order
+    drivers, positions, accuracy = predict(name)
+    order = np.argsort(positions, kind='stable')
+    rankings = [{'driver': str(drivers[index]), RANK_KEYS[name]: rank} for rank, index in enumerate(order, 1)]
+    return rankings, accuracy
+
+def getRacePredictions():
+    return get_rankings('race')
+
+def getQualiPredictions():
+    return get_rankings('quali')
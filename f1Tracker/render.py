@@ -0,0 +1,301 @@
+import threading
+from io import BytesIO
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.colors import Normalize
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.lines import Line2D
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+#rendering layer for the graphs, every graph is drawn on its own Figure with its own Agg canvas
+#and styled explicitly from a theme instead of through pyplot and the global rcParams
+#nothing here changes global matplotlib state while rendering so graphs can be rendered in parallel threads
+
+#seaborn and fastf1.plotting are slow to import so they are only imported once a graph is drawn
+_setup_lock = threading.Lock()
+_setup_done = []
+
+def setup_plotting():
+    #register fastf1's timedelta support for matplotlib once before the first graph is drawn, this only adds
+    #unit converters and doesn't touch any styling
+    if _setup_done:
+        return
+    with _setup_lock:
+        if not _setup_done:
+            import fastf1.plotting
+            fastf1.plotting.setup_mpl(mpl_timedelta_support=True, misc_mpl_mods=False, color_scheme=None)
+            _setup_done.append(True)
+
+#the dark theme matches fastf1's colour scheme which the graphs were originally drawn with
+THEMES = {
+    'dark': {
+        'figure': '#292625',
+        'axes': '#1e1c1b',
+        'edge': '#2d2928',
+        'text': '#F1F1F3',
+        'contrast': 'white',
+        'muted': 'grey',
+        'grid': 'black',
+        'legend_face': (0.1, 0.1, 0.1, 0.7),
+        'legend_edge': (0.1, 0.1, 0.1, 0.9)
+    },
+    'light': {
+        'figure': 'white',
+        'axes': 'white',
+        'edge': '#333333',
+        'text': '#111111',
+        'contrast': '#333333',
+        'muted': 'grey',
+        'grid': '#cccccc',
+        'legend_face': (1.0, 1.0, 1.0, 0.8),
+        'legend_edge': (0.8, 0.8, 0.8, 1.0)
+    }
+}
+
+def get_theme(theme):
+    return THEMES[theme]
+
+def style_axes(ax, theme):
+    colors = get_theme(theme)
+    ax.set_facecolor(colors['axes'])
+    for spine in ax.spines.values():
+        spine.set_edgecolor(colors['edge'])
+    ax.tick_params(which='both', colors=colors['text'])
+    ax.xaxis.label.set_color(colors['text'])
+    ax.yaxis.label.set_color(colors['text'])
+    ax.title.set_color(colors['text'])
+    ax.set_axisbelow(True)
+
+def new_figure(figsize, theme):
+    #a figure owned by the caller, it never goes through pyplot so it doesn't need closing
+    setup_plotting()
+    fig = Figure(figsize=figsize, facecolor=get_theme(theme)['figure'])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    style_axes(ax, theme)
+    return fig, ax
+
+def set_title(fig, title, theme):
+    fig.suptitle(title, color=get_theme(theme)['text'])
+
+def legend_style(theme):
+    colors = get_theme(theme)
+    return dict(facecolor=colors['legend_face'], edgecolor=colors['legend_edge'], fancybox=False,
+                labelcolor=colors['text'])
+
+def style_legend(legend, theme):
+    #for legends created by seaborn
+    if legend is None:
+        return
+    colors = get_theme(theme)
+    legend.get_frame().set_facecolor(colors['legend_face'])
+    legend.get_frame().set_edgecolor(colors['legend_edge'])
+    for text in legend.get_texts():
+        text.set_color(colors['text'])
+    legend.get_title().set_color(colors['text'])
+
+def style_colorbar(cbar, theme):
+    colors = get_theme(theme)
+    cbar.ax.tick_params(which='both', colors=colors['text'])
+    cbar.ax.yaxis.label.set_color(colors['text'])
+    cbar.outline.set_edgecolor(colors['edge'])
+
+def to_png(fig):
+    buf = BytesIO()
+    fig.savefig(buf, format="png", facecolor=fig.get_facecolor())
+    buf.seek(0)
+    return buf
+
+#draw functions, each one takes a dataset from the graphdata module and returns the PNG
+
+def draw_positions_change_during_a_race(dataset, figsize=(15, 10), theme='dark'):
+    fig, ax = new_figure(figsize, theme)
+
+    #every driver's trace is one line in a single collection, laps without a position leave a gap
+    lap_numbers = np.broadcast_to(dataset.lap_numbers, dataset.positions.shape)
+    traces = LineCollection(np.stack([lap_numbers, dataset.positions], axis=-1),
+                            colors=dataset.colors, linestyles=dataset.linestyles)
+    ax.add_collection(traces)
+    ax.autoscale_view()
+    #the collection is a single artist so the legend gets a handle per driver
+    handles = [Line2D([], [], color=color, linestyle=linestyle, label=driver)
+               for driver, color, linestyle in zip(dataset.drivers, dataset.colors, dataset.linestyles)]
+
+    #customize the plot axis
+    ax.set_ylim([20.5, 0.5])
+    ax.set_yticks([1, 5, 10, 15, 20])
+    ax.set_xlabel('Lap')
+    ax.set_ylabel('Position')
+    ax.legend(handles=handles, loc='upper left', bbox_to_anchor=(1.0, 1.02), **legend_style(theme))
+
+    set_title(fig, dataset.title, theme)
+    return to_png(fig)
+
+def draw_team_pace_comparison(dataset, figsize=(15, 10), theme='dark'):
+    import seaborn as sns
+    colors = get_theme(theme)
+    fig, ax = new_figure(figsize, theme)
+
+    #seaborn wants one row per lap
+    teams = np.repeat(dataset.teams, [len(lap_times) for lap_times in dataset.lap_times])
+    lap_times = np.concatenate(dataset.lap_times) if dataset.lap_times else np.array([], dtype=np.float32)
+    sns.boxplot(
+        x=teams,
+        y=lap_times,
+        hue=teams,
+        order=dataset.teams,
+        palette=dict(zip(dataset.teams, dataset.colors)),
+        whiskerprops=dict(color=colors['contrast']),
+        boxprops=dict(edgecolor=colors['contrast']),
+        medianprops=dict(color=colors['muted']),
+        capprops=dict(color=colors['contrast']),
+        ax=ax
+    )
+    style_legend(ax.get_legend(), theme)
+
+    set_title(fig, dataset.title, theme)
+    ax.grid(visible=False)
+
+    #x axis is doesn't do anything for team pace comparison as it is just a comparison and so its all relative
+    ax.set(xlabel=None, ylabel="LapTime (s)")
+    fig.tight_layout()
+    return to_png(fig)
+
+def draw_driver_laptime_comparison(dataset, figsize=(15, 10), theme='dark'):
+    import seaborn as sns
+    fig, ax = new_figure(figsize, theme)
+
+    drivers = np.array(dataset.drivers, dtype=object)[dataset.driver_index]
+    #laps without a known compound get no colour so they aren't drawn by the swarm plot
+    compounds = np.array(dataset.compounds + [None], dtype=object)[dataset.compound_index]
+
+    #violin plots to show the distributions then I use swarm plot to show the actual laptimes.
+    sns.violinplot(x=drivers,
+                   y=dataset.lap_times,
+                   hue=drivers,
+                   inner=None,
+                   density_norm="area",
+                   order=dataset.drivers,
+                   palette=dict(zip(dataset.drivers, dataset.driver_colors)),
+                   ax=ax
+                   )
+
+    sns.swarmplot(x=drivers,
+                  y=dataset.lap_times,
+                  order=dataset.drivers,
+                  hue=compounds,
+                  palette=dict(zip(dataset.compounds, dataset.compound_colors)),
+                  hue_order=["SOFT", "MEDIUM", "HARD"],
+                  linewidth=0,
+                  size=4,
+                  ax=ax
+                  )
+    style_legend(ax.get_legend(), theme)
+
+    #make the plot more aesthetic
+    ax.set_xlabel("Driver")
+    ax.set_ylabel("Lap Time (s)")
+    set_title(fig, dataset.title, theme)
+    sns.despine(ax=ax, left=True, bottom=True)
+
+    fig.tight_layout()
+    return to_png(fig)
+
+def _bar_vertices(left, width, y, height=0.8):
+    #corners of horizontal bars centred on y, the same shape ax.barh draws
+    right = left + width
+    bottom, top = y - height / 2, y + height / 2
+    return np.stack([np.stack([left, bottom], axis=-1), np.stack([left, top], axis=-1),
+                     np.stack([right, top], axis=-1), np.stack([right, bottom], axis=-1)], axis=1)
+
+def draw_tyre_strategies(dataset, figsize=(15, 10), theme='dark'):
+    fig, ax = new_figure(figsize, theme)
+
+    #every stint on a compound is drawn as a horizontal bar in one collection, like broken_barh but across all drivers
+    #this is far quicker than a patch per stint as matplotlib updates the axis limits for every patch added
+    for compound_index, color in enumerate(dataset.compound_colors):
+        stints = dataset.compound_index == compound_index
+        bars = PolyCollection(
+            _bar_vertices(dataset.stint_starts[stints], dataset.stint_lengths[stints], dataset.driver_index[stints]),
+            facecolors=color, edgecolors="black", linewidths=1.0
+        )
+        #bars start at lap 0 so the x axis doesn't get a margin before it, the same as barh
+        bars.sticky_edges.x.append(0)
+        ax.add_collection(bars)
+    ax.autoscale_view()
+    ax.set_yticks(np.arange(len(dataset.drivers)), labels=dataset.drivers)
+
+    #make the plot more readable and intuitive
+    set_title(fig, dataset.title, theme)
+    ax.set_xlabel("Lap Number")
+    ax.grid(False)
+    #invert the y-axis so drivers that finish higher are closer to the top
+    ax.invert_yaxis()
+
+    #plot aesthetics
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_visible(False)
+
+    fig.tight_layout()
+    return to_png(fig)
+
+def draw_quali_results_overview(dataset, figsize=(15, 10), theme='dark'):
+    colors = get_theme(theme)
+    fig, ax = new_figure(figsize, theme)
+
+    positions = np.arange(len(dataset.drivers))
+    ax.barh(positions, dataset.deltas, color=dataset.colors, edgecolor=colors['muted'])
+    ax.set_yticks(positions)
+    ax.set_yticklabels(dataset.drivers)
+
+    #show fastest at the top
+    ax.invert_yaxis()
+
+    #draw vertical lines behind the bars
+    ax.set_axisbelow(True)
+    ax.xaxis.grid(True, which='major', linestyle='--', color=colors['grid'], zorder=-1000)
+
+    set_title(fig, dataset.title, theme)
+    return to_png(fig)
+
+def draw_gear_shifts(dataset, figsize=(15, 10), theme='dark'):
+    #build one line segment between every pair of consecutive points on the lap
+    points = np.array([dataset.x, dataset.y]).T.reshape(-1, 1, 2)
+    segments = np.concatenate([points[:-1], points[1:]], axis=1)
+
+    fig, ax = new_figure(figsize, theme)
+
+    #create a line collection. Set a segmented colormap and normalize the plot
+    #to full integer values of the colormap
+    cmap = colormaps['Paired']
+    lc_comp = LineCollection(segments, norm=Normalize(1, cmap.N+1), cmap=cmap)
+    lc_comp.set_array(dataset.gears.astype(float))
+    lc_comp.set_linewidth(4)
+
+    ax.add_collection(lc_comp)
+    ax.axis('equal')
+    ax.tick_params(labelleft=False, left=False, labelbottom=False, bottom=False)
+
+    set_title(fig, dataset.title, theme)
+
+    #add a colorbar to the plot. Shift the colorbar ticks by +0.5 so that they
+    #are centered for each color segment.
+    cbar = fig.colorbar(mappable=lc_comp, ax=ax, label="Gear",
+                        boundaries=np.arange(1, 10))
+    cbar.set_ticks(np.arange(1.5, 9.5))
+    cbar.set_ticklabels(np.arange(1, 9))
+    style_colorbar(cbar, theme)
+
+    return to_png(fig)
+
+#graph type -> function that draws it from its dataset (see graphdata.EXTRACTORS)
+DRAWERS = {
+    "Position Changed during a Race": draw_positions_change_during_a_race,
+    "Qualifying Results Overview": draw_quali_results_overview,
+    "Team Pace Comparison": draw_team_pace_comparison,
+    "Driver Laptime Comparison": draw_driver_laptime_comparison,
+    "Gear Shifts on Track": draw_gear_shifts,
+    "Tyre Strategies During a Race": draw_tyre_strategies
+}
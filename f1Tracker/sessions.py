@@ -0,0 +1,176 @@
+import os
+import threading
+import fastf1
+from collections import OrderedDict
+from fastf1.core import Laps
+from loguru import logger
+from f1Tracker.singleflight import SingleFlight
+
+#data parts a FastF1 session can be loaded with, these match the session.load() flags
+DATA_PARTS = ('laps', 'telemetry', 'weather', 'messages')
+
+#telemetry for the fastest lap only, fastf1 can only download telemetry for the whole session
+#so the fastest lap is cut out straight after loading and the rest isn't kept in the cache
+FASTEST_LAP_TELEMETRY = 'fastest_lap_telemetry'
+
+#parts that also satisfy a request for a smaller part
+PART_COVERS = {'telemetry': {FASTEST_LAP_TELEMETRY}}
+
+def load_flags(parts):
+    #turn a set of data parts into the narrowest keyword arguments for session.load()
+    flags = {part: part in parts for part in DATA_PARTS}
+    if FASTEST_LAP_TELEMETRY in parts:
+        flags['telemetry'] = True
+    return flags
+
+def covered_parts(parts):
+    #every part a session loaded with these parts can serve
+    covered = set(parts)
+    for part in parts:
+        covered |= PART_COVERS.get(part, set())
+    return frozenset(covered)
+
+#fastf1 has no public way to give a session laps read back from the lap store or to drop its car and position data,
+#the private attributes behind session.laps, car_data and pos_data are only written on the fastf1 versions
+#(major.minor) they have been checked against
+FASTF1_PRIVATE_ATTRIBUTE_VERSIONS = ('3.4',)
+
+def can_set_private_attributes():
+    return '.'.join(fastf1.__version__.split('.')[:2]) in FASTF1_PRIVATE_ATTRIBUTE_VERSIONS
+
+def _set_private_attributes(session, **values):
+    #the one place a fastf1 session's private attributes are written, returns whether they were
+    if not can_set_private_attributes():
+        return False
+    for name, value in values.items():
+        setattr(session, f"_{name}", value)
+    return True
+
+def set_laps(session, laps):
+    #give a loaded session laps read back from the lap store, only call it if can_set_private_attributes()
+    if not _set_private_attributes(session, laps=Laps(laps, session=session)):
+        raise RuntimeError(f"can't set the laps of a session on fastf1 {fastf1.__version__}")
+
+def attach_fastest_lap_telemetry(session, telemetry=None):
+    #keep the fastest lap's telemetry on the session and drop the rest of the car and position data,
+    #on fastf1 versions the private attributes aren't checked against the rest is kept
+    if telemetry is None:
+        telemetry = session.laps.pick_fastest().get_telemetry()
+    session.fastest_lap_telemetry = telemetry
+    _set_private_attributes(session, car_data={}, pos_data={})
+    return session
+
+def _session_size(session):
+    #rough estimate of how much memory a loaded session holds, used for the memory budget
+    #fastf1 raises if a part wasn't loaded so each part is checked on its own
+    size = 0
+    for attr in ('_laps', '_results', '_weather_data', '_race_control_messages', '_track_status'):
+        frame = getattr(session, attr, None)
+        if frame is not None and hasattr(frame, 'memory_usage'):
+            size += int(frame.memory_usage(deep=True).sum())
+
+    telemetry = getattr(session, 'fastest_lap_telemetry', None)
+    if telemetry is not None:
+        size += int(telemetry.memory_usage(deep=True).sum())
+
+    for attr in ('_car_data', '_pos_data'):
+        frames = getattr(session, attr, None) or {}
+        for frame in frames.values():
+            size += int(frame.memory_usage(deep=True).sum())
+
+    return size
+
+
+class SessionCache():
+    """
+    Process wide LRU cache of loaded FastF1 sessions shared by all the F1Data classes
+    Sessions are keyed by (year, round, session type) and remember which data parts they were loaded with,
+    so a session loaded with more data can be reused for a request that needs less
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  #key -> (session, parts, size)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._flights = SingleFlight()
+
+    def get(self, key, parts, loader):
+        #parts is the set of data parts the caller needs, loader(parts) loads and returns a fresh session
+        parts = frozenset(parts)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and parts <= covered_parts(entry[1]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        #threads missing on the same session wait for one load instead of each loading it
+        session, loaded_parts = self._flights.do(key, lambda: self._load(key, parts, loader))
+        if parts <= covered_parts(loaded_parts):
+            return session
+        #the load that was waited on didn't include everything this caller needs
+        return self.get(key, parts, loader)
+
+    def _load(self, key, parts, loader):
+        with self._lock:
+            self.misses += 1
+            #if a session is already cached with some parts, load the union so the new entry covers both
+            entry = self._entries.get(key)
+            if entry is not None:
+                parts = parts | entry[1]
+
+        logger.info(f"Session cache miss for {key}, loading {sorted(parts)}")
+        session = loader(parts)
+        self.put(key, parts, session)
+        return session, parts
+
+    def put(self, key, parts, session):
+        size = _session_size(session)
+        with self._lock:
+            #a session bigger than the whole budget is still returned to the caller but isn't kept
+            if size > self.max_bytes:
+                logger.warning(f"Session {key} ({size} bytes) is bigger than the cache budget, not caching it")
+                self._entries.pop(key, None)
+                return
+
+            self._entries[key] = (session, frozenset(parts), size)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        #drop the least recently used sessions until the cache is back within budget
+        while self._entries and self.current_bytes() > self.max_bytes:
+            key, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            logger.info(f"Evicted session {key} from the session cache")
+
+    def current_bytes(self):
+        with self._lock:
+            return sum(entry[2] for entry in self._entries.values())
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'coalesced': self._flights.coalesced,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes(),
+                'max_bytes': self.max_bytes
+            }
+
+
+#shared by every F1Data object in the process, the budget can be changed with F1_SESSION_CACHE_MB
+session_cache = SessionCache(int(os.getenv('F1_SESSION_CACHE_MB', 512)) * 1024 * 1024)
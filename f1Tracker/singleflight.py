@@ -0,0 +1,102 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  #not available on windows, locking between processes is skipped there
+    fcntl = None
+
+#request coalescing, when lots of users ask for the same thing at once only one of them does the work
+#SingleFlight shares one in-flight call between the threads of a worker
+#file_lock makes the other workers wait for it so they can pick the result up from a shared store afterwards
+
+_settings = {
+    'lock_dir': os.path.join(tempfile.gettempdir(), 'f1tracker-locks')
+}
+
+def configure(lock_dir):
+    os.makedirs(lock_dir, exist_ok=True)
+    _settings['lock_dir'] = lock_dir
+
+class _Call():
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight():
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, work):
+        #run work() once for all the threads asking for the same key at the same time
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = work()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters:
+                logger.debug(f"{call.waiters} callers shared the result for {key}")
+            call.done.set()
+
+def _lock_path(name):
+    safe_name = ''.join(char if char.isalnum() or char in '-_.' else '_' for char in name)
+    return os.path.join(_settings['lock_dir'], f"{safe_name}.lock")
+
+@contextmanager
+def file_lock(name):
+    #exclusive lock shared by every worker process on this machine
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(_settings['lock_dir'], exist_ok=True)
+    with open(_lock_path(name), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def is_locked(name):
+    #whether any worker holds file_lock(name) right now, checked without waiting for it
+    if fcntl is None:
+        return False
+    try:
+        lock_file = open(_lock_path(name), 'r')
+    except OSError:
+        #nobody has taken it yet
+        return False
+    with lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return False
@@ -0,0 +1,124 @@
+import os
+import time
+import multiprocessing
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import xgboost as xgb
+from loguru import logger
+
+#training engine for the prediction models
+#the cross validation folds are trained at the same time in worker processes, each one stops early on a
+#fold it isn't scored on, and the final model is trained once on all the data for as many rounds as the
+#folds needed, so the accuracy comes straight from the fold models and never needs another pass
+
+#fast is for development, full is for the nightly and production models, pick with MODEL_TRAINING_MODE
+TRAINING_MODES = {
+    'fast': {'folds': 3, 'max_rounds': 100, 'early_stopping_rounds': 10, 'max_bin': 64},
+    'full': {'folds': 10, 'max_rounds': 1000, 'early_stopping_rounds': 30, 'max_bin': 256}
+}
+
+_settings = {
+    'mode': os.getenv('MODEL_TRAINING_MODE', 'full'),
+    #defaults to one worker per fold, up to the number of cpus
+    'workers': int(os.getenv('MODEL_TRAINING_WORKERS', 0)) or None
+}
+
+@dataclass
+class TrainingResult:
+    booster: xgb.Booster
+    accuracy: int
+    fold_accuracies: list
+    rounds: int
+    mode: str
+    timings: dict = field(default_factory=dict)
+
+def get_workers(trainings=1):
+    #fold worker processes for each of several trainings running at once, they share the machine's cpus
+    return max(1, (_settings['workers'] or os.cpu_count() or 1) // trainings)
+
+def get_params(num_class, mode, nthread):
+    return {
+        'objective': 'multi:softmax',
+        'num_class': num_class,
+        'eval_metric': 'mlogloss',
+        'tree_method': 'hist',
+        'max_bin': TRAINING_MODES[mode]['max_bin'],
+        'seed': 42,
+        'nthread': nthread
+    }
+
+#the data each worker process trains its folds on, sent once when the worker starts
+_worker_data = {}
+
+def _init_worker(X, y, feature_names):
+    _worker_data.update(X=X, y=y, feature_names=feature_names)
+
+def _train_fold(params, mode, train_index, stop_index, test_index):
+    #train on train_index, stop early on stop_index and score on test_index which it never saw
+    X, y, feature_names = _worker_data['X'], _worker_data['y'], _worker_data['feature_names']
+    settings = TRAINING_MODES[mode]
+    start = time.perf_counter()
+    dtrain = xgb.DMatrix(X[train_index], y[train_index], feature_names=feature_names)
+    dstop = xgb.DMatrix(X[stop_index], y[stop_index], feature_names=feature_names)
+    booster = xgb.train(params, dtrain, num_boost_round=settings['max_rounds'], evals=[(dstop, 'stop')],
+                        early_stopping_rounds=settings['early_stopping_rounds'], verbose_eval=False)
+    rounds = booster.best_iteration + 1
+    predicted = booster.predict(xgb.DMatrix(X[test_index], feature_names=feature_names),
+                                iteration_range=(0, rounds))
+    return float(np.mean(predicted == y[test_index])), rounds, time.perf_counter() - start
+
+def get_folds(y, folds):
+    #stratified folds in order like cross_val_score used, each fold stops early on the next one
+    #imported here so worker processes don't need scikit-learn
+    from sklearn.model_selection import StratifiedKFold
+    splits = [test_index for _, test_index in StratifiedKFold(n_splits=folds).split(np.zeros(len(y)), y)]
+    for fold, test_index in enumerate(splits):
+        stop_index = splits[(fold + 1) % folds]
+        train_index = np.concatenate([index for other, index in enumerate(splits)
+                                      if other not in (fold, (fold + 1) % folds)])
+        yield train_index, stop_index, test_index
+
+def train(X, y, feature_names, mode=None, workers=None):
+    """
+    Train a classifier predicting y (0 based positions) from X, a float32 matrix with one column per feature
+    Returns the booster trained on all the data and the mean accuracy of the cross validation folds
+    """
+    mode = mode or _settings['mode']
+    settings = TRAINING_MODES[mode]
+    num_class = int(y.max()) + 1
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or get_workers(), settings['folds']))
+    timings = {}
+
+    start = time.perf_counter()
+    folds = list(get_folds(y, settings['folds']))
+    #each worker gets an equal share of the cpus so the folds don't fight over them
+    fold_params = get_params(num_class, mode, max(1, cpus // workers))
+    if workers == 1:
+        _init_worker(X, y, feature_names)
+        fold_results = [_train_fold(fold_params, mode, *fold) for fold in folds]
+    else:
+        #spawned rather than forked, forking a process that has already run xgboost's threads can hang
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(X, y, feature_names)) as executor:
+            futures = [executor.submit(_train_fold, fold_params, mode, *fold) for fold in folds]
+            fold_results = [future.result() for future in futures]
+    timings['folds'] = time.perf_counter() - start
+    timings['slowest_fold'] = max(seconds for _, _, seconds in fold_results)
+
+    #the final model trains for as many rounds as the folds stopped at, no early stopping set is needed
+    start = time.perf_counter()
+    rounds = int(np.median([fold_rounds for _, fold_rounds, _ in fold_results]))
+    booster = xgb.train(get_params(num_class, mode, cpus), xgb.DMatrix(X, y, feature_names=feature_names),
+                        num_boost_round=rounds)
+    timings['final_fit'] = time.perf_counter() - start
+    timings['total'] = timings['folds'] + timings['final_fit']
+
+    fold_accuracies = [accuracy for accuracy, _, _ in fold_results]
+    result = TrainingResult(booster=booster, accuracy=round(np.mean(fold_accuracies) * 100),
+                            fold_accuracies=fold_accuracies, rounds=rounds, mode=mode,
+                            timings={stage: round(seconds, 3) for stage, seconds in timings.items()})
+    logger.info(f"Trained {feature_names} in {mode} mode with {workers} workers: {result.accuracy}% accurate, "
+                f"{rounds} rounds, timings {result.timings}")
+    return result
@@ -0,0 +1,67 @@
+import time
+import threading
+from loguru import logger
+
+#slow startup work (the season schedule from fastf1, the ergast data behind the predictions) runs on a
+#background thread instead of when the app is imported, so a worker boots straight away and a flaky
+#network only delays the parts that need it
+#everything it loads is also loaded on first use so requests that arrive before it finishes still work
+
+class WarmUp():
+    def __init__(self, tasks, required, retry_seconds=60):
+        #tasks maps a name to a function, a task that raises is tried again after retry_seconds
+        #the worker is ready once every task named in required has finished
+        self.tasks = tasks
+        self.required = tuple(required)
+        self.retry_seconds = retry_seconds
+        self._states = {name: 'pending' for name in tasks}
+        self._errors = {}
+        self._seconds = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        #start the warm-up thread, only the first call does anything
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='warm-up', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        pending = list(self.tasks)
+        while pending:
+            for name in list(pending):
+                self._states[name] = 'running'
+                start = time.perf_counter()
+                try:
+                    self.tasks[name]()
+                except Exception as e:
+                    logger.error(f"Warm-up task {name} failed, retrying in {self.retry_seconds}s: {e}")
+                    self._states[name] = 'failed'
+                    self._errors[name] = str(e)
+                    continue
+
+                self._seconds[name] = round(time.perf_counter() - start, 3)
+                self._states[name] = 'ready'
+                self._errors.pop(name, None)
+                pending.remove(name)
+                logger.info(f"Warm-up task {name} finished in {self._seconds[name]}s")
+
+            if pending:
+                time.sleep(self.retry_seconds)
+
+    def started(self):
+        return self._thread is not None
+
+    def ready(self):
+        return all(self._states[name] == 'ready' for name in self.required)
+
+    def status(self):
+        return {
+            'ready': self.ready(),
+            'tasks': {name: {'state': state, 'required': name in self.required,
+                             'seconds': self._seconds.get(name), 'error': self._errors.get(name)}
+                      for name, state in self._states.items()}
+        }
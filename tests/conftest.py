@@ -0,0 +1,22 @@
+import os
+import shutil
+import tempfile
+
+#importing f1Tracker.app sets up every store from the environment, in the tests they go in a temporary directory
+#rather than the directory pytest was started from
+STORE_DIR = tempfile.mkdtemp(prefix='f1tracker-tests-')
+STORES = {
+    'F1_CACHE_DIR': 'f1_cache',
+    'F1_LAP_STORE_DIR': 'f1_lap_store',
+    'GRAPH_STORE_DIR': 'graph_store',
+    'LOCK_DIR': 'locks',
+    'ERGAST_DIR': 'ergast_data',
+    'FEATURE_STORE_DIR': 'feature_store',
+    'MODEL_STORE_DIR': 'model_store'
+}
+for name, store in STORES.items():
+    os.environ[name] = os.path.join(STORE_DIR, store)
+os.environ['DRIVER_FEATURES_DB'] = os.path.join(STORE_DIR, 'model_store', 'driver_features.sqlite')
+
+def pytest_unconfigure(config):
+    shutil.rmtree(STORE_DIR, ignore_errors=True)
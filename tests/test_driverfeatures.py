@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from f1Tracker import driverfeatures
+
+@pytest.fixture
+def table(tmp_path):
+    driverfeatures.configure(str(tmp_path / 'driver_features.sqlite'))
+
+def get_row(driver_id, race, grid, races):
+    #(driverId, code, raceIdOrdered, year, startingPosition, driverExpYears, driverExpRaces, meanPace, maxPace)
+    return (driver_id, f"D{driver_id}", race, 2024, grid, 1, races, 90000.0 + driver_id, 91000.0 + driver_id)
+
+def test_the_grid_is_the_latest_race_in_grid_order(table):
+    assert driverfeatures.get_version() is None and driverfeatures.get_high_water_mark() == 0
+    drivers, X = driverfeatures.get_grid(['startingPosition', 'driverExpRaces'])
+    assert drivers == [] and X.shape == (0, 2)
+
+    driverfeatures.update([get_row(1, 1, 2, 1), get_row(2, 1, 1, 1), get_row(3, 1, 3, 1)], 'v1', 1)
+    #driver 3 didn't start the second race
+    driverfeatures.update([get_row(1, 2, 1, 2), get_row(2, 2, 2, 2)], 'v2', 2)
+    assert driverfeatures.get_version() == 'v2' and driverfeatures.get_high_water_mark() == 2
+
+    drivers, X = driverfeatures.get_grid(['driverExpRaces', 'startingPosition'])
+    assert drivers == ['D1', 'D2']
+    assert X.dtype == np.float32 and X.tolist() == [[2, 1], [2, 2]]
+
+def test_older_rows_never_replace_newer_ones(table):
+    driverfeatures.update([get_row(1, 2, 5, 2)], 'v1', 2)
+    driverfeatures.update([get_row(1, 1, 9, 1)], 'v1', 2)
+    assert driverfeatures.get_grid(['startingPosition'])[1].tolist() == [[5]]
+
+    driverfeatures.update([get_row(1, 1, 9, 1)], 'v2', 1, replace=True)
+    assert driverfeatures.get_grid(['startingPosition'])[1].tolist() == [[9]]
+    assert driverfeatures.get_high_water_mark() == 1
+
+def test_only_driver_features_can_be_looked_up(table):
+    with pytest.raises(ValueError):
+        driverfeatures.get_grid(['startingPosition', 'racePosition; DROP TABLE driver_features'])
+
+def test_the_feature_build_the_rows_came_from_is_kept(table):
+    assert driverfeatures.get_feature_build() is None
+    driverfeatures.update([get_row(1, 1, 2, 1)], 'v1', 1, feature_build='v1-1-1')
+    driverfeatures.update([get_row(1, 2, 2, 2)], 'v2', 2)
+    assert driverfeatures.get_feature_build() == 'v1-1-1'
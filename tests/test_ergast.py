@@ -0,0 +1,141 @@
+import io
+import os
+import zipfile
+import numpy as np
+import pandas as pd
+import pytest
+from f1Tracker import ergast
+from f1Tracker import singleflight
+
+def make_ergast_csvs(seed=0, years=(2012, 2013, 2014, 2015), races_per_year=12, drivers=8):
+    #a small ergast database laid out like the real csvs, including the columns and \N values ml doesn't use
+    rng = np.random.default_rng(seed)
+    driver_rows = [{'driverId': driver_id, 'driverRef': f"driver{driver_id}", 'number': '\\N',
+                    'code': f"D{driver_id:02d}" if driver_id > 1 else '\\N', 'forename': 'A', 'surname': 'B',
+                    'dob': '1990-01-01', 'nationality': ['British', 'Dutch', 'German'][driver_id % 3], 'url': ''}
+                   for driver_id in range(1, drivers + 3)]
+
+    race_rows, result_rows, quali_rows = [], [], []
+    race_id = 100
+    for year in years:
+        for round_number in range(1, races_per_year + 1):
+            #race ids aren't in date order in ergast either
+            race_id -= 1 if round_number % 2 else -7
+            race_rows.append({'raceId': race_id, 'year': year, 'round': round_number, 'circuitId': 1,
+                              'name': f"Grand Prix {round_number}", 'date': (pd.Timestamp(year, 3, 1) + pd.Timedelta(weeks=2 * round_number)).strftime('%Y-%m-%d'),
+                              'time': '\\N', 'url': ''})
+            #drivers join and leave over the years
+            entrants = rng.permutation(np.arange(1 + (year - years[0]), drivers + 1 + (year - years[0])))
+            for position, driver_id in enumerate(entrants, start=1):
+                result_rows.append({'resultId': len(result_rows) + 1, 'raceId': race_id, 'driverId': int(driver_id),
+                                    'constructorId': 1, 'number': '\\N',
+                                    'grid': 0 if rng.random() < 0.03 else int(rng.integers(1, drivers + 1)),
+                                    'position': position, 'positionText': str(position),
+                                    'positionOrder': position, 'points': 0, 'laps': 50, 'time': '\\N',
+                                    'milliseconds': '\\N', 'fastestLap': '\\N', 'rank': '\\N',
+                                    'fastestLapTime': '\\N', 'fastestLapSpeed': '\\N', 'statusId': 1})
+                times = [f"1:{int(rng.integers(20, 40))}.{int(rng.integers(0, 1000)):03d}" for _ in range(3)]
+                if position > drivers // 2:
+                    times[2] = '\\N'
+                if position > drivers - 2:
+                    times[1] = '\\N'
+                if rng.random() < 0.03:
+                    times[0] = '\\N'
+                quali_rows.append({'qualifyId': len(quali_rows) + 1, 'raceId': race_id, 'driverId': int(driver_id),
+                                   'constructorId': 1, 'number': 1, 'position': position,
+                                   'q1': times[0], 'q2': times[1], 'q3': times[2]})
+        #one race without qualifying data
+        quali_rows = [row for row in quali_rows if row['raceId'] != race_id or year != years[-2]]
+
+    return {'drivers.csv': pd.DataFrame(driver_rows), 'races.csv': pd.DataFrame(race_rows),
+            'results.csv': pd.DataFrame(result_rows), 'qualifying.csv': pd.DataFrame(quali_rows),
+            'circuits.csv': pd.DataFrame({'circuitId': [1], 'name': ['Circuit']})}
+
+def write_ergast_zip(path, csvs=None):
+    csvs = csvs or make_ergast_csvs()
+    with zipfile.ZipFile(path, 'w') as zip_file:
+        for name, frame in csvs.items():
+            zip_file.writestr(name, frame.to_csv(index=False))
+    return path
+
+@pytest.fixture
+def offline_store(tmp_path):
+    singleflight.configure(str(tmp_path / 'locks'))
+    ergast.configure(str(tmp_path / 'ergast'), offline=True)
+    yield tmp_path
+    ergast.configure(str(tmp_path / 'ergast'), offline=False)
+
+def test_imported_zip_is_converted_to_typed_tables(offline_store):
+    manifest = ergast.import_zip(write_ergast_zip(offline_store / 'f1db_csv.zip'))
+    version, tables = ergast.load_snapshot()
+
+    assert version == manifest['version'] == ergast.get_version()
+    assert set(tables) == set(ergast.TABLES)
+    for name, columns in ergast.TABLES.items():
+        assert list(tables[name].columns) == list(columns)
+    assert tables['results']['grid'].dtype == np.int16
+    assert tables['races']['date'].dtype.kind == 'M'
+    #strings are kept as ergast wrote them so ml can treat \N the way it always has
+    assert tables['qualifying']['q3'].dtype == object and '\\N' in set(tables['qualifying']['q3'])
+    assert (tables['drivers']['code'] == '\\N').sum() == 1
+
+def test_version_only_changes_with_the_data(offline_store):
+    zip_path = write_ergast_zip(offline_store / 'f1db_csv.zip')
+    first = ergast.import_zip(zip_path)['version']
+    assert ergast.import_zip(zip_path)['version'] == first
+
+    second = ergast.import_zip(write_ergast_zip(offline_store / 'other.zip', make_ergast_csvs(seed=1)))['version']
+    assert second != first
+    #the old snapshot is removed once the new one is current
+    assert not os.path.exists(offline_store / 'ergast' / first)
+
+def test_offline_mode_never_downloads(offline_store, monkeypatch):
+    monkeypatch.setattr(ergast.requests, 'get', lambda *args, **kwargs: pytest.fail("used the network"))
+    with pytest.raises(ergast.DataUnavailableError):
+        ergast.load_snapshot()
+    with pytest.raises(ergast.DataUnavailableError):
+        ergast.refresh()
+
+def test_a_schema_change_rebuilds_from_the_stored_zip(offline_store, monkeypatch):
+    old_version = ergast.import_zip(write_ergast_zip(offline_store / 'f1db_csv.zip'))['version']
+    monkeypatch.setattr(ergast, 'SCHEMA_VERSION', ergast.SCHEMA_VERSION + 1)
+    version, tables = ergast.load_snapshot()
+    assert version != old_version
+    assert len(tables['results']) > 0
+
+class FakeResponse():
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ergast.requests.HTTPError(str(self.status_code))
+
+    def iter_content(self, chunk_size):
+        return [self.content[i:i + chunk_size] for i in range(0, len(self.content), chunk_size)]
+
+def test_refresh_only_downloads_when_the_data_changed(offline_store, monkeypatch):
+    ergast.configure(str(offline_store / 'ergast'), offline=False)
+    content = write_ergast_zip(io.BytesIO()).getvalue()
+    requests_made = []
+
+    def get(url, headers, **kwargs):
+        requests_made.append(headers)
+        if headers.get('If-None-Match') == '"v1"':
+            return FakeResponse(304)
+        return FakeResponse(200, content, {'ETag': '"v1"', 'Last-Modified': 'Sat, 01 Mar 2025 00:00:00 GMT'})
+
+    monkeypatch.setattr(ergast.requests, 'get', get)
+    #the first load downloads it
+    version, _ = ergast.load_snapshot()
+    assert ergast.refresh() is False
+    assert ergast.get_version() == version
+    assert requests_made == [{}, {'If-None-Match': '"v1"', 'If-Modified-Since': 'Sat, 01 Mar 2025 00:00:00 GMT'}]
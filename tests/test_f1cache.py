@@ -0,0 +1,58 @@
+import os
+import time
+import pytest
+from f1Tracker import f1cache
+
+def make_event(cache_dir, season, event, size, last_used):
+    event_dir = os.path.join(cache_dir, season, event)
+    os.makedirs(os.path.join(event_dir, 'Race'))
+    with open(os.path.join(event_dir, 'Race', 'laps.ff1pkl'), 'wb') as f:
+        f.write(b'0' * size)
+    marker = os.path.join(event_dir, f1cache.LAST_USED_FILE)
+    open(marker, 'a').close()
+    os.utime(marker, (last_used, last_used))
+    return event_dir
+
+@pytest.fixture
+def size_checks():
+    #the background size check thread is started by the test and stopped again afterwards
+    f1cache.stop_size_checks()
+    yield
+    f1cache.stop_size_checks()
+
+def test_least_recently_used_events_evicted(tmp_path):
+    cache_dir = str(tmp_path)
+    f1cache.enable(cache_dir)
+    #the http cache database is never evicted
+    base_size = f1cache._dir_size(cache_dir)
+    old = make_event(cache_dir, '2023', 'Bahrain', 1000, 100)
+    recent = make_event(cache_dir, '2024', 'Bahrain', 1000, 300)
+    middle = make_event(cache_dir, '2024', 'Jeddah', 1000, 200)
+
+    f1cache._settings['max_bytes'] = base_size + 2500
+    evicted = f1cache.enforce_size_limit()
+
+    assert evicted == 1
+    assert not os.path.exists(old)
+    assert os.path.exists(recent) and os.path.exists(middle)
+    f1cache._settings['max_bytes'] = None
+
+def test_loading_sessions_only_asks_the_background_thread_to_check(tmp_path, size_checks):
+    cache_dir = str(tmp_path)
+    f1cache.enable(cache_dir)
+    old = make_event(cache_dir, '2023', 'Bahrain', 1000, 100)
+    f1cache._settings['max_bytes'] = f1cache._dir_size(cache_dir) - 500
+
+    f1cache.request_size_check()
+    assert os.path.exists(old)
+    f1cache.start_size_checks(3600)
+    thread = f1cache._size_checks['thread']
+    for _ in range(200):
+        if not os.path.exists(old):
+            break
+        time.sleep(0.01)
+    assert not os.path.exists(old)
+    f1cache._settings['max_bytes'] = None
+
+    f1cache.stop_size_checks()
+    assert not thread.is_alive()
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+from f1Tracker import features
+
+def get_results(rows=2000, seed=0):
+    #results in race order, a few drivers start the same race twice like they did in the 1950s
+    rng = np.random.default_rng(seed)
+    race_order = np.sort(rng.integers(1, rows // 10, size=rows))
+    return pd.DataFrame({
+        'raceId': race_order * 3 + 1000,
+        'driverId': rng.integers(1, 60, size=rows),
+        'racePosition': rng.integers(1, 21, size=rows),
+        'raceIdOrdered': race_order
+    })
+
+def count_race_exp(dataframe):
+    #the quadratic version driverExpRaces was originally computed with
+    exp = []
+    for index, row in dataframe.iterrows():
+        df_new = dataframe.loc[:index]
+        df_new = df_new[df_new['driverId'] == row['driverId']]
+        exp.append(len(df_new))
+    return exp
+
+def test_driver_experience_matches_the_original_count():
+    results = get_results()
+    expected = count_race_exp(results)
+    assert list(features.add_driver_history(results)['driverExpRaces']) == expected
+
+def test_prior_wins_and_podiums_only_count_earlier_races():
+    results = pd.DataFrame({'driverId': [1, 2, 1, 2, 1, 1],
+                            'racePosition': [1, 3, 2, 1, 1, 5]})
+    results = features.add_driver_history(results)
+    assert list(results['driverExpRaces']) == [1, 1, 2, 2, 3, 4]
+    assert list(results['driverPriorWins']) == [0, 0, 1, 0, 1, 2]
+    assert list(results['driverPriorPodiums']) == [0, 0, 1, 1, 2, 3]
+
+def convert_to_msec(time_lst):
+    #the original parser, each string was split into a list and converted one row at a time
+    if time_lst != 0:
+        return int(time_lst[0]) * 60000 + int(time_lst[1]) * 1000 + int(time_lst[2])
+    return 0
+
+def test_lap_times_parse_like_the_original():
+    times = pd.Series(['1:26.572', '1:31.5', '2:01.000', 0, np.nan, '0:59.999'], dtype=object)
+    parsed = features.parse_lap_times(times)
+    assert parsed.dtype == np.int32
+    assert list(parsed) == [convert_to_msec(time_lst) for time_lst in times.str.split(pat=r':|\.').fillna(0)]
+    #\N is a session without a time too
+    assert list(features.parse_lap_times(pd.Series(['\\N', '1:20.001']))) == [0, 80001]
+    #a session no one set a time in
+    assert list(features.parse_lap_times(pd.Series([0, 0]))) == [0, 0]
+
+def test_pace_is_taken_from_the_sessions_with_a_time():
+    dataframe = pd.DataFrame({'driverId': [1, 2, 3], 'q1': ['1:30.000', '1:31.000', '1:32.000'],
+                              'q2': ['1:29.000', '1:30.500', 0], 'q3': ['1:28.000', 0, 0]})
+    dataframe = features.add_quali_pace(dataframe)
+    assert list(dataframe.columns) == ['driverId', 'q1Msec', 'q2Msec', 'q3Msec', 'maxPace', 'meanPace']
+    assert list(dataframe['maxPace']) == [90000, 91000, 92000]
+    assert list(dataframe['meanPace']) == [89000.0, 90750.0, 92000.0]
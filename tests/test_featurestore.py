@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+from f1Tracker import ergast
+from f1Tracker import features
+from f1Tracker import featurestore
+from f1Tracker import singleflight
+from tests.test_ergast import write_ergast_zip
+
+@pytest.fixture
+def tables(tmp_path):
+    singleflight.configure(str(tmp_path / 'locks'))
+    featurestore.configure(str(tmp_path / 'features'))
+    ergast.configure(str(tmp_path / 'ergast'), offline=True)
+    ergast.import_zip(write_ergast_zip(tmp_path / 'f1db_csv.zip'))
+    return ergast.load_snapshot()[1]
+
+def before_race(tables, race_ordered):
+    #the tables as they were before the results and qualifying of a race came in, its race was already scheduled
+    races = features.order_races(tables['races'])
+    later = races.loc[races['raceIdOrdered'] >= race_ordered, 'raceId']
+    return dict(tables, results=tables['results'][~tables['results']['raceId'].isin(later)],
+                qualifying=tables['qualifying'][~tables['qualifying']['raceId'].isin(later)])
+
+def test_adding_races_builds_the_same_table_as_building_it_from_scratch(tables):
+    #the first of these is mid season, the next starts a season new drivers join in
+    featurestore.load_features('v1', before_race(tables, 30))
+    base_build = featurestore.get_info()['build']
+    for version, race_ordered in [('v2', 37), ('v3', 41)]:
+        featurestore.load_features(version, before_race(tables, race_ordered))
+        assert featurestore.get_info()['high_water_mark'] == race_ordered - 1
+        #adding races keeps the build the table was first built in
+        assert featurestore.get_info()['base_build'] == base_build
+    incremental = featurestore.load_features('v4', tables)
+
+    full, _, high_water_mark = features.build_features(tables)
+    pd.testing.assert_frame_equal(incremental, full)
+    info = featurestore.get_info()
+    assert info['high_water_mark'] == high_water_mark
+    assert 0 < info['added_rows'] < info['rows'] == len(full)
+
+    #the stored table is read back as it is
+    pd.testing.assert_frame_equal(featurestore.load_features('v4', tables), full)
+
+def test_the_table_is_built_again_when_earlier_races_change(tables):
+    featurestore.load_features('v1', before_race(tables, 40))
+    #a race before the high water mark moves after the race that followed it
+    races = tables['races'].copy()
+    races.loc[races['date'] == races['date'].min(), 'date'] += pd.Timedelta(days=20)
+    moved = dict(tables, races=races)
+    dataframe = featurestore.load_features('v2', moved)
+
+    pd.testing.assert_frame_equal(dataframe, features.build_features(moved)[0])
+    assert featurestore.get_info()['added_rows'] == len(dataframe)
+
+def test_the_table_is_built_again_when_earlier_results_or_qualifying_change(tables):
+    races = features.order_races(tables['races']).set_index('raceIdOrdered')['raceId']
+    published = before_race(tables, 41)
+    #the qualifying of a race came in after its results and a result of an early race was corrected later
+    qualifying = published['qualifying'][published['qualifying']['raceId'] != races[38]]
+    results = published['results'].copy()
+    first_two = results.index[(results['raceId'] == races[3]) & results['positionOrder'].isin([1, 2])]
+    results.loc[first_two, 'positionOrder'] = results.loc[first_two[::-1], 'positionOrder'].to_numpy()
+    featurestore.load_features('v1', dict(published, results=results, qualifying=qualifying))
+    assert featurestore.get_info()['high_water_mark'] == 40
+
+    dataframe = featurestore.load_features('v2', tables)
+    pd.testing.assert_frame_equal(dataframe, features.build_features(tables)[0])
+    info = featurestore.get_info()
+    assert info['added_rows'] == len(dataframe)
+    assert info['base_build'] == info['build']
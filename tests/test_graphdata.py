@@ -0,0 +1,205 @@
+import json
+import time
+import threading
+import numpy as np
+import pandas as pd
+import fastf1.plotting
+from concurrent.futures import ThreadPoolExecutor
+from f1Tracker import graphdata
+from f1Tracker.graphdata import DatasetCache, GearShiftDataset
+
+class FakeLaps():
+    def pick_fastest(self):
+        return {'Driver': 'VER'}
+
+class FakeSession():
+    def __init__(self):
+        self.laps = FakeLaps()
+        self.event = {'EventName': 'Bahrain Grand Prix'}
+        self.fastest_lap_telemetry = pd.DataFrame({
+            'X': np.linspace(0, 100, 50),
+            'Y': np.linspace(0, 50, 50),
+            'nGear': np.arange(50) % 8 + 1
+        })
+
+def get_dataset(points=10):
+    return GearShiftDataset(title='Gears', x=np.zeros(points, dtype=np.float32),
+                            y=np.zeros(points, dtype=np.float32), gears=np.ones(points, dtype=np.int8))
+
+def test_gear_shifts_are_extracted_into_compact_arrays():
+    dataset = graphdata.extract_gear_shifts(FakeSession(), 2024, 'Bahrain Grand Prix')
+    assert dataset.title == "Fastest Lap Gear Shift Visualization\nVER - Bahrain Grand Prix 2024"
+    assert dataset.x.dtype == np.float32 and dataset.y.dtype == np.float32
+    assert dataset.gears.dtype == np.int8
+    assert list(dataset.gears[:9]) == [1, 2, 3, 4, 5, 6, 7, 8, 1]
+
+def test_dataset_cache_extracts_once():
+    cache = DatasetCache(1024 * 1024)
+    calls = []
+
+    def extract():
+        calls.append(1)
+        return get_dataset()
+
+    first = cache.get((2024, 1, 'Gear Shifts on Track'), extract)
+    second = cache.get((2024, 1, 'Gear Shifts on Track'), extract)
+    assert first is second
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+def test_concurrent_misses_share_one_extraction():
+    cache = DatasetCache(1024 * 1024)
+    calls = []
+    started = threading.Event()
+
+    def extract():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return get_dataset()
+
+    with ThreadPoolExecutor(4) as executor:
+        first = executor.submit(cache.get, 'key', extract)
+        started.wait()
+        others = [executor.submit(cache.get, 'key', extract) for _ in range(3)]
+        results = [first.result()] + [future.result() for future in others]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+def test_least_recently_used_datasets_are_evicted():
+    size = graphdata.dataset_size(get_dataset(100))
+    cache = DatasetCache(size * 2)
+    datasets = {key: get_dataset(100) for key in ('a', 'b', 'c')}
+    cache.put('a', datasets['a'])
+    cache.put('b', datasets['b'])
+    cache.get('a', get_dataset)
+    cache.put('c', datasets['c'])
+
+    assert cache.stats()['entries'] == 2
+    assert cache.get('a', get_dataset) is datasets['a']
+    assert cache.get('b', get_dataset) is not datasets['b']
+
+def test_datasets_serialise_to_compact_json():
+    dataset = graphdata.QualiOverviewDataset(
+        title='Qualifying', drivers=['VER', 'NOR'], colors=['#0600ef', '#ff8700'],
+        deltas=np.array([0, 123456789], dtype='timedelta64[ns]'))
+    data = json.loads(graphdata.to_json(dataset, 'Qualifying Results Overview'))
+    assert data == {'graph_type': 'Qualifying Results Overview', 'title': 'Qualifying', 'drivers': ['VER', 'NOR'],
+                    'colors': ['#0600ef', '#ff8700'], 'deltas': [0.0, 0.123]}
+
+    positions = graphdata.PositionsDataset(
+        title='Positions', drivers=['VER'], colors=['blue'], linestyles=['solid'],
+        lap_numbers=np.array([1, 2], dtype=np.int16), positions=np.array([[1, np.nan]], dtype=np.float32))
+    data = json.loads(graphdata.to_json(positions, 'Position Changed during a Race'))
+    assert data['lap_numbers'] == [1, 2]
+    assert data['positions'] == [[1.0, None]]
+
+def get_track(points=5000):
+    #an oval with long straights sampled far more densely than it needs to be drawn
+    t = np.linspace(0, 1, points, endpoint=False)
+    angle = 2 * np.pi * t
+    x = 4000 * np.clip(1.6 * np.cos(angle), -1, 1)
+    y = 1500 * np.sin(angle)
+    gears = np.digitize(np.abs(np.cos(angle)), [0.2, 0.4, 0.6, 0.8, 0.9, 0.95, 0.99]) + 1
+    return x.astype(np.float32), y.astype(np.float32), gears.astype(np.int8)
+
+def test_decimated_track_stays_within_tolerance():
+    x, y, gears = get_track()
+    tolerance = 0.0005
+    dx, dy, dgears = graphdata.decimate_track(x, y, gears, tolerance)
+
+    assert len(dx) * 10 < len(x)
+    assert (dx[0], dy[0], dx[-1], dy[-1]) == (x[0], y[0], x[-1], y[-1])
+
+    #every original point is close to the decimated segment that replaced it and is drawn in the same gear
+    index = {(px, py): i for i, (px, py) in enumerate(zip(x, y))}
+    kept = np.array([index[(px, py)] for px, py in zip(dx, dy)])
+    segment = np.searchsorted(kept, np.arange(len(x) - 1), side='right') - 1
+    distances = graphdata._segment_distances(x[:-1], y[:-1], dx[segment], dy[segment],
+                                             dx[segment + 1], dy[segment + 1])
+    assert distances.max() <= tolerance * 8000 + 1e-6
+    assert np.array_equal(dgears[segment], gears[:-1])
+
+def test_short_tracks_are_left_alone():
+    x, y, gears = np.zeros(2, dtype=np.float32), np.ones(2, dtype=np.float32), np.ones(2, dtype=np.int8)
+    assert graphdata.decimate_track(x, y, gears) == (x, y, gears)
+
+class FakeRaceSession():
+    def __init__(self):
+        self.drivers = ['1', '4', '16', '99']
+        self.event = {'EventName': 'Bahrain Grand Prix', 'EventDate': pd.Timestamp('2024-03-02')}
+        stints = [('VER', 1, 'SOFT', 15), ('VER', 2, 'HARD', 42), ('NOR', 1, 'MEDIUM', 20),
+                  ('NOR', 2, 'HARD', 20), ('NOR', 3, 'SOFT', 17), ('LEC', 1, 'HARD', 57)]
+        self.laps = pd.DataFrame([{'Driver': driver, 'Stint': stint, 'Compound': compound, 'LapNumber': lap}
+                                  for driver, stint, compound, length in stints for lap in range(length)])
+
+    def get_driver(self, number):
+        return {'Abbreviation': {'1': 'VER', '4': 'NOR', '16': 'LEC', '99': 'GIO'}[number]}
+
+def test_tyre_strategies_are_offset_per_driver():
+    dataset = graphdata.extract_tyre_strategies(FakeRaceSession(), 2024, 'Bahrain Grand Prix')
+
+    #drivers without any laps aren't shown
+    assert dataset.drivers == ['VER', 'NOR', 'LEC']
+    assert list(dataset.driver_index) == [0, 0, 1, 1, 1, 2]
+    assert list(dataset.stint_starts) == [0, 15, 0, 20, 40, 0]
+    assert list(dataset.stint_lengths) == [15, 42, 20, 20, 17, 57]
+    assert [dataset.compounds[index] for index in dataset.compound_index] == \
+        ['SOFT', 'HARD', 'MEDIUM', 'HARD', 'SOFT', 'HARD']
+    assert dataset.compound_colors[dataset.compounds.index('SOFT')] == '#da291c'
+
+def get_quali_laps():
+    rng = np.random.default_rng(1)
+    rows = []
+    for driver, team in [('VER', 'Red Bull Racing'), ('PER', 'Red Bull Racing'), ('NOR', 'McLaren'),
+                         ('LEC', 'Ferrari'), ('SAR', 'Williams')]:
+        times = pd.to_timedelta(89 + rng.random(6) * 2, unit='s')
+        best = times.argmin()
+        for lap, lap_time in enumerate(times):
+            rows.append({'Driver': driver, 'Team': team, 'LapNumber': lap + 1, 'LapTime': lap_time,
+                         'IsPersonalBest': lap == best, 'Deleted': False})
+    laps = pd.DataFrame(rows)
+    #a deleted lap is faster than anything else but isn't a personal best
+    laps.loc[2, ['LapTime', 'Deleted']] = [pd.Timedelta(seconds=80), True]
+    #a driver without a lap time
+    laps.loc[laps['Driver'] == 'SAR', ['LapTime', 'IsPersonalBest']] = [pd.NaT, False]
+    return laps
+
+def test_fastest_laps_match_pick_fastest():
+    from fastf1.core import Laps
+    laps = Laps(get_quali_laps())
+    fastest_laps = graphdata.fastest_laps_by_driver(laps)
+
+    expected = [laps[laps['Driver'] == driver].pick_fastest() for driver in ['VER', 'PER', 'NOR', 'LEC']]
+    expected.sort(key=lambda lap: lap['LapTime'])
+    assert list(fastest_laps['Driver']) == [lap['Driver'] for lap in expected]
+    assert list(fastest_laps['LapTime']) == [lap['LapTime'] for lap in expected]
+    assert fastest_laps['LapTimeDelta'].iloc[0] == pd.Timedelta(0)
+    assert list(fastest_laps['LapTimeDelta']) == [lap['LapTime'] - expected[0]['LapTime'] for lap in expected]
+
+def test_fastest_laps_of_part_of_a_session_skip_deleted_laps():
+    laps = get_quali_laps()
+    laps['IsPersonalBest'] = False
+    fastest_laps = graphdata.fastest_laps_by_driver(laps, personal_best_only=False)
+    assert 'SAR' not in list(fastest_laps['Driver'])
+    assert pd.Timedelta(seconds=80) not in list(fastest_laps['LapTime'])
+    assert len(fastest_laps) == 4
+
+def test_positions_are_pivoted_into_a_matrix(monkeypatch):
+    monkeypatch.setattr(fastf1.plotting, 'get_driver_style',
+                        lambda identifier, style, session: {'color': f"color-{identifier}", 'linestyle': 'solid'})
+    session = FakeRaceSession()
+    session.laps = pd.DataFrame({
+        'DriverNumber': ['1', '1', '1', '16', '16', '4', '4', '4'],
+        'Driver': ['VER', 'VER', 'VER', 'LEC', 'LEC', 'NOR', 'NOR', 'NOR'],
+        'LapNumber': [1, 2, 3, 1, 3, 1, 2, 3],
+        'Position': [1, 1, 1, 3, 2, 2, 2, np.nan]
+    })
+    dataset = graphdata.extract_positions_change_during_a_race(session, 2024, 'Bahrain Grand Prix')
+
+    #finishing order, drivers without laps are left out
+    assert dataset.drivers == ['VER', 'NOR', 'LEC']
+    assert dataset.colors == ['color-VER', 'color-NOR', 'color-LEC']
+    assert list(dataset.lap_numbers) == [1, 2, 3]
+    np.testing.assert_array_equal(dataset.positions, [[1, 1, 1], [2, 2, np.nan], [3, np.nan, 2]])
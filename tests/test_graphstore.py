@@ -0,0 +1,17 @@
+from f1Tracker import graphstore
+
+def test_store_and_invalidate(tmp_path):
+    graphstore.configure(str(tmp_path))
+    assert graphstore.get(2024, 'Bahrain Grand Prix', 'Team Pace Comparison', '15x10', 'dark') is None
+
+    graphstore.put(2024, 'Bahrain Grand Prix', 'Team Pace Comparison', '15x10', 'dark', b'png')
+    graphstore.put(2024, 'Monaco Grand Prix', 'Team Pace Comparison', '15x10', 'dark', b'png')
+    image_path = graphstore.get(2024, 'Bahrain Grand Prix', 'Team Pace Comparison', '15x10', 'dark')
+    assert open(image_path, 'rb').read() == b'png'
+
+    #a different size is a different image
+    assert graphstore.get(2024, 'Bahrain Grand Prix', 'Team Pace Comparison', '9x6', 'dark') is None
+
+    assert graphstore.invalidate(grand_prix='Bahrain Grand Prix') == 1
+    assert graphstore.get(2024, 'Bahrain Grand Prix', 'Team Pace Comparison', '15x10', 'dark') is None
+    assert graphstore.get(2024, 'Monaco Grand Prix', 'Team Pace Comparison', '15x10', 'dark') is not None
@@ -0,0 +1,52 @@
+import time
+import threading
+import pytest
+from f1Tracker import jobs
+
+def wait_for(runner, job_id, statuses=('done', 'failed')):
+    for _ in range(200):
+        job = runner.get(job_id)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never finished")
+
+def test_job_runs_and_reports_done():
+    runner = jobs.JobRunner(1, 4, 10)
+    job = runner.submit('graph', lambda: None, result_url='/graphs/graph.png')
+    assert job['status'] in ('queued', 'running', 'done')
+    assert wait_for(runner, 'graph')['result_url'] == '/graphs/graph.png'
+
+def test_same_key_shares_job_and_full_queue_is_rejected():
+    runner = jobs.JobRunner(1, 2, 10)
+    release = threading.Event()
+    runner.submit('a', release.wait)
+    runner.submit('a', release.wait)
+    runner.submit('b', release.wait)
+
+    with pytest.raises(jobs.QueueFullError):
+        runner.submit('c', release.wait)
+    release.set()
+    wait_for(runner, 'b')
+
+def test_failed_and_timed_out_jobs():
+    runner = jobs.JobRunner(2, 4, 0.05)
+    release = threading.Event()
+    runner.submit('broken', lambda: 1 / 0)
+    runner.submit('slow', release.wait)
+
+    assert 'division by zero' in wait_for(runner, 'broken')['error']
+    assert 'Timed out' in wait_for(runner, 'slow', statuses=('failed',))['error']
+    release.set()
+
+def test_timeouts_count_from_submission_and_late_finishes_are_done():
+    runner = jobs.JobRunner(1, 4, 0.05)
+    release = threading.Event()
+    runner.submit('slow', release.wait)
+    #never gets a worker while slow is running
+    runner.submit('queued', lambda: None)
+
+    assert 'queue' in wait_for(runner, 'queued', statuses=('failed',))['error']
+    assert 'Timed out' in wait_for(runner, 'slow', statuses=('failed',))['error']
+    release.set()
+    assert wait_for(runner, 'slow', statuses=('done',))['error'] is None
@@ -0,0 +1,60 @@
+import time
+import pandas as pd
+from fastf1.core import Laps
+from f1Tracker import lapstore
+
+class FakeSession():
+    def __init__(self, laps, date):
+        self.laps = laps
+        self.date = date
+
+def make_laps():
+    laps = Laps({
+        'Driver': ['VER', 'VER', 'LEC'],
+        'DriverNumber': ['1', '1', '16'],
+        'LapTime': pd.to_timedelta([92.1, 91.5, 91.9], unit='s'),
+        'LapNumber': [1.0, 2.0, 1.0],
+        'Compound': ['SOFT', 'SOFT', 'MEDIUM'],
+        'LapStartDate': pd.to_datetime(['2024-03-02 15:00', '2024-03-02 15:02', '2024-03-02 15:00'])
+    }, force_default_cols=True)
+    #fastf1 sets this after building the laps from race control messages
+    laps['Deleted'] = [False, None, True]
+    return laps
+
+def test_laps_round_trip(tmp_path):
+    lapstore.configure(str(tmp_path))
+    laps = make_laps()
+    key = (2024, 1, 'R')
+    lapstore.write_laps(key, FakeSession(laps, pd.Timestamp('2024-03-02 15:00')))
+
+    stored = Laps(lapstore.read_laps(key))
+    pd.testing.assert_frame_equal(pd.DataFrame(stored), pd.DataFrame(laps))
+    lapstore.configure(None)
+
+def test_invalidation_rule():
+    session_date = time.time() - 30 * 24 * 3600
+    meta = {'schema_version': lapstore.STORE_SCHEMA_VERSION, 'fastf1_version': lapstore.fastf1.__version__,
+            'session_date': session_date}
+
+    #written weeks after the session so it is final
+    assert lapstore.is_valid(dict(meta, written_at=time.time() - 20 * 24 * 3600))
+    #written the day after the session so it gets re-checked
+    assert not lapstore.is_valid(dict(meta, written_at=session_date + 24 * 3600))
+    assert not lapstore.is_valid(dict(meta, written_at=time.time(), schema_version=0))
+
+def test_laps_are_only_read_back_for_the_parts_they_were_loaded_with(tmp_path):
+    lapstore.configure(str(tmp_path))
+    key = (2024, 1, 'R')
+    session = FakeSession(make_laps(), pd.Timestamp('2024-03-02 15:00'))
+
+    #loaded without the race control messages so the laps have no Deleted flags
+    lapstore.write_laps(key, session, {'laps', 'weather'})
+    assert lapstore.read_laps(key, {'laps'}) is not None
+    assert lapstore.read_laps(key, {'laps', 'messages'}) is None
+
+    lapstore.write_laps(key, session, {'laps', 'messages'})
+    #writing the fastest lap's telemetry keeps what the laps were loaded with
+    lapstore.write_fastest_lap_telemetry(key, session, pd.DataFrame({'Speed': [300.0]}))
+    assert lapstore.read_laps(key, {'laps', 'messages'}) is not None
+    assert lapstore.read_laps(key, {'laps'}) is not None
+    lapstore.configure(None)
@@ -0,0 +1,87 @@
+import importlib
+import numpy as np
+import pytest
+import xgboost as xgb
+from f1Tracker import driverfeatures
+from f1Tracker import ergast
+from f1Tracker import features
+from f1Tracker import featurestore
+from f1Tracker import modelstore
+from f1Tracker import predict
+from f1Tracker import singleflight
+from f1Tracker import training
+from tests.test_ergast import write_ergast_zip
+
+@pytest.fixture(scope='module')
+def ml(tmp_path_factory):
+    #ml builds its features from the ergast snapshot when it's imported, here a small synthetic one
+    tmp_path = tmp_path_factory.mktemp('ml')
+    singleflight.configure(str(tmp_path / 'locks'))
+    ergast.configure(str(tmp_path / 'ergast'), offline=True)
+    ergast.import_zip(write_ergast_zip(tmp_path / 'f1db_csv.zip'))
+    featurestore.configure(str(tmp_path / 'features'))
+    modelstore.configure(str(tmp_path / 'models'))
+    driverfeatures.configure(str(tmp_path / 'models' / 'driver_features.sqlite'))
+    return importlib.import_module('f1Tracker.ml')
+
+def test_features_are_built_once_as_one_float32_block(ml):
+    X, targets = ml.build_training_data()
+    assert X.dtype == np.float32 and X.flags['C_CONTIGUOUS']
+    assert X.shape == (len(ml.dataframe), len(ml.FEATURE_COLUMNS))
+    assert set(targets) == set(ml.MODELS)
+    assert all(target.min() == 0 for target in targets.values())
+
+def test_models_are_trained_together_and_served_without_retraining(ml, monkeypatch):
+    assert not ml.models_ready()
+    entries = ml.train_models(mode='fast')
+    assert ml.models_ready()
+    assert {entry['run_id'] for entry in entries.values()} == {entries['race']['run_id']}
+    assert {entry['dataset_version'] for entry in entries.values()} == {ml.dataset_version}
+
+    #serving predictions never trains
+    monkeypatch.setattr(training, 'train', lambda *args, **kwargs: pytest.fail("trained on the request path"))
+    rankings, accuracy = predict.getRacePredictions()
+    assert rankings and [row['rank'] for row in rankings] == list(range(1, len(rankings) + 1))
+    assert accuracy == entries['race']['accuracy']
+    qualifying, _ = predict.getQualiPredictions()
+    assert [row['qualifying_rank'] for row in qualifying] == list(range(1, len(rankings) + 1))
+
+def test_predictions_are_made_for_the_drivers_of_the_latest_race(ml):
+    entries = ml.train_models(mode='fast')
+    last_race = ml.dataframe[ml.dataframe['raceIdOrdered'] == ml.dataframe['raceIdOrdered'].max()]
+    last_race = last_race.sort_values(['startingPosition', 'driverId'])
+    for name, rank_key in predict.RANK_KEYS.items():
+        feature_names = entries[name]['feature_names']
+        booster = modelstore.load_booster(entries[name])
+        positions = booster.predict(xgb.DMatrix(last_race[feature_names])).astype(int) + 1
+        expected = sorted(zip(positions, last_race['driverId']), key=lambda row: row[0])
+        rankings, _ = predict.get_rankings(name)
+        assert [row['driver'] for row in rankings] == \
+            [ml.driver_id_to_code.get(driver_id, "Unknown Driver") for _, driver_id in expected]
+
+def test_a_corrected_latest_race_replaces_the_driver_features(ml, monkeypatch):
+    #the drivers starting first and second in the latest race are swapped in a correction after it was added
+    before, _ = driverfeatures.get_grid(['startingPosition'])
+    races = features.order_races(ml.tables['races'])
+    results = ml.tables['results'].copy()
+    last_race = races.loc[races['raceId'].isin(results['raceId']), 'raceIdOrdered'].max()
+    last_race_id = races.loc[races['raceIdOrdered'] == last_race, 'raceId'].item()
+    swapped = results.index[(results['raceId'] == last_race_id) & results['grid'].isin([1, 2])]
+    results.loc[swapped, 'grid'] = results.loc[swapped[::-1], 'grid'].to_numpy()
+
+    #the feature table is built again and the driver features copied from it are replaced
+    dataframe = featurestore.load_features('corrected', dict(ml.tables, results=results))
+    monkeypatch.setattr(ml, 'dataframe', dataframe)
+    monkeypatch.setattr(ml, 'dataset_version', 'corrected')
+    monkeypatch.setattr(ml, 'feature_build', featurestore.get_info()['base_build'])
+    ml.update_driver_features()
+
+    drivers, X = driverfeatures.get_grid(['startingPosition'])
+    assert drivers[:2] == before[1::-1] and drivers[2:] == before[2:]
+    latest = dataframe[dataframe['raceIdOrdered'] == last_race].sort_values(['startingPosition', 'driverId'])
+    assert X[:, 0].tolist() == latest['startingPosition'].tolist()
+
+    #back to the snapshot the other tests use
+    monkeypatch.undo()
+    featurestore.load_features(ml.dataset_version, ml.tables)
+    ml.update_driver_features()
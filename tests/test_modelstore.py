@@ -0,0 +1,68 @@
+import os
+import numpy as np
+import pytest
+import xgboost as xgb
+from f1Tracker import modelstore
+from f1Tracker import singleflight
+from f1Tracker import trees
+
+FEATURES = ['startingPosition', 'meanPace']
+
+@pytest.fixture
+def store(tmp_path):
+    singleflight.configure(str(tmp_path / 'locks'))
+    modelstore.configure(str(tmp_path / 'models'))
+    return tmp_path / 'models'
+
+def train_booster(seed):
+    rng = np.random.default_rng(seed)
+    X = rng.random((60, len(FEATURES)))
+    Y = (X[:, 0] * 3).astype(int)
+    return xgb.train({'objective': 'multi:softmax', 'num_class': 3}, xgb.DMatrix(X, Y, feature_names=FEATURES),
+                     num_boost_round=3)
+
+def test_saved_models_are_only_served_once_promoted(store):
+    first = modelstore.save('race', train_booster(0), 'v1', FEATURES, 'racePosition', 51)
+    assert modelstore.get_current('race') is None
+
+    modelstore.promote({'race': first})
+    current = modelstore.get_current('race')
+    assert current['accuracy'] == 51 and current['dataset_version'] == 'v1'
+    assert current['schema_hash'] == modelstore.schema_hash(FEATURES, 'racePosition')
+    assert current['schema_hash'] != modelstore.schema_hash(FEATURES[:1], 'racePosition')
+
+    #a model trained from newer data isn't served until it is promoted
+    second = modelstore.save('race', train_booster(1), 'v2', FEATURES, 'racePosition', 53)
+    assert modelstore.get_current('race')['path'] == first['path']
+    booster = modelstore.load_booster(modelstore.get_current('race'))
+    assert booster.feature_names == FEATURES
+    assert modelstore.load_booster(modelstore.get_current('race')) is booster
+
+    modelstore.promote({'race': second})
+    assert modelstore.load_booster(modelstore.get_current('race')) is not booster
+
+def test_models_promoted_together_switch_together(store):
+    entries = {name: modelstore.save(name, train_booster(0), 'v1', FEATURES, target, 50)
+               for name, target in [('race', 'racePosition'), ('quali', 'qualiResultPosition')]}
+    modelstore.promote(entries)
+    current = modelstore.get_current()
+    assert {name: entry['path'] for name, entry in current.items()} == \
+        {name: entry['path'] for name, entry in entries.items()}
+
+def test_only_the_served_and_previous_models_are_kept(store):
+    paths = []
+    for version in range(4):
+        entry = modelstore.save('race', train_booster(version), f"v{version}", FEATURES, 'racePosition', 50)
+        modelstore.promote({'race': entry})
+        paths.append(entry['path'])
+
+    assert sorted(os.listdir(store / 'race')) == sorted(os.path.basename(path) for path in paths[-2:])
+
+def test_the_trees_are_saved_to_predict_without_xgboost(store):
+    booster = train_booster(0)
+    entry = modelstore.save('race', booster, 'v1', FEATURES, 'racePosition', 50)
+    compiled = modelstore.load_trees(entry)
+    assert modelstore.load_trees(entry) is compiled
+
+    X = np.random.default_rng(1).random((20, len(FEATURES))).astype(np.float32)
+    assert np.array_equal(trees.predict(compiled, X), booster.predict(xgb.DMatrix(X, feature_names=FEATURES)))
@@ -0,0 +1,40 @@
+from f1Tracker import f1data
+from f1Tracker import graphstore
+from f1Tracker import pipeline
+from f1Tracker import render
+from tests.test_render import get_datasets, PNG_SIGNATURE
+
+class LoadedData():
+    #stands in for an F1Data whose sessions are loaded and datasets extracted, anything else fails the test
+    def __init__(self, datasets):
+        self.year = 2024
+        self.datasets = datasets
+        self.loaded = []
+
+    def load_session(self, grand_prix, session_type, parts):
+        self.loaded.append(session_type)
+
+    def get_graph_dataset(self, grand_prix, graph_type):
+        return self.datasets[graph_type]
+
+def test_spawned_workers_render_from_the_extracted_datasets(tmp_path):
+    drawn = get_datasets()
+    datasets = {graph_type: drawn[draw] for graph_type, draw in render.DRAWERS.items()}
+    data = LoadedData(datasets)
+    config = {'F1_CACHE_DIR': str(tmp_path / 'cache'), 'F1_CACHE_OFFLINE': True,
+              'F1_LAP_STORE_DIR': str(tmp_path / 'laps'), 'GRAPH_STORE_DIR': str(tmp_path / 'graphs'),
+              'LOCK_DIR': str(tmp_path / 'locks')}
+
+    #the spawned workers can't load a session or the schedule, they only have what they were handed
+    results, _ = pipeline.render_grand_prix(config, 'Bahrain Grand Prix', workers=2, f1_data={'R': data, 'Q': data},
+                                            start_method='spawn')
+    assert [result[3] for result in results] == ['rendered'] * len(f1data.GRAPH_METHODS)
+    assert sorted(data.loaded) == ['Q', 'R']
+    for graph_type in f1data.GRAPH_METHODS:
+        image_path = graphstore.get(2024, 'Bahrain Grand Prix', graph_type, graphstore.DEFAULT_SIZE,
+                                    graphstore.DEFAULT_THEME)
+        assert open(image_path, 'rb').read().startswith(PNG_SIGNATURE)
+
+    #a second run finds them all in the store
+    results, _ = pipeline.render_grand_prix(config, 'Bahrain Grand Prix', f1_data={'R': data, 'Q': data})
+    assert [result[3] for result in results] == ['skipped'] * len(f1data.GRAPH_METHODS)
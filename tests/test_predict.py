@@ -0,0 +1,33 @@
+import os
+import sys
+import json
+import subprocess
+import numpy as np
+import xgboost as xgb
+from f1Tracker import trees
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_compiled_trees_predict_the_same_as_the_booster():
+    rng = np.random.default_rng(0)
+    X = rng.random((2000, 4)).astype(np.float32)
+    y = np.clip(X[:, 0] * 20 + rng.integers(-3, 4, size=len(X)), 0, 19).astype(int)
+    #values the trees have never seen and values exactly on a split go the same way xgboost sends them
+    X[rng.random(X.shape) < 0.05] = np.nan
+    booster = xgb.train({'objective': 'multi:softmax', 'num_class': 20, 'tree_method': 'hist', 'max_bin': 64},
+                        xgb.DMatrix(X, y), num_boost_round=20)
+    compiled = trees.compile_booster(json.loads(booster.save_raw('json')))
+
+    test = rng.random((500, 4)).astype(np.float32)
+    test[:50, 0] = compiled['threshold'][compiled['roots'][:50]]
+    test[rng.random(test.shape) < 0.05] = np.nan
+    assert np.array_equal(trees.predict(compiled, test), booster.predict(xgb.DMatrix(test)))
+    assert np.array_equal(trees.predict(compiled, np.nan_to_num(test)), booster.predict(xgb.DMatrix(np.nan_to_num(test))))
+
+def test_predicting_doesnt_import_the_training_libraries(tmp_path):
+    deferred = ['xgboost', 'sklearn', 'f1Tracker.ml']
+    code = f"import sys; import f1Tracker.predict; print(','.join(m for m in {deferred!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, env=dict(os.environ, PYTHONPATH=PACKAGE_DIR),
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip() == ''
@@ -0,0 +1,71 @@
+import numpy as np
+import matplotlib
+from concurrent.futures import ThreadPoolExecutor
+from f1Tracker import graphdata
+from f1Tracker import render
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def get_gear_shift_dataset(seed):
+    angle = np.linspace(0, 2 * np.pi, 400)
+    radius = 1000 + seed * 50
+    return graphdata.GearShiftDataset(
+        title=f"Fastest Lap Gear Shift Visualization\nVER - Grand Prix {seed} 2024",
+        x=(radius * np.cos(angle)).astype(np.float32),
+        y=(radius * np.sin(angle) * 0.6).astype(np.float32),
+        gears=((np.arange(400) // 50) % 8 + 1).astype(np.int8)
+    )
+
+def get_datasets():
+    rng = np.random.default_rng(0)
+    drivers = ['VER', 'NOR', 'LEC']
+    return {
+        render.draw_positions_change_during_a_race: graphdata.PositionsDataset(
+            title="Positions", drivers=drivers, colors=['blue', 'orange', 'red'],
+            linestyles=['solid', 'solid', 'dashed'],
+            lap_numbers=np.arange(1, 11, dtype=np.int16),
+            positions=np.repeat(np.array([[1], [2], [3]], dtype=np.float32), 10, axis=1)),
+        render.draw_team_pace_comparison: graphdata.TeamPaceDataset(
+            title="Team Pace", teams=['Red Bull', 'McLaren'], colors=['blue', 'orange'],
+            lap_times=[(90 + rng.random(20)).astype(np.float32), (91 + rng.random(20)).astype(np.float32)]),
+        render.draw_driver_laptime_comparison: graphdata.LaptimeDistributionDataset(
+            title="Lap Times", drivers=drivers, driver_colors=['blue', 'orange', 'red'],
+            compounds=['SOFT', 'MEDIUM', 'HARD'], compound_colors=['red', 'yellow', 'white'],
+            driver_index=np.repeat(np.arange(3, dtype=np.int8), 10),
+            compound_index=np.tile(np.array([0, 2, -1], dtype=np.int8), 10),
+            lap_times=(90 + rng.random(30)).astype(np.float32)),
+        render.draw_tyre_strategies: graphdata.TyreStrategyDataset(
+            title="Strategies", drivers=drivers, compounds=['MEDIUM', 'HARD'], compound_colors=['yellow', 'white'],
+            driver_index=np.array([0, 0, 1, 1, 2], dtype=np.int16),
+            compound_index=np.array([0, 1, 0, 1, 1], dtype=np.int8),
+            stint_starts=np.array([0, 20, 0, 25, 0], dtype=np.int16),
+            stint_lengths=np.array([20, 30, 25, 25, 50], dtype=np.int16)),
+        render.draw_quali_results_overview: graphdata.QualiOverviewDataset(
+            title="Qualifying", drivers=drivers, colors=['blue', 'orange', 'red'],
+            deltas=np.array([0, 120, 340], dtype='timedelta64[ms]').astype('timedelta64[ns]')),
+        render.draw_gear_shifts: get_gear_shift_dataset(0)
+    }
+
+def test_every_graph_draws_from_its_dataset():
+    for draw, dataset in get_datasets().items():
+        for theme in render.THEMES:
+            assert draw(dataset, (6, 4), theme).getvalue().startswith(PNG_SIGNATURE)
+
+def test_graphs_render_the_same_in_parallel_threads():
+    #every graph type, the seaborn ones included, with each theme and a few gear shift inputs
+    jobs = [(draw, dataset, theme) for draw, dataset in get_datasets().items() for theme in render.THEMES]
+    jobs += [(render.draw_gear_shifts, get_gear_shift_dataset(seed), theme)
+             for seed in range(1, 4) for theme in render.THEMES]
+    serial = [draw(dataset, (6, 4), theme).getvalue() for draw, dataset, theme in jobs]
+
+    with ThreadPoolExecutor(8) as executor:
+        parallel = list(executor.map(lambda job: job[0](job[1], (6, 4), job[2]).getvalue(), jobs * 3))
+
+    assert parallel == serial * 3
+    #different graphs, inputs and themes actually give different images
+    assert len(set(serial)) == len(serial)
+
+def test_rendering_leaves_global_style_alone():
+    before = dict(matplotlib.rcParams)
+    render.draw_gear_shifts(get_gear_shift_dataset(0), (6, 4), 'light')
+    assert dict(matplotlib.rcParams) == before
@@ -0,0 +1,92 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import pandas as pd
+from f1Tracker import sessions
+from f1Tracker.sessions import SessionCache, load_flags, FASTEST_LAP_TELEMETRY
+
+class FakeSession():
+    def __init__(self, rows):
+        self._laps = pd.DataFrame({'LapNumber': range(rows)})
+
+def make_loader(loads, rows=10):
+    def loader(parts):
+        loads.append(parts)
+        return FakeSession(rows)
+    return loader
+
+def test_session_reused_for_fewer_parts():
+    cache = SessionCache(10 * 1024 * 1024)
+    loads = []
+    full = cache.get((2024, 1, 'R'), ['laps', 'telemetry'], make_loader(loads))
+    laps_only = cache.get((2024, 1, 'R'), ['laps'], make_loader(loads))
+
+    assert full is laps_only
+    assert len(loads) == 1
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+def test_missing_parts_loads_union():
+    cache = SessionCache(10 * 1024 * 1024)
+    loads = []
+    cache.get((2024, 1, 'R'), ['laps'], make_loader(loads))
+    cache.get((2024, 1, 'R'), ['weather'], make_loader(loads))
+
+    assert loads[1] == frozenset(['laps', 'weather'])
+
+def test_lru_eviction():
+    cache = SessionCache(1)
+    loads = []
+    cache.max_bytes = FakeSession(1000)._laps.memory_usage(deep=True).sum() * 2
+    cache.get((2024, 1, 'R'), ['laps'], make_loader(loads, 1000))
+    cache.get((2024, 2, 'R'), ['laps'], make_loader(loads, 1000))
+    cache.get((2024, 1, 'R'), ['laps'], make_loader(loads, 1000))
+    cache.get((2024, 3, 'R'), ['laps'], make_loader(loads, 1000))
+
+    #round 2 was the least recently used so it gets evicted
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['entries'] == 2
+    cache.get((2024, 2, 'R'), ['laps'], make_loader(loads, 1000))
+    assert len(loads) == 4
+
+def test_full_telemetry_covers_fastest_lap_telemetry():
+    cache = SessionCache(10 * 1024 * 1024)
+    loads = []
+    cache.get((2024, 1, 'Q'), ['laps', 'telemetry'], make_loader(loads))
+    cache.get((2024, 1, 'Q'), ['laps', FASTEST_LAP_TELEMETRY], make_loader(loads))
+
+    assert len(loads) == 1
+
+def test_load_flags_are_narrow():
+    assert load_flags(['laps']) == {'laps': True, 'telemetry': False, 'weather': False, 'messages': False}
+    assert load_flags(['laps', FASTEST_LAP_TELEMETRY])['telemetry']
+
+def test_concurrent_misses_load_once():
+    cache = SessionCache(10 * 1024 * 1024)
+    loads = []
+    slow_loader = make_loader(loads)
+
+    def loader(parts):
+        time.sleep(0.1)
+        return slow_loader(parts)
+
+    with ThreadPoolExecutor(6) as executor:
+        sessions = list(executor.map(lambda _: cache.get((2024, 1, 'R'), ['laps'], loader), range(6)))
+
+    assert len(loads) == 1
+    assert all(session is sessions[0] for session in sessions)
+
+def test_private_attributes_are_only_set_on_checked_fastf1_versions(monkeypatch):
+    laps = pd.DataFrame({'Driver': ['VER'], 'LapNumber': [1.0]})
+    session = FakeSession(0)
+    sessions.set_laps(session, laps)
+    assert list(session._laps['Driver']) == ['VER']
+
+    monkeypatch.setattr(sessions.fastf1, '__version__', '4.0.0')
+    assert not sessions.can_set_private_attributes()
+    with pytest.raises(RuntimeError):
+        sessions.set_laps(session, laps)
+    #the car data is kept rather than written to an attribute that may mean something else now
+    session._car_data = {'1': pd.DataFrame()}
+    sessions.attach_fastest_lap_telemetry(session, pd.DataFrame({'Speed': [300.0]}))
+    assert session._car_data and session.fastest_lap_telemetry is not None
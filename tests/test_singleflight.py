@@ -0,0 +1,62 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from f1Tracker.singleflight import SingleFlight, file_lock
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def work():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return 'image'
+
+    with ThreadPoolExecutor(8) as executor:
+        first = executor.submit(flights.do, 'graph', work)
+        started.wait()
+        others = [executor.submit(flights.do, 'graph', work) for _ in range(7)]
+        results = [first.result()] + [future.result() for future in others]
+
+    assert results == ['image'] * 8
+    assert len(calls) == 1
+    assert flights.coalesced == 7
+
+def test_errors_are_shared_and_not_cached():
+    flights = SingleFlight()
+
+    def broken():
+        raise ValueError('no data')
+
+    try:
+        flights.do('graph', broken)
+    except ValueError:
+        pass
+    assert flights.do('graph', lambda: 'image') == 'image'
+
+def test_file_lock_is_exclusive(tmp_path):
+    from f1Tracker import singleflight
+    singleflight.configure(str(tmp_path))
+    inside = []
+
+    def hold():
+        with file_lock('session-2024-1-R'):
+            inside.append(1)
+            assert len(inside) == 1
+            time.sleep(0.05)
+            inside.pop()
+
+    with ThreadPoolExecutor(4) as executor:
+        for future in [executor.submit(hold) for _ in range(4)]:
+            future.result()
+
+def test_a_held_file_lock_can_be_seen_without_waiting(tmp_path):
+    from f1Tracker import singleflight
+    singleflight.configure(str(tmp_path))
+    assert not singleflight.is_locked('graph-abc')
+    with file_lock('graph-abc'):
+        assert singleflight.is_locked('graph-abc')
+        assert not singleflight.is_locked('graph-def')
+    assert not singleflight.is_locked('graph-abc')
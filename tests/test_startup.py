@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import threading
+import subprocess
+import pytest
+import pandas as pd
+from f1Tracker import f1data
+from f1Tracker import modelstore
+from f1Tracker import predict
+from f1Tracker import warmup
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#importing the app shouldn't load anything only needed to draw graphs or make predictions
+DEFERRED_MODULES = ['seaborn', 'xgboost', 'sklearn', 'fastf1.plotting', 'f1Tracker.ml']
+#cumulative import time of f1Tracker.app, it took minutes when it downloaded the ergast data on import
+IMPORT_BUDGET_SECONDS = 6
+
+def test_app_import_stays_within_budget(tmp_path):
+    code = f"import sys; import f1Tracker.app; print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=PACKAGE_DIR)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip() == ''
+
+    #-X importtime lines are "import time: self | cumulative | module" in microseconds
+    times = {line.split('|')[2].strip(): int(line.split('|')[1]) for line in result.stderr.splitlines()
+             if line.startswith('import time:') and line.split('|')[1].strip().isdigit()}
+    assert times['f1Tracker.app'] < IMPORT_BUDGET_SECONDS * 1e6
+
+def wait_for(check):
+    for _ in range(200):
+        if check():
+            return
+        time.sleep(0.01)
+    raise AssertionError("warm-up never finished")
+
+def test_warm_up_retries_failed_tasks():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("network is down")
+
+    warm_up = warmup.WarmUp({'schedule': flaky, 'predictions': lambda: None}, required=['schedule'],
+                            retry_seconds=0.01)
+    assert not warm_up.ready() and not warm_up.started()
+    warm_up.start()
+    warm_up.start()
+    wait_for(warm_up.ready)
+
+    status = warm_up.status()
+    assert len(calls) == 3
+    assert status['tasks']['schedule']['state'] == 'ready' and status['tasks']['schedule']['error'] is None
+
+def test_optional_tasks_dont_hold_up_readiness():
+    warm_up = warmup.WarmUp({'schedule': lambda: None, 'predictions': lambda: 1 / 0}, required=['schedule'],
+                            retry_seconds=60)
+    warm_up.start()
+    wait_for(lambda: warm_up.status()['tasks']['predictions']['state'] == 'failed')
+    wait_for(warm_up.ready)
+    assert 'division by zero' in warm_up.status()['tasks']['predictions']['error']
+
+def test_schedule_is_loaded_once_and_retried_after_failure(monkeypatch):
+    calls = []
+
+    def get_events_remaining():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("network is down")
+        return pd.DataFrame({'EventName': ['Abu Dhabi Grand Prix'], 'RoundNumber': [24],
+                             'EventDate': [pd.Timestamp('2024-12-08')]})
+
+    monkeypatch.setattr(f1data.fastf1, 'get_events_remaining', get_events_remaining)
+    monkeypatch.setattr(f1data.fastf1, 'get_event_schedule',
+                        lambda year: pd.DataFrame({'EventName': ['Bahrain Grand Prix', 'Abu Dhabi Grand Prix']},
+                                                  index=[1, 24]))
+    schedule = f1data.Schedule(2024)
+
+    assert not schedule.load()
+    #failed loads aren't retried straight away
+    assert not schedule.load() and len(calls) == 1
+
+    monkeypatch.setattr(f1data, 'SCHEDULE_RETRY_SECONDS', 0)
+    assert schedule.load() and schedule.load()
+    assert len(calls) == 2
+    assert schedule.previous_round_number == 23
+    assert schedule.events == {1: 'Bahrain Grand Prix', 24: 'Abu Dhabi Grand Prix'}
+
+def test_predictions_that_arent_ready_train_off_the_request_thread(monkeypatch):
+    release = threading.Event()
+    threads = []
+
+    def load_predictions():
+        threads.append(threading.current_thread())
+        release.wait(5)
+        raise ImportError("ml isn't needed here")
+
+    def not_ready(name):
+        raise modelstore.ModelNotReadyError(f"the {name} model hasn't been trained yet")
+
+    monkeypatch.setattr(predict, 'get_rankings', not_ready)
+    monkeypatch.setattr(f1data, 'load_predictions', load_predictions)
+    for _ in range(3):
+        with pytest.raises(modelstore.ModelNotReadyError):
+            f1data.get_predictions('race')
+    wait_for(lambda: threads)
+    release.set()
+    f1data._training['thread'].join(5)
+
+    #only one thread imported ml and it wasn't the request's
+    assert len(threads) == 1 and threads[0] is not threading.current_thread()
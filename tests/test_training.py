@@ -0,0 +1,38 @@
+import numpy as np
+from f1Tracker import training
+
+FEATURES = ['startingPosition', 'meanPace', 'maxPace']
+
+def get_data(rows=600, seed=0):
+    #positions that mostly follow the starting position
+    rng = np.random.default_rng(seed)
+    grid = rng.integers(0, 6, size=rows)
+    y = np.clip(grid + rng.integers(-1, 2, size=rows), 0, 5).astype(np.int32)
+    X = np.column_stack([grid, 90000 + rng.random(rows) * 2000, 91000 + rng.random(rows) * 2000])
+    return np.ascontiguousarray(X, dtype=np.float32), y
+
+def test_folds_leave_out_the_fold_they_stop_on():
+    _, y = get_data()
+    for train_index, stop_index, test_index in training.get_folds(y, 5):
+        assert len(np.intersect1d(train_index, test_index)) == 0
+        assert len(np.intersect1d(train_index, stop_index)) == 0
+        assert len(np.intersect1d(stop_index, test_index)) == 0
+        assert len(train_index) + len(stop_index) + len(test_index) == len(y)
+
+def test_fast_training_learns_and_reports_each_stage():
+    X, y = get_data()
+    result = training.train(X, y, FEATURES, mode='fast', workers=1)
+
+    assert len(result.fold_accuracies) == training.TRAINING_MODES['fast']['folds']
+    assert 1 <= result.rounds <= training.TRAINING_MODES['fast']['max_rounds']
+    assert result.accuracy > 40
+    assert set(result.timings) == {'folds', 'slowest_fold', 'final_fit', 'total'}
+    assert result.booster.feature_names == FEATURES
+    assert result.booster.num_boosted_rounds() == result.rounds
+
+def test_folds_in_worker_processes_match_training_them_in_process():
+    X, y = get_data()
+    serial = training.train(X, y, FEATURES, mode='fast', workers=1)
+    parallel = training.train(X, y, FEATURES, mode='fast', workers=3)
+    assert parallel.fold_accuracies == serial.fold_accuracies
+    assert parallel.rounds == serial.rounds